@@ -4,12 +4,26 @@ from loguru import logger
 import os
 load_dotenv(".env.local")
 from groq import Groq
+from llm_cache import LLMResponseCache, request_key
 API_KEY=os.getenv("API_KEY")
 logger.success("Loaded API KEY succesfully✨")
 client = Groq(api_key=API_KEY)
 
-def generate(schema=None,system_instruction="No system instruction provided",contents="No query provided "):
-    completion = client.chat.completions.create(
+# Same response cache as the backend's chat.llm.generate, off unless LLM_CACHE_ENABLED=true
+LLM_CACHE_SEED = int(os.getenv("LLM_CACHE_SEED", 0))
+response_cache = (
+    LLMResponseCache(
+        path=os.getenv("LLM_CACHE_PATH", "cache/llm_responses.sqlite3"),
+        ttl=int(os.getenv("LLM_CACHE_TTL", 7 * 24 * 3600)),
+        max_bytes=int(os.getenv("LLM_CACHE_MAX_BYTES", 256 * 1024**2)),
+    )
+    if os.getenv("LLM_CACHE_ENABLED", "false").lower() == "true"
+    else None
+)
+
+def generate(schema=None,system_instruction="No system instruction provided",contents="No query provided ",cache=True):
+    """Structured (json_object) completion; cached calls run with temperature 0 and a fixed seed."""
+    request = dict(
         model="openai/gpt-oss-120b",
         messages=[
         {
@@ -24,12 +38,22 @@ def generate(schema=None,system_instruction="No system instruction provided",con
         temperature=1,
         max_completion_tokens=8192,
         top_p=1,
-        stream=False,
         response_format={"type": "json_object"},
-        stop=None
     )
+    key = None
+    if cache and response_cache is not None:
+        request.update(temperature=0, seed=LLM_CACHE_SEED)
+        key = request_key(request)
+        cached = response_cache.get(key)
+        if cached is not None:
+            logger.debug(f"LLM response cache hit {key[:12]} ({response_cache.stats()['hit_rate']:.0%} hit rate)")
+            return cached
+
+    completion = client.chat.completions.create(**request, stream=False, stop=None)
 
     logger.debug(completion.choices[0].message.content)
+    if key and completion.choices[0].message.content is not None:
+        response_cache.put(key, completion.choices[0].message.content)
     return completion.choices[0].message.content
 
 # To run this code you need to install the following dependencies:
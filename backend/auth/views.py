@@ -5,6 +5,9 @@ from rest_framework.permissions import AllowAny,IsAuthenticated
 from rest_framework_simplejwt.tokens import RefreshToken
 from drf_spectacular.utils import extend_schema
 from rest_framework_simplejwt.views import TokenRefreshView
+from django.conf import settings
+
+from vector.client import vector_store
 
 from . import serializer
 
@@ -28,6 +31,8 @@ class LoginAPIView(APIView):
         serializer.is_valid(raise_exception=True)
         user = serializer.validated_data.get("user") # type: ignore
         refresh = RefreshToken.for_user(user) # type: ignore
+        if settings.PREWARM_ON_LOGIN:
+            vector_store.prewarm(str(user.id)) # type: ignore  # in the background, so the first question skips the index load
         return Response({"access": str(refresh.access_token),"refresh": str(refresh),}, status=status.HTTP_200_OK)
     
 @extend_schema(tags=["Auth"])
@@ -0,0 +1,19 @@
+from django.conf import settings
+from django.http import JsonResponse
+
+from vector.client import vector_store
+
+
+def ready(request):
+    """
+    Readiness probe for the orchestrator: 200 once every component listed in
+    VECTOR_STORE_WARMUP is loaded, 503 before that. Always reports the load
+    state and load time of each VectorStore component, and the chunk store's
+    own stats (resident tenants or connection pool).
+    """
+    components = vector_store.status()
+    is_ready = all(components.get(name, {}).get("loaded") for name in settings.VECTOR_STORE_WARMUP)
+    return JsonResponse(
+        {"ready": is_ready, "components": components, "store": vector_store.store_stats()},
+        status=200 if is_ready else 503,
+    )
@@ -0,0 +1,180 @@
+"""
+Prometheus metrics for ingestion, retrieval, the LLM and the video pipeline.
+
+    GET /metrics  → text exposition format, for a Prometheus scrape job
+
+Metrics are module-level prometheus_client objects; hot paths use children
+bound to their labels at import (`CONVERT_SECONDS.observe(s)`), so recording
+one sample costs a few microseconds, also in multiprocess mode.
+
+Several processes (web workers, `manage.py ingest_worker`, the spawned
+conversion pool of `ingest_dir`) only add up when PROMETHEUS_MULTIPROC_DIR is
+set in their environment *before they start*: every process then writes its
+samples to memory-mapped files in that directory, and /metrics, served by any
+web worker, sums all of them. Empty the directory when the deployment starts.
+Without it each process only reports its own samples.
+"""
+import time
+
+from django.conf import settings
+from django.http import HttpResponse
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+from prometheus_client.core import GaugeMetricFamily
+
+FAST_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+SLOW_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1800.0)
+TOKEN_BUCKETS = (16, 64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384)
+
+# ──────────────────────────────────────────────
+# Ingestion
+# ──────────────────────────────────────────────
+
+INGEST_STAGE_SECONDS = Histogram(
+    "historick_ingest_stage_seconds",
+    "Ingestion stage latency: convert (docling, cache misses) and chunk per document, embed per encoder batch",
+    ["stage"],
+    buckets=SLOW_BUCKETS,
+)
+CONVERT_SECONDS = INGEST_STAGE_SECONDS.labels("convert")
+CHUNK_SECONDS = INGEST_STAGE_SECONDS.labels("chunk")
+EMBED_SECONDS = INGEST_STAGE_SECONDS.labels("embed")
+
+INGEST_FILES = Counter(
+    "historick_ingest_files_total",
+    "Files through the ingestion pipeline by outcome (retry: failed, queued again)",
+    ["outcome"],
+)
+INGEST_DONE = INGEST_FILES.labels("done")
+INGEST_RETRY = INGEST_FILES.labels("retry")
+INGEST_FAILED = INGEST_FILES.labels("failed")
+INGEST_CHUNKS = Counter("historick_ingest_chunks_total", "Chunks embedded and stored")
+
+# ──────────────────────────────────────────────
+# Chunk store and retrieval
+# ──────────────────────────────────────────────
+
+CHUNK_STORE_SECONDS = Histogram(
+    "historick_chunk_store_seconds",
+    "Chunk store (VECTOR_BACKEND) call latency",
+    ["operation"],
+    buckets=FAST_BUCKETS,
+)
+STORE_UPSERT_SECONDS = CHUNK_STORE_SECONDS.labels("upsert")
+STORE_QUERY_SECONDS = CHUNK_STORE_SECONDS.labels("query")
+
+RETRIEVAL_SECONDS = Histogram(
+    "historick_retrieval_seconds",
+    "Context retrieval for one chat message by path: cache, dense or hybrid, +rerank",
+    ["path"],
+    buckets=FAST_BUCKETS,
+)
+
+# ──────────────────────────────────────────────
+# LLM
+# ──────────────────────────────────────────────
+
+LLM_SECONDS = Histogram(
+    "historick_llm_generate_seconds",
+    "chat.llm.generate latency (stream_generate: until the last token)",
+    buckets=SLOW_BUCKETS,
+)
+LLM_FIRST_TOKEN_SECONDS = Histogram(
+    "historick_llm_first_token_seconds", "chat.llm.stream_generate time to first token", buckets=SLOW_BUCKETS
+)
+LLM_TOKENS = Histogram(
+    "historick_llm_tokens", "Tokens per chat.llm.generate call", ["kind"], buckets=TOKEN_BUCKETS
+)
+LLM_PROMPT_TOKENS = LLM_TOKENS.labels("prompt")
+LLM_COMPLETION_TOKENS = LLM_TOKENS.labels("completion")
+LLM_ERRORS = Counter("historick_llm_errors_total", "chat.llm.generate calls that raised")
+LLM_CACHE = Counter("historick_llm_cache_total", "chat.llm.generate response cache lookups", ["result"])
+LLM_CACHE_HITS = LLM_CACHE.labels("hit")
+LLM_CACHE_MISSES = LLM_CACHE.labels("miss")
+ANSWER_CACHE = Counter(
+    "historick_answer_cache_total", "Semantic answer cache lookups (hit: no LLM call)", ["result"]
+)
+ANSWER_CACHE_HITS = ANSWER_CACHE.labels("hit")
+ANSWER_CACHE_MISSES = ANSWER_CACHE.labels("miss")
+LLM_CANCELLED = Counter("historick_llm_cancelled_total", "Streamed completions closed before the end (client gone)")
+# chat/llm_client.py
+LLM_IN_FLIGHT = Gauge(
+    "historick_llm_in_flight",
+    "LLM calls in flight, retry waits included, streams until closed",
+    multiprocess_mode="livesum",
+)
+LLM_CONCURRENCY_LIMIT = Gauge(
+    "historick_llm_concurrency_limit",
+    "Connections per LLM client pool (LLM_MAX_CONNECTIONS)",
+    multiprocess_mode="livemax",
+)
+LLM_CIRCUIT_OPEN = Gauge(
+    "historick_llm_circuit_open", "1 while the LLM circuit breaker fails calls fast", multiprocess_mode="livemax"
+)
+LLM_RETRIES = Counter("historick_llm_retries_total", "LLM calls retried after a 429, 5xx, timeout or connection error")
+LLM_REJECTED = Counter(
+    "historick_llm_rejected_total", "LLM calls failed fast (503): circuit open, or no free connection", ["reason"]
+)
+LLM_REJECTED_CIRCUIT = LLM_REJECTED.labels("circuit")
+LLM_REJECTED_BUSY = LLM_REJECTED.labels("busy")
+
+# ──────────────────────────────────────────────
+# Video pipeline
+# ──────────────────────────────────────────────
+
+VIDEO_STAGE_SECONDS = Histogram(
+    "historick_video_stage_seconds",
+    "Video pipeline stage latency: story (once per video), speech/media/caption (per sentence), render",
+    ["stage"],
+    buckets=SLOW_BUCKETS,
+)
+
+# ──────────────────────────────────────────────
+# Endpoint
+# ──────────────────────────────────────────────
+
+
+class IngestionQueueCollector:
+    """Queue depth read from the IngestionJob table at scrape time (one query, any number of workers)."""
+
+    def collect(self):
+        from django.db.models import Count, Min
+
+        from folders.models import IngestionJob
+
+        depth = GaugeMetricFamily(
+            "historick_ingest_jobs", "Ingestion jobs by status (done and failed are all-time)", labels=["status"]
+        )
+        oldest = GaugeMetricFamily(
+            "historick_ingest_oldest_queued_seconds", "Age of the oldest queued ingestion job"
+        )
+        counts = dict(IngestionJob.objects.order_by().values_list("status").annotate(Count("id")))
+        for status in IngestionJob.Status.values:
+            depth.add_metric([status], counts.get(status, 0))
+        created = IngestionJob.objects.filter(status=IngestionJob.Status.QUEUED).aggregate(Min("created_at"))
+        first = created["created_at__min"]
+        oldest.add_metric([], time.time() - first.timestamp() if first else 0.0)
+        yield depth
+        yield oldest
+
+
+QUEUE_REGISTRY = CollectorRegistry(auto_describe=False)  # no DB query at registration
+QUEUE_REGISTRY.register(IngestionQueueCollector())
+
+
+def process_registry() -> CollectorRegistry:
+    """This process's samples, or every process's with PROMETHEUS_MULTIPROC_DIR."""
+    if settings.PROMETHEUS_MULTIPROC_DIR:
+        from prometheus_client import multiprocess
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry, path=settings.PROMETHEUS_MULTIPROC_DIR)
+        return registry
+    from prometheus_client import REGISTRY
+
+    return REGISTRY
+
+
+def metrics(request):
+    """Expose on the internal network only: the scrape is unauthenticated, like /health/ready."""
+    body = generate_latest(process_registry()) + generate_latest(QUEUE_REGISTRY)
+    return HttpResponse(body, content_type=CONTENT_TYPE_LATEST)
@@ -24,6 +24,7 @@ from drf_spectacular.views import (
     SpectacularAPIView,
     SpectacularSwaggerView,
 )  # Needs internet
+from backend import health, metrics
 
 urlpatterns = [
     path("admin/", admin.site.urls),
@@ -32,6 +33,8 @@ urlpatterns = [
         lambda request: HttpResponse("Welcome to my API! Explore the endpoints."),
         name="welcome",
     ),
+    path("health/ready", health.ready, name="health-ready"),
+    path("metrics", metrics.metrics, name="metrics"),
     path("schema/", SpectacularAPIView.as_view(), name="schema"),
     path("swagger/", SpectacularSwaggerView.as_view(url_name="schema")),
     path("api/folder/", include("folders.urls")),
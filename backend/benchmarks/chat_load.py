@@ -0,0 +1,115 @@
+"""
+Load comparison of the chat endpoints: sync view under WSGI vs async view under ASGI.
+
+    cd backend
+    python -m benchmarks.fake_llm --port 8001 --tokens 200 --token-delay-ms 5     # stands in for Groq
+    export LLM_BASE_URL=http://127.0.0.1:8001 GROQ_API_KEY=fake
+    gunicorn backend.wsgi -b 127.0.0.1:8000 -w 1 --threads 16                     # one worker each
+    uvicorn backend.asgi:application --port 8002 --workers 1
+    python -m benchmarks.chat_load --token <JWT access> --folder <folder uuid> \\
+        --target wsgi=http://127.0.0.1:8000/api/chat/message/ \\
+        --target asgi=http://127.0.0.1:8002/api/chat/message/async/ \\
+        --concurrency 10 50 200 --json out.json
+
+Every target gets `--requests` chats at each concurrency level and reports
+throughput, p50 / p95 / p99 latency and errors. The fake LLM makes the model
+round trip dominate as it does in production (~1.3s here), so the WSGI
+worker tops out at --threads chats in flight while the ASGI worker keeps
+every request open. Repeat the query (default) to measure with the retrieval
+cache warm, or pass --distinct to send a new query each time. Give the load
+generator and the fake LLM their own cores: on a shared core they, not the
+server, set the ceiling.
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from pathlib import Path
+
+import httpx
+
+
+def _percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))] if values else None
+
+
+async def run_level(url, *, headers, payloads, concurrency, timeout) -> dict:
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, errors = [], {}
+
+    async with httpx.AsyncClient(limits=limits, timeout=timeout) as client:
+        async def one(payload):
+            async with semaphore:
+                t0 = time.perf_counter()
+                try:
+                    response = await client.post(url, json=payload, headers=headers)
+                    response.raise_for_status()
+                except httpx.HTTPError as exc:
+                    name = type(exc).__name__
+                    if isinstance(exc, httpx.HTTPStatusError):
+                        name = f"HTTP {exc.response.status_code}"
+                    errors[name] = errors.get(name, 0) + 1
+                    return
+                latencies.append(time.perf_counter() - t0)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(payload) for payload in payloads))
+        wall = time.perf_counter() - start
+
+    return {
+        "concurrency": concurrency,
+        "requests": len(payloads),
+        "ok": len(latencies),
+        "errors": errors,
+        "seconds": wall,
+        "throughput": len(latencies) / wall,
+        "p50": _percentile(latencies, 0.50),
+        "p95": _percentile(latencies, 0.95),
+        "p99": _percentile(latencies, 0.99),
+        "mean": statistics.fmean(latencies) if latencies else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target", action="append", required=True, help="name=url of a chat endpoint")
+    parser.add_argument("--token", required=True, help="JWT access token (api/auth/login/)")
+    parser.add_argument("--folder", required=True, help="folder uuid with indexed files")
+    parser.add_argument("--query", default="What did the Treaty of Mangalore settle?")
+    parser.add_argument("--distinct", action="store_true", help="number every query (retrieval cache misses)")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[10, 50, 200])
+    parser.add_argument("--requests", type=int, default=400, help="per target and concurrency level")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--json", type=Path, help="also write the results here")
+    args = parser.parse_args()
+
+    headers = {"Authorization": f"Bearer {args.token}"}
+    results = {}
+    for target in args.target:
+        name, url = target.split("=", 1)
+        results[name] = []
+        for concurrency in args.concurrency:
+            payloads = [
+                {"folder_id": args.folder, "query": f"{args.query} ({i})" if args.distinct else args.query}
+                for i in range(args.requests)
+            ]
+            level = asyncio.run(
+                run_level(url, headers=headers, payloads=payloads, concurrency=concurrency, timeout=args.timeout)
+            )
+            results[name].append(level)
+            p50, p99 = (f"{level[p]:.2f}s" if level[p] is not None else "n/a" for p in ("p50", "p99"))
+            print(
+                f"{name:<8} c={concurrency:<5} {level['throughput']:>8.1f} req/s  "
+                f"p50 {p50:>7}  p99 {p99:>7}  ok {level['ok']}/{level['requests']}"
+                + (f"  errors {level['errors']}" if level["errors"] else "")
+            )
+
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
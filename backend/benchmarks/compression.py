@@ -0,0 +1,125 @@
+"""
+Recall@k against bytes per chunk for the compression mode (vector/compression.py).
+
+    cd backend
+    python -m benchmarks.compression                            # MiniLM on the fixed corpus
+    python -m benchmarks.compression --embeddings vectors.npy --texts ../docs --json out.json
+
+Every codec (float16, int8) is run without and with a per-tenant PCA
+projection of each --pca size, fitted on the corpus itself as the exact
+store does. Recall is measured against an exact float32 search of the same
+vectors. Bytes are per stored vector row; float32 is what Chroma and
+pgvector keep. Chunk text is reported raw and zstd-compressed one chunk per
+frame, as the lexical index stores it in compression mode. The fixed corpus
+is very repetitive, so point --texts at real documents for a meaningful
+text ratio.
+"""
+import argparse
+import json
+from pathlib import Path
+
+import numpy as np
+
+from benchmarks.encoders import MODEL_NAME, fixed_corpus
+from vector.compression import CODECS, Projection, decode, dot, encode, row_dtype
+
+TEXT_CHUNK_CHARS = 1200  # roughly what the HybridChunker emits at 384 tokens
+
+
+def _texts_from(directory: Path) -> list[str]:
+    chunks = []
+    for path in sorted(directory.rglob("*")):
+        if path.suffix.lower() in (".md", ".txt"):
+            text = path.read_text(errors="ignore")
+            chunks += [text[i:i + TEXT_CHUNK_CHARS] for i in range(0, len(text), TEXT_CHUNK_CHARS)]
+    return [chunk for chunk in chunks if chunk.strip()]
+
+
+def _top_k(distances, k):
+    top = np.argpartition(distances, k - 1, axis=1)[:, :k]
+    return [set(row) for row in top]
+
+
+def vector_report(vectors, queries, *, k, pca_sizes) -> dict:
+    exact = _top_k(
+        np.square(queries).sum(1)[:, None] - 2 * queries @ vectors.T + np.square(vectors).sum(1)[None, :], k
+    )
+    results = {"float32": {"bytes_per_chunk": vectors.shape[1] * 4, f"recall_at_{k}": 1.0}}
+    for pca in [0] + list(pca_sizes):
+        projection = Projection.fit(vectors, pca) if pca else None
+        stored = projection.apply(vectors) if projection else vectors
+        probe = projection.apply(queries) if projection else queries
+        for codec in CODECS:
+            rows = encode(codec, stored)
+            norms = np.square(decode(codec, rows)).sum(1)
+            distances = norms[None, :] - 2 * np.stack([dot(codec, rows, q) for q in probe])
+            found = _top_k(distances, k)
+            recall = np.mean([len(a & b) / k for a, b in zip(exact, found)])
+            name = codec + (f"+pca{pca}" if pca else "")
+            results[name] = {
+                "bytes_per_chunk": row_dtype(codec, stored.shape[1]).itemsize,
+                f"recall_at_{k}": float(recall),
+            }
+    return results
+
+
+def text_report(texts, *, level) -> dict:
+    import zstandard
+
+    compressor = zstandard.ZstdCompressor(level=level)
+    raw = [len(text.encode("utf-8")) for text in texts]
+    packed = [len(compressor.compress(text.encode("utf-8"))) for text in texts]
+    return {
+        "chunks": len(texts),
+        "raw_bytes_per_chunk": float(np.mean(raw)),
+        "zstd_bytes_per_chunk": float(np.mean(packed)),
+        "ratio": sum(raw) / sum(packed),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus-size", type=int, default=5000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--pca", type=int, nargs="*", default=[192, 128, 96, 64])
+    parser.add_argument("--encoder", default="torch", help="vector/encoders.py backend used to embed the corpus")
+    parser.add_argument("--embeddings", type=Path, help=".npy of stored vectors; queries are taken from it")
+    parser.add_argument("--texts", type=Path, help="directory of .md/.txt files for the text report")
+    parser.add_argument("--zstd-level", type=int, default=6)
+    parser.add_argument("--json", type=Path, help="also write the results here")
+    args = parser.parse_args()
+
+    corpus = fixed_corpus(args.corpus_size)
+    rng = np.random.default_rng(0)
+    if args.embeddings:
+        vectors = np.load(args.embeddings).astype(np.float32)
+        picks = rng.choice(len(vectors), args.queries, replace=False)
+        queries = vectors[picks] + 0.05 * rng.standard_normal((args.queries, vectors.shape[1])).astype(np.float32)
+    else:
+        from vector.encoders import build_encoder
+
+        encoder = build_encoder(args.encoder, MODEL_NAME, export_dir="cache/onnx", quantization="avx2")
+        vectors = np.asarray(encoder.encode(corpus, batch_size=64), dtype=np.float32)
+        questions = [text.split(".")[0] for text in fixed_corpus(args.queries, seed=7)]
+        queries = np.asarray(encoder.encode(questions, batch_size=64), dtype=np.float32)
+
+    results = {
+        "vectors": vector_report(vectors, queries, k=args.k, pca_sizes=args.pca),
+        "text": text_report(_texts_from(args.texts) if args.texts else corpus, level=args.zstd_level),
+    }
+
+    print(f"{'layout':<18} {'bytes/chunk':>12} {'recall@' + str(args.k):>10}")
+    for name, stats in results["vectors"].items():
+        print(f"{name:<18} {stats['bytes_per_chunk']:>12} {stats[f'recall_at_{args.k}']:>10.3f}")
+    text = results["text"]
+    print(
+        f"\ntext: {text['raw_bytes_per_chunk']:.0f} → {text['zstd_bytes_per_chunk']:.0f} bytes/chunk "
+        f"with zstd -{args.zstd_level} ({text['ratio']:.2f}x, {text['chunks']} chunks)"
+    )
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Compare embedding backends on a fixed corpus.
+
+    cd backend
+    python -m benchmarks.encoders                      # torch vs onnx int8
+    python -m benchmarks.encoders --backends onnx --quantization avx512_vnni --json out.json
+
+For every backend it reports
+    - throughput: chunks/s when encoding the whole corpus in batches
+    - single-query latency: p50 / p99 over one-text encode() calls
+    - agreement: cosine similarity with the fp32 torch baseline (mean / min)
+"""
+import argparse
+import json
+import random
+import statistics
+import time
+from pathlib import Path
+
+import numpy as np
+
+from vector.encoders import build_encoder
+
+MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+
+_SUBJECTS = ["Tipu Sultan", "Haidar Ali", "the Treaty of Mangalore", "Alauddin Khilji", "the Mughal court",
+             "the East India Company", "Mahatma Gandhi", "the Vijayanagara empire", "the Maratha confederacy",
+             "the Battle of Plassey", "the Salt March", "Ashoka", "the Chola navy", "the Delhi Sultanate"]
+_VERBS = ["reformed", "negotiated with", "fought against", "taxed", "described", "rebuilt", "allied with",
+          "was defeated by", "wrote about", "expanded"]
+_OBJECTS = ["the revenue system", "coastal trade", "the southern frontier", "temple endowments",
+            "the cavalry", "regional governors", "foreign merchants", "the land survey", "village councils"]
+_TAILS = ["in the late eighteenth century.", "after a long siege.", "according to contemporary chronicles.",
+          "despite heavy losses.", "which changed the balance of power in the region.",
+          "as recorded in court documents.", "during a period of famine and unrest."]
+
+
+def fixed_corpus(size: int, seed: int = 13) -> list[str]:
+    """Deterministic history-flavoured sentences of roughly chunk-like length."""
+    rng = random.Random(seed)
+    corpus = []
+    for _ in range(size):
+        sentences = [
+            f"{rng.choice(_SUBJECTS)} {rng.choice(_VERBS)} {rng.choice(_OBJECTS)} {rng.choice(_TAILS)}"
+            for _ in range(rng.randint(2, 8))
+        ]
+        corpus.append(" ".join(sentences))
+    return corpus
+
+
+def _normalise(vectors: np.ndarray) -> np.ndarray:
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def run(encoder, corpus, queries, batch_size):
+    encoder.encode(corpus[:batch_size], batch_size=batch_size)  # warm-up: allocator, kernels, caches
+
+    t0 = time.perf_counter()
+    vectors = encoder.encode(corpus, batch_size=batch_size)
+    throughput = len(corpus) / (time.perf_counter() - t0)
+
+    latencies = []
+    for query in queries:
+        t0 = time.perf_counter()
+        encoder.encode([query], batch_size=1)
+        latencies.append((time.perf_counter() - t0) * 1000)
+    latencies.sort()
+
+    return np.asarray(vectors, dtype=np.float32), {
+        "throughput_chunks_per_s": throughput,
+        "latency_p50_ms": statistics.median(latencies),
+        "latency_p99_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", nargs="+", default=["torch", "onnx"])
+    parser.add_argument("--corpus-size", type=int, default=1000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--quantization", default="avx2")
+    parser.add_argument("--export-dir", default="cache/onnx")
+    parser.add_argument("--json", type=Path, help="also write the results here")
+    args = parser.parse_args()
+
+    corpus = fixed_corpus(args.corpus_size)
+    queries = [text.split(".")[0] for text in fixed_corpus(args.queries, seed=7)]
+
+    baseline = None
+    results = {}
+    for backend in ["torch"] + [b for b in args.backends if b != "torch"]:
+        encoder = build_encoder(backend, MODEL_NAME, export_dir=args.export_dir, quantization=args.quantization)
+        vectors, stats = run(encoder, corpus, queries, args.batch_size)
+        if baseline is None:
+            baseline = _normalise(vectors)
+        cosines = np.sum(_normalise(vectors) * baseline, axis=1)
+        stats["cosine_vs_fp32_mean"] = float(cosines.mean())
+        stats["cosine_vs_fp32_min"] = float(cosines.min())
+        if backend in args.backends:
+            results[encoder.name] = stats
+
+    print(f"{'encoder':<60} {'chunks/s':>10} {'p50 ms':>8} {'p99 ms':>8} {'cos mean':>9} {'cos min':>8}")
+    for name, stats in results.items():
+        print(
+            f"{name:<60} {stats['throughput_chunks_per_s']:>10.1f} {stats['latency_p50_ms']:>8.2f} "
+            f"{stats['latency_p99_ms']:>8.2f} {stats['cosine_vs_fp32_mean']:>9.4f} {stats['cosine_vs_fp32_min']:>8.4f}"
+        )
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
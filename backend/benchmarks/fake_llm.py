@@ -0,0 +1,201 @@
+"""
+Local stand-in for Groq / any OpenAI-compatible chat completions API.
+
+    cd backend
+    python -m benchmarks.fake_llm --port 8001 --tokens 200 --token-delay-ms 20
+    LLM_BASE_URL=http://127.0.0.1:8001 GROQ_API_KEY=fake python manage.py runserver
+
+Answers POST .../chat/completions (the Groq SDK calls /openai/v1/chat/completions,
+OpenAI clients /v1/chat/completions) with `--tokens` words, either as one JSON
+completion or, with "stream": true, as SSE chunks `--token-delay-ms` apart
+after `--first-token-delay-ms`, ending with usage and `data: [DONE]`. It
+prints one line per request, including streams the client closed early, so
+cancellation can be checked from the outside. No network, no API key.
+
+Faults, for the retry / circuit breaker logic of chat/llm_client.py
+(`python -m benchmarks.llm_faults` drives them):
+
+    --error-rate 0.3                          30% answered with --error-status (503)
+    --throttle-rate 0.5 --retry-after 0.2     50% answered 429 with that Retry-After
+    --stall-rate 0.2 --stall-seconds 5        20% wait that long before answering
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+WORDS = (
+    "The Treaty of Mangalore ended the Second Anglo-Mysore War in 1784 and restored "
+    "the conquered territories of both sides, a rare outcome in which the Company "
+    "negotiated from weakness while Tipu Sultan consolidated his hold on the coast"
+).split()
+
+
+def answer_tokens(count: int) -> list[str]:
+    return [WORDS[i % len(WORDS)] + " " for i in range(count)]
+
+
+class Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024  # the default backlog of 5 drops connections under load tests
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    options = None  # argparse namespace, set in main()
+    served = Counter()  # requests as they arrive, by fate: ok, error, throttled, stalled (answered late)
+    _served_lock = threading.Lock()
+
+    def log_message(self, format, *args):  # one line per completion instead
+        pass
+
+    def _log(self, message: str) -> None:
+        if not self.options.quiet:
+            print(message)
+
+    def _count(self, outcome: str) -> None:
+        with self._served_lock:
+            self.served[outcome] += 1
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self.send_error(404)
+            return
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        if self._inject_fault():
+            return
+        prompt_tokens = sum(len(str(message.get("content", "")).split()) for message in body.get("messages", []))
+        tokens = answer_tokens(self.options.tokens)
+        common = {"id": f"chatcmpl-{uuid.uuid4().hex}", "created": int(time.time()), "model": body.get("model", "fake")}
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": len(tokens),
+            "total_tokens": prompt_tokens + len(tokens),
+        }
+        if body.get("stream"):
+            self._stream(common, tokens, usage)
+        else:
+            time.sleep(self.options.first_token_delay_ms / 1000 + len(tokens) * self.options.token_delay_ms / 1000)
+            self._json({
+                **common,
+                "object": "chat.completion",
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": "".join(tokens)},
+                    "finish_reason": "stop",
+                }],
+                "usage": usage,
+            })
+            self._log(f"completion: {len(tokens)} tokens")
+
+    def _inject_fault(self) -> bool:
+        """Answer with an error or a 429, or stall first, as the fault rates say. True when answered."""
+        options = self.options
+        draw = random.random()
+        if draw < options.error_rate:
+            self._count("error")
+            self._log(f"fault: {options.error_status}")
+            self._json({"error": {"message": "injected fault", "type": "internal_server_error"}}, options.error_status)
+            return True
+        draw -= options.error_rate
+        if draw < options.throttle_rate:
+            self._count("throttled")
+            self._log(f"fault: 429, retry after {options.retry_after}s")
+            self._json(
+                {"error": {"message": "injected rate limit", "type": "rate_limit_exceeded"}},
+                429,
+                headers={"Retry-After": f"{options.retry_after:g}"},
+            )
+            return True
+        draw -= options.throttle_rate
+        if draw < options.stall_rate:
+            self._count("stalled")
+            self._log(f"fault: stall {options.stall_seconds}s")
+            time.sleep(options.stall_seconds)
+            return False
+        self._count("ok")
+        return False
+
+    def _json(self, payload, status=200, headers=None) -> None:
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        try:
+            self.wfile.write(data)
+        except (BrokenPipeError, ConnectionResetError):  # the client timed out while we stalled
+            pass
+
+    def _stream(self, common, tokens, usage) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        def event(delta, finish_reason=None, **extra):
+            chunk = {
+                **common,
+                "object": "chat.completion.chunk",
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+                **extra,
+            }
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            self.wfile.flush()
+
+        sent = 0
+        try:
+            time.sleep(self.options.first_token_delay_ms / 1000)
+            event({"role": "assistant", "content": ""})
+            for token in tokens:
+                event({"content": token})
+                sent += 1
+                time.sleep(self.options.token_delay_ms / 1000)
+            event({}, "stop", usage=usage, x_groq={"id": common["id"], "usage": usage})
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            self._log(f"stream: client closed after {sent}/{len(tokens)} tokens")
+            return
+        self._log(f"stream: {len(tokens)} tokens")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--tokens", type=int, default=200, help="words per answer")
+    parser.add_argument("--first-token-delay-ms", type=float, default=300)
+    parser.add_argument("--token-delay-ms", type=float, default=20)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction answered --error-status")
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="fraction answered 429")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After of the 429s, seconds")
+    parser.add_argument("--stall-rate", type=float, default=0.0, help="fraction that waits --stall-seconds first")
+    parser.add_argument("--stall-seconds", type=float, default=30.0)
+    parser.add_argument("--quiet", action="store_true", help="no line per request")
+    return parser
+
+
+def main():
+    args = build_parser().parse_args()
+
+    Handler.options = args
+    server = Server((args.host, args.port), Handler)
+    print(f"Fake LLM on http://{args.host}:{args.port} ({args.tokens} tokens per answer)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
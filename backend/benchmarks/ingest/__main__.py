@@ -0,0 +1,100 @@
+"""
+Ingestion benchmark: convert → chunk → embed → store on synthetic documents.
+
+    cd backend
+    python -m benchmarks.ingest run --json base.json                       # pdf, docx, md at 2/10/50 pages
+    python -m benchmarks.ingest run --formats pdf --pages 5 200 --warm --json new.json
+    python -m benchmarks.ingest compare base.json new.json --threshold 0.10
+
+`run` generates the documents (benchmarks/ingest/corpus.py), ingests each one
+through VectorStore.process_and_index into a temporary store and reports, per
+document and summed per format:
+    - wall time of every stage (the pipeline's own timings) and chunks/s
+    - peak RSS while the document was processing (VmHWM, reset per document)
+    - bytes written by the process (wchar), plus the final size of every store
+--warm ingests the corpus a second time under new file ids, so the embedding
+and conversion caches hit. Runs are offline: no network, no GPU.
+
+`compare` prints every summary metric side by side and exits 1 if any of
+them regressed beyond --threshold, so it can gate CI.
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+
+from loguru import logger
+
+from benchmarks.ingest.compare import compare
+from benchmarks.ingest.corpus import WRITERS
+
+
+def _run(args) -> None:
+    from benchmarks.ingest.run import run
+
+    logger.remove()
+    logger.add(sys.stderr, level=args.log_level)
+    report = run(formats=args.formats, pages=args.pages, backend=args.backend, warm=args.warm, keep=args.keep)
+
+    print(f"{'entry':<12} {'docs':>5} {'chunks':>7} {'convert':>8} {'chunk':>7} {'embed':>7} "
+          f"{'store':>7} {'total':>7} {'chunks/s':>9} {'peak RSS':>9} {'written':>9}")
+    for name, stats in report["summary"].items():
+        timings = stats["timings"]
+        print(
+            f"{name:<12} {stats['documents']:>5} {stats['chunks']:>7} {timings['convert']:>7.2f}s "
+            f"{timings['chunk']:>6.2f}s {timings['embed']:>6.2f}s {timings['store']:>6.2f}s "
+            f"{timings['total']:>6.2f}s {stats['chunks_per_second']:>9.1f} "
+            f"{stats['peak_rss_bytes'] / 2**20:>7.0f}MB {stats['bytes_written'] / 2**20:>7.1f}MB"
+        )
+    print("\n" + ", ".join(f"{name}: {size / 2**20:.1f}MB" for name, size in report["disk_bytes"].items()))
+    if args.json:
+        args.json.write_text(json.dumps(report, indent=2))
+
+
+def _compare(args) -> None:
+    rows = compare(
+        json.loads(args.baseline.read_text()),
+        json.loads(args.candidate.read_text()),
+        threshold=args.threshold,
+        min_seconds=args.min_seconds,
+    )
+    print(f"{'entry':<12} {'metric':<18} {'baseline':>14} {'candidate':>14} {'change':>8}")
+    for row in rows:
+        print(
+            f"{row['entry']:<12} {row['metric']:<18} {row['baseline']:>14.4g} {row['candidate']:>14.4g} "
+            f"{row['change']:>+7.1%}" + ("  REGRESSION" if row["regression"] else "")
+        )
+    regressions = [row for row in rows if row["regression"]]
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0%}")
+        sys.exit(1)
+    print("\nno regressions")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="generate the corpus, ingest it and report")
+    run.add_argument("--formats", nargs="+", choices=sorted(WRITERS), default=["pdf", "docx", "md"])
+    run.add_argument("--pages", type=int, nargs="+", default=[2, 10, 50], help="document sizes, in pages")
+    run.add_argument("--backend", default="chroma", help="VECTOR_BACKEND for the temporary store")
+    run.add_argument("--warm", action="store_true", help="ingest everything again with warm caches")
+    run.add_argument("--keep", type=Path, help="write the store and corpus here and keep them")
+    run.add_argument("--log-level", default="WARNING")
+    run.add_argument("--json", type=Path, help="also write the report here")
+    run.set_defaults(handler=_run)
+
+    diff = commands.add_parser("compare", help="flag regressions of a report against a baseline")
+    diff.add_argument("baseline", type=Path)
+    diff.add_argument("candidate", type=Path)
+    diff.add_argument("--threshold", type=float, default=0.10, help="relative change counted as a regression")
+    diff.add_argument("--min-seconds", type=float, default=0.05, help="ignore timing changes smaller than this")
+    diff.set_defaults(handler=_compare)
+
+    args = parser.parse_args()
+    args.handler(args)
+
+
+if __name__ == "__main__":
+    main()
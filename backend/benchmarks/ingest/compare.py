@@ -0,0 +1,54 @@
+"""
+Compare two ingestion reports and flag regressions.
+
+Only the "summary" sections are compared, entry by entry ("cold:pdf",
+"cold:all", ...). A metric regresses when it is worse than the baseline by
+more than `threshold` (relative) and, for timings, by more than
+`min_seconds` (absolute): small documents finish in tens of milliseconds,
+where scheduler noise alone exceeds any sensible relative threshold.
+"""
+
+# metric → True if larger is better
+METRICS = {
+    "timings.convert": False,
+    "timings.chunk": False,
+    "timings.embed": False,
+    "timings.store": False,
+    "timings.total": False,
+    "chunks_per_second": True,
+    "peak_rss_bytes": False,
+    "bytes_written": False,
+}
+
+
+def _get(entry, metric):
+    for key in metric.split("."):
+        entry = entry[key]
+    return entry
+
+
+def compare(baseline: dict, candidate: dict, *, threshold: float, min_seconds: float) -> list[dict]:
+    """[{"entry", "metric", "baseline", "candidate", "change", "regression"}] for every shared entry."""
+    rows = []
+    for name, base in baseline["summary"].items():
+        if name not in candidate["summary"]:
+            continue
+        new = candidate["summary"][name]
+        for metric, higher_is_better in METRICS.items():
+            old_value, new_value = _get(base, metric), _get(new, metric)
+            if not old_value:
+                continue
+            change = (new_value - old_value) / old_value
+            worse = -change if higher_is_better else change
+            regression = worse > threshold
+            if regression and metric.startswith("timings."):
+                regression = new_value - old_value > min_seconds
+            rows.append({
+                "entry": name,
+                "metric": metric,
+                "baseline": old_value,
+                "candidate": new_value,
+                "change": change,
+                "regression": regression,
+            })
+    return rows
@@ -0,0 +1,129 @@
+"""
+Synthetic documents of controlled size for the ingestion benchmark.
+
+    write_corpus(directory, formats=("pdf", "docx", "md"), pages=(2, 10, 50))
+        → [(format, pages, path)]
+
+Text comes from benchmarks.encoders.fixed_corpus (deterministic, history
+flavoured), laid out as sections of headings and paragraphs at roughly
+WORDS_PER_PAGE words per page, so the chunker sees realistic structure.
+PDFs are written by hand (one Helvetica text layer per page, no images),
+so nothing beyond python-docx is needed and docling has no OCR to do.
+"""
+import random
+from pathlib import Path
+
+from benchmarks.encoders import fixed_corpus
+
+WORDS_PER_PAGE = 450
+PDF_LINES_PER_PAGE = 48
+PDF_LINE_CHARS = 95
+
+
+def sections(pages: int, seed: int = 0) -> list[tuple[str, list[str]]]:
+    """[(heading, [paragraph])] totalling about `pages` pages of text."""
+    rng = random.Random(seed)
+    paragraphs = iter(fixed_corpus(pages * 12, seed=seed))
+    result, words = [], 0
+    while words < pages * WORDS_PER_PAGE:
+        body = [next(paragraphs) for _ in range(rng.randint(2, 5))]
+        words += sum(len(paragraph.split()) for paragraph in body)
+        result.append((f"Section {len(result) + 1}: {body[0].split(' according')[0].split(' in the')[0]}", body))
+    return result
+
+
+def write_markdown(path: Path, pages: int) -> None:
+    lines = [f"# Synthetic history notes ({pages} pages)", ""]
+    for heading, body in sections(pages):
+        lines += [f"## {heading}", ""]
+        for paragraph in body:
+            lines += [paragraph, ""]
+    path.write_text("\n".join(lines), encoding="utf-8")
+
+
+def write_docx(path: Path, pages: int) -> None:
+    from docx import Document  # python-docx, installed with docling
+
+    document = Document()
+    document.add_heading(f"Synthetic history notes ({pages} pages)", level=0)
+    for heading, body in sections(pages):
+        document.add_heading(heading, level=1)
+        for paragraph in body:
+            document.add_paragraph(paragraph)
+    document.save(str(path))
+
+
+def _pdf_escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def _wrap(text: str, width: int) -> list[str]:
+    lines, line = [], ""
+    for word in text.split():
+        if line and len(line) + 1 + len(word) > width:
+            lines.append(line)
+            line = word
+        else:
+            line = f"{line} {word}" if line else word
+    return lines + ([line] if line else [])
+
+
+def write_pdf(path: Path, pages: int) -> None:
+    """Minimal PDF 1.4: catalog, page tree, one font, one content stream per page."""
+    lines = []
+    for heading, body in sections(pages):
+        lines += [("heading", heading), ("text", "")]
+        for paragraph in body:
+            lines += [("text", line) for line in _wrap(paragraph, PDF_LINE_CHARS)] + [("text", "")]
+    page_lines = [lines[i:i + PDF_LINES_PER_PAGE] for i in range(0, len(lines), PDF_LINES_PER_PAGE)]
+
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # page tree, once the page object numbers are known
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold >>",
+    ]
+    kids = []
+    for chunk in page_lines:
+        ops = ["BT", "72 740 Td", "14 TL"]
+        for kind, text in chunk:
+            if text:
+                ops.append("/F2 12 Tf" if kind == "heading" else "/F1 10 Tf")
+                ops.append(f"({_pdf_escape(text)}) Tj")
+            ops.append("T*")
+        ops.append("ET")
+        stream = "\n".join(ops).encode("latin-1", errors="replace")
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            b"/Resources << /Font << /F1 3 0 R /F2 4 0 R >> >> /Contents %d 0 R >>" % (len(objects))
+        )
+        kids.append(len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+        b" ".join(b"%d 0 R" % kid for kid in kids), len(kids)
+    )
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    path.write_bytes(bytes(out))
+
+
+WRITERS = {"pdf": write_pdf, "docx": write_docx, "md": write_markdown}
+
+
+def write_corpus(directory: Path, *, formats, pages) -> list[tuple[str, int, Path]]:
+    directory.mkdir(parents=True, exist_ok=True)
+    documents = []
+    for fmt in formats:
+        for size in pages:
+            path = directory / f"synthetic-{size}p.{fmt}"
+            WRITERS[fmt](path, size)
+            documents.append((fmt, size, path))
+    return documents
@@ -0,0 +1,184 @@
+"""
+Drive VectorStore.process_and_index over a synthetic corpus and measure each document.
+
+Everything the store writes (chunk store, lexical index, text store, embedding
+and conversion caches) goes to a fresh temporary directory, so a run always
+starts cold and never touches the real indexes. Model weights are read from
+the local Hugging Face cache only: run the app (or the encoders benchmark)
+once with network access first.
+"""
+import os
+import platform
+import resource
+import shutil
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+from benchmarks.ingest.corpus import write_corpus
+
+STAGES = ("convert", "chunk", "embed", "store", "total")
+# directories of VectorStore state, relative to the run's temporary root
+STATE_DIRS = {
+    "LEXICAL_INDEX_DIR": "lexical",
+    "EXACT_INDEX_DIR": "exact",
+    "EMBEDDING_CACHE_DIR": "cache/embeddings",
+    "CONVERSION_CACHE_DIR": "cache/conversions",
+}
+
+
+def offline_environment() -> None:
+    """No downloads and no GPU, before anything imports torch or huggingface_hub."""
+    os.environ["HF_HUB_OFFLINE"] = "1"
+    os.environ["TRANSFORMERS_OFFLINE"] = "1"
+    os.environ["CUDA_VISIBLE_DEVICES"] = ""
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
+
+
+# ──────────────────────────────────────────────
+# Process counters (Linux /proc, with portable fallbacks)
+# ──────────────────────────────────────────────
+
+def reset_peak_rss() -> None:
+    """Start a new VmHWM window; a no-op where /proc/self/clear_refs is not writable."""
+    try:
+        with open("/proc/self/clear_refs", "w") as fh:
+            fh.write("5")
+    except OSError:
+        pass
+
+
+def peak_rss_bytes() -> int:
+    try:
+        with open("/proc/self/status") as fh:
+            for line in fh:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss  # since process start, not per window
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def bytes_written() -> int:
+    """Bytes passed to write() by this process so far (0 where /proc/self/io is missing)."""
+    try:
+        with open("/proc/self/io") as fh:
+            counters = dict(line.split(": ") for line in fh.read().splitlines())
+    except OSError:
+        return 0
+    return int(counters["wchar"])
+
+
+def disk_usage(directory: Path) -> int:
+    return sum(path.stat().st_size for path in directory.rglob("*") if path.is_file())
+
+
+# ──────────────────────────────────────────────
+# Run
+# ──────────────────────────────────────────────
+
+def _summary(documents) -> dict:
+    chunks = sum(doc["chunks"] for doc in documents)
+    timings = {stage: sum(doc["timings"][stage] for doc in documents) for stage in STAGES}
+    return {
+        "documents": len(documents),
+        "chunks": chunks,
+        "timings": timings,
+        "chunks_per_second": chunks / timings["total"] if timings["total"] else 0.0,
+        "peak_rss_bytes": max(doc["peak_rss_bytes"] for doc in documents),
+        "bytes_written": sum(doc["bytes_written"] for doc in documents),
+    }
+
+
+def run(*, formats, pages, backend, warm, keep=None) -> dict:
+    """
+    Ingest every generated document once (plus once more with warm caches if
+    `warm`) and return the report:
+        {"config", "load_seconds", "documents": [...], "disk_bytes",
+         "summary": {"cold:pdf" | ... | "cold:all" | "warm:all": totals}}
+    """
+    offline_environment()
+    import django
+
+    django.setup()
+    from django.conf import settings
+
+    root = Path(keep) if keep else Path(tempfile.mkdtemp(prefix="ingest-bench-"))
+    root.mkdir(parents=True, exist_ok=True)
+    for name, relative in STATE_DIRS.items():
+        setattr(settings, name, root / relative)
+    settings.VECTOR_BACKEND = backend
+
+    from vector.client import VectorStore
+
+    try:
+        corpus = write_corpus(root / "corpus", formats=formats, pages=pages)
+        store = VectorStore(chroma_path=str(root / "chroma"))
+        store.warm_up(("store", "encoder", "embedding_cache", "tokenizer", "chunker", "converter", "conversion_cache"))
+        status = store.status()
+        failed = {name: info["error"] for name, info in status.items() if info["error"]}
+        if failed:
+            raise RuntimeError(f"Could not load {failed} (models must already be in the local cache)")
+        user_id, folder_id = str(uuid.uuid4()), str(uuid.uuid4())
+
+        documents = []
+        for cache in ("cold", "warm") if warm else ("cold",):
+            for fmt, size, path in corpus:
+                reset_peak_rss()
+                written = bytes_written()
+                t0 = time.time()
+                report = store.process_and_index(
+                    file_path=str(path), file_id=str(uuid.uuid4()), user_id=user_id,
+                    folder_id=folder_id, ancestor_ids=[folder_id],
+                )
+                wall = time.time() - t0
+                timings = {stage: report["timings"].get(stage, 0.0) for stage in STAGES}
+                documents.append({
+                    "format": fmt,
+                    "pages": size,
+                    "cache": cache,
+                    "input_bytes": path.stat().st_size,
+                    "chunks": report["chunks"],
+                    "timings": timings,
+                    "chunks_per_second": report["chunks"] / wall if wall else 0.0,
+                    "stage_chunks_per_second": {
+                        stage: report["chunks"] / timings[stage] if timings[stage] else None
+                        for stage in ("chunk", "embed", "store")
+                    },
+                    "conversion_cached": report["conversion_cached"],
+                    "peak_rss_bytes": peak_rss_bytes(),
+                    "bytes_written": bytes_written() - written,
+                })
+
+        summary = {}
+        for cache in dict.fromkeys(doc["cache"] for doc in documents):
+            batch = [doc for doc in documents if doc["cache"] == cache]
+            summary[f"{cache}:all"] = _summary(batch)
+            for fmt in formats:
+                summary[f"{cache}:{fmt}"] = _summary([doc for doc in batch if doc["format"] == fmt])
+
+        return {
+            "config": {
+                "formats": list(formats),
+                "pages": list(pages),
+                "backend": backend,
+                "embedding_backend": settings.EMBEDDING_BACKEND,
+                "ingest_batch_size": store.ingest_batch_size(),
+                "chunk_text_compression": settings.CHUNK_TEXT_COMPRESSION,
+                "python": platform.python_version(),
+                "machine": f"{platform.system()} {platform.machine()}, {os.cpu_count()} cpus",
+            },
+            "load_seconds": {name: info["seconds"] for name, info in status.items() if info["loaded"]},
+            "documents": documents,
+            "summary": summary,
+            "disk_bytes": {
+                name: disk_usage(root / relative) for name, relative in {**STATE_DIRS, "chroma": "chroma"}.items()
+                if (root / relative).exists()
+            },
+        }
+    finally:
+        if not keep:
+            shutil.rmtree(root, ignore_errors=True)
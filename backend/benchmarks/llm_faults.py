@@ -0,0 +1,231 @@
+"""
+Fault-injection run of the LLM client (chat/llm_client.py): retries, Retry-After and the circuit breaker.
+
+    cd backend
+    python -m benchmarks.llm_faults [--calls 40] [--concurrency 8] [--json out.json]
+
+Serves benchmarks/fake_llm.py in-process on a free port, points chat.llm at
+it with short timeouts and backoff, and sends `--calls` chat.llm.generate
+calls per scenario, in order:
+
+    healthy     no faults                         every call answered, one request each
+    flaky       30% 503                           retried: (almost) every call answered
+    throttled   50% 429, Retry-After 0.2s         retried after the provider's delay
+    stall       20% no answer for 2s, timeout 0.5s  timeouts retried
+    outage      100% 503                          circuit opens, the rest fail fast (503)
+    recovery    no faults, after LLM_BREAKER_RESET  one trial call closes the circuit
+                                                  (one call at a time: beside the trial, calls fail fast)
+
+and reports answered / failed-fast / failed calls, upstream requests, retries
+and latency for each. Exits 1 when a scenario does not behave as described,
+so it can run in CI. No network, no API key.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from loguru import logger
+
+from benchmarks import fake_llm
+
+BREAKER_RESET = 1.0
+# short enough for a run of a few seconds, kept apart from a real deployment's settings
+ENVIRONMENT = {
+    "GROQ_API_KEY": "fake",
+    "LLM_TIMEOUT": "0.5",
+    "LLM_CALL_DEADLINE": "1.8",
+    "LLM_MAX_RETRIES": "2",
+    "LLM_RETRY_BASE_DELAY": "0.05",
+    "LLM_RETRY_MAX_DELAY": "1",
+    "LLM_BREAKER_FAILURES": "5",
+    "LLM_BREAKER_RESET": str(BREAKER_RESET),
+    "LLM_CACHE_ENABLED": "false",
+    "DJANGO_SETTINGS_MODULE": "backend.settings",
+}
+
+
+def scenarios(calls: int, concurrency: int) -> list[dict]:
+    """name, fake LLM faults, and the check: a list of what went wrong (empty: as expected)."""
+    retries = int(ENVIRONMENT["LLM_MAX_RETRIES"])
+    failures = int(ENVIRONMENT["LLM_BREAKER_FAILURES"])
+
+    def expect(*conditions):
+        return [message for ok, message in conditions if not ok]
+
+    return [
+        {
+            "name": "healthy",
+            "faults": {},
+            "check": lambda r: expect(
+                (r["ok"] == calls, "every call answered"),
+                (r["upstream"] == calls, "one request per call"),
+            ),
+        },
+        {
+            "name": "flaky",
+            "faults": {"error_rate": 0.3},
+            "check": lambda r: expect(
+                (r["ok"] >= 0.85 * calls, "at least 85% answered"),  # 3 503s in a row: 2.7% of calls
+                (r["retries"] > 0, "503s retried"),
+            ),
+        },
+        {
+            "name": "throttled",
+            "faults": {"throttle_rate": 0.5, "retry_after": 0.2},
+            "check": lambda r: expect(
+                (r["ok"] >= 0.7 * calls, "at least 70% answered"),  # 3 429s in a row: 12.5% of calls
+                (r["retries"] > 0, "429s retried"),
+                (r["max"] is not None and r["max"] >= 0.2, "Retry-After waited for"),
+            ),
+        },
+        {
+            "name": "stall",
+            "faults": {"stall_rate": 0.2, "stall_seconds": 2.0},
+            "check": lambda r: expect(
+                (r["ok"] >= 0.9 * calls, "at least 90% answered"),
+                (r["retries"] > 0, "timeouts retried"),
+                (r["max"] is not None and r["max"] < 2.0, "no call waited out a stall"),
+            ),
+        },
+        {
+            "name": "outage",
+            "faults": {"error_rate": 1.0},
+            "check": lambda r: expect(
+                (r["ok"] == 0, "nothing answered"),
+                (r["unavailable"] > 0, "calls failed fast once the circuit opened"),
+                (r["upstream"] <= (failures + concurrency) * (retries + 1), "upstream requests stopped"),
+                (r["circuit_open"] == 1, "circuit open at the end"),
+            ),
+        },
+        {
+            "name": "recovery",
+            "faults": {},
+            "wait": BREAKER_RESET,
+            "keep_breaker": True,
+            "concurrency": 1,
+            "check": lambda r: expect(
+                (r["ok"] == calls, "every call answered again"),
+                (r["circuit_open"] == 0, "circuit closed"),
+            ),
+        },
+    ]
+
+
+def _sample(name: str) -> float:
+    from prometheus_client import REGISTRY
+
+    return REGISTRY.get_sample_value(name) or 0.0
+
+
+def run_scenario(scenario, *, generate, breaker, calls, concurrency) -> dict:
+    options = fake_llm.Handler.options
+    for name, default in fake_llm.build_parser().parse_args([]).__dict__.items():
+        if name.endswith(("_rate", "_seconds", "retry_after", "_status")):
+            setattr(options, name, scenario["faults"].get(name, default))
+    if not scenario.get("keep_breaker"):
+        breaker.reset()
+    time.sleep(scenario.get("wait", 0))
+    fake_llm.Handler.served.clear()
+    retries_before = _sample("historick_llm_retries_total")
+
+    from chat.llm_client import LLMUnavailable
+
+    latencies, unavailable, errors = [], 0, {}
+    lock = threading.Lock()
+
+    def one(i):
+        nonlocal unavailable
+        t0 = time.perf_counter()
+        try:
+            generate(system_instruction="Answer briefly.", query=f"Question {i}", cache=False)
+        except LLMUnavailable:
+            with lock:
+                unavailable += 1
+            return
+        except Exception as exc:
+            with lock:
+                errors[type(exc).__name__] = errors.get(type(exc).__name__, 0) + 1
+            return
+        with lock:
+            latencies.append(time.perf_counter() - t0)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=scenario.get("concurrency", concurrency)) as pool:
+        list(pool.map(one, range(calls)))
+    latencies.sort()
+    report = {
+        "name": scenario["name"],
+        "faults": scenario["faults"],
+        "calls": calls,
+        "ok": len(latencies),
+        "unavailable": unavailable,
+        "errors": errors,
+        "upstream": sum(fake_llm.Handler.served.values()),
+        "served": dict(fake_llm.Handler.served),
+        "retries": int(_sample("historick_llm_retries_total") - retries_before),
+        "circuit_open": int(_sample("historick_llm_circuit_open")),
+        "seconds": time.perf_counter() - start,
+        "p50": latencies[len(latencies) // 2] if latencies else None,
+        "p99": latencies[min(len(latencies) - 1, int(0.99 * len(latencies)))] if latencies else None,
+        "max": latencies[-1] if latencies else None,
+        "mean": statistics.fmean(latencies) if latencies else None,
+    }
+    report["problems"] = scenario["check"](report)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=40, help="generate() calls per scenario")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--log-level", default="ERROR", help="loguru level (WARNING shows every retry)")
+    parser.add_argument("--json", type=Path, help="also write the results here")
+    args = parser.parse_args()
+
+    fake_llm.Handler.options = fake_llm.build_parser().parse_args(
+        ["--tokens", "20", "--first-token-delay-ms", "20", "--token-delay-ms", "0", "--quiet"]
+    )
+    server = fake_llm.Server(("127.0.0.1", 0), fake_llm.Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    os.environ.update(ENVIRONMENT, LLM_BASE_URL=f"http://127.0.0.1:{server.server_address[1]}")
+
+    import django
+
+    django.setup()
+    logger.remove()
+    logger.add(sys.stderr, level=args.log_level)
+    from chat import llm
+    from chat.llm_client import breaker
+
+    llm.console.quiet = True  # generate() pretty-prints every answer
+
+    print(f"{'scenario':<10} {'ok':>4} {'503':>4} {'failed':>6} {'upstream':>8} {'retries':>7} "
+          f"{'p50':>7} {'p99':>7}  result")
+    results = []
+    for scenario in scenarios(args.calls, args.concurrency):
+        report = run_scenario(
+            scenario, generate=llm.generate, breaker=breaker, calls=args.calls, concurrency=args.concurrency
+        )
+        results.append(report)
+        p50, p99 = (f"{report[p]:.2f}s" if report[p] is not None else "n/a" for p in ("p50", "p99"))
+        print(
+            f"{report['name']:<10} {report['ok']:>4} {report['unavailable']:>4} {sum(report['errors'].values()):>6} "
+            f"{report['upstream']:>8} {report['retries']:>7} {p50:>7} {p99:>7}  "
+            + ("ok" if not report["problems"] else "FAILED: " + "; ".join(report["problems"]))
+        )
+    server.shutdown()
+
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2))
+    if any(report["problems"] for report in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Semantic cache of chat answers per (user, folder, scope), for paraphrased questions.
+
+    "who was Haidar Ali"  ──► answer A, evidence [c17 | c3 c9 c17 c40 c41]
+    "tell me about Haider Ali"  ── cosine ≥ ANSWER_CACHE_THRESHOLD, same evidence ──► answer A, no LLM call
+
+An earlier answer is only reused when its question is similar enough *and*
+retrieval found the same evidence for the new one: the same prompt chunks
+in the same order, and the same set of top ANSWER_CACHE_EVIDENCE candidates
+around them (chat/views/chat.py retrieve). Similar wording alone would also
+match "when was X born" against "when did X die", and with a single prompt
+chunk the prompt alone is thin evidence; the wider candidate set shifts
+as soon as the questions ask for different things. Retrieval therefore
+still runs for every question; it is the LLM round trip that a hit skips.
+
+Each folder's entries are a float32 matrix of unit query vectors plus one
+int64 fingerprint per entry of its evidence, so a lookup is one
+matrix-vector product and a vectorized comparison, however many questions
+the folder has. Query vectors come from VectorStore.embed_query, the same
+(LRU-cached) embedding the dense search just used.
+
+Entries belong to one Folder.index_generation (see chat/retrieval_cache.py):
+once the folder's files change, lookups at the new generation miss and the
+first answer stored for it replaces the folder's entries. In memory, per
+process, bounded at ANSWER_CACHE_FOLDERS folders (least recently used out) x
+ANSWER_CACHE_FOLDER_ENTRIES answers (oldest out).
+"""
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from django.conf import settings
+from loguru import logger
+
+from backend import metrics
+from vector.client import vector_store
+
+
+def evidence_key(chunk_ids, evidence) -> tuple:
+    """The prompt's chunk ids in order, then the other retrieved candidates as a set."""
+    return tuple(chunk_ids) + tuple(sorted(set(evidence) - set(chunk_ids)))
+
+
+def evidence_fingerprint(key: tuple) -> int:
+    return hash(key)
+
+
+class FolderAnswers:
+    """(query vector, evidence, answer) entries of one folder generation; past `capacity` the oldest is replaced."""
+
+    def __init__(self, *, generation: int, dimension: int, capacity: int) -> None:
+        self.generation = generation
+        self.capacity = capacity
+        # rows grow by doubling up to capacity: most folders only ever see a few questions
+        self.vectors = np.zeros((min(16, capacity), dimension), dtype=np.float32)
+        self.evidence = np.zeros(len(self.vectors), dtype=np.int64)
+        self.evidence_keys: list[tuple] = []
+        self.answers: list[str] = []
+        self._next = 0
+
+    def find(self, vector, key: tuple, threshold: float) -> str | None:
+        size = len(self.answers)
+        if not size:
+            return None
+        scores = self.vectors[:size] @ vector
+        scores[self.evidence[:size] != evidence_fingerprint(key)] = -1.0
+        best = int(np.argmax(scores))
+        if scores[best] < threshold or self.evidence_keys[best] != key:
+            return None
+        logger.debug(f"Answer cache hit at similarity {scores[best]:.3f}")
+        return self.answers[best]
+
+    def add(self, vector, key: tuple, answer: str) -> None:
+        size = len(self.answers)
+        if size < self.capacity:
+            if size == len(self.vectors):
+                rows = min(2 * size, self.capacity)
+                self.vectors = np.resize(self.vectors, (rows, self.vectors.shape[1]))
+                self.evidence = np.resize(self.evidence, rows)
+            self.evidence_keys.append(None)
+            self.answers.append(None)
+            slot = size
+        else:
+            slot = self._next
+            self._next = (slot + 1) % self.capacity
+        self.vectors[slot] = vector
+        self.evidence[slot] = evidence_fingerprint(key)
+        self.evidence_keys[slot] = key
+        self.answers[slot] = answer
+
+
+_folders: OrderedDict[tuple, FolderAnswers] = OrderedDict()
+_lock = threading.Lock()
+
+
+def _unit_vector(query: str):
+    vector = np.asarray(vector_store.embed_query(query), dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def get(*, query, chunk_ids, evidence, user_id, folder_id, scope, index_generation) -> str | None:
+    """An earlier answer for a paraphrase of `query` backed by the same evidence, or None."""
+    if not settings.ANSWER_CACHE_ENABLED or not chunk_ids:
+        return None
+    vector = _unit_vector(query)
+    with _lock:
+        folder = _folders.get((user_id, folder_id, scope))
+        answer = None
+        if folder is not None and folder.generation == index_generation:
+            _folders.move_to_end((user_id, folder_id, scope))
+            answer = folder.find(vector, evidence_key(chunk_ids, evidence), settings.ANSWER_CACHE_THRESHOLD)
+    (metrics.ANSWER_CACHE_HITS if answer is not None else metrics.ANSWER_CACHE_MISSES).inc()
+    return answer
+
+
+def put(answer: str, *, query, chunk_ids, evidence, user_id, folder_id, scope, index_generation) -> None:
+    if not settings.ANSWER_CACHE_ENABLED or not chunk_ids:
+        return
+    vector = _unit_vector(query)
+    key = (user_id, folder_id, scope)
+    with _lock:
+        folder = _folders.get(key)
+        if folder is not None and folder.generation > index_generation:
+            return  # answered from evidence that is already out of date
+        if folder is None or folder.generation != index_generation or folder.vectors.shape[1] != len(vector):
+            folder = _folders[key] = FolderAnswers(
+                generation=index_generation, dimension=len(vector), capacity=settings.ANSWER_CACHE_FOLDER_ENTRIES
+            )
+        _folders.move_to_end(key)
+        folder.add(vector, evidence_key(chunk_ids, evidence), answer)
+        while len(_folders) > settings.ANSWER_CACHE_FOLDERS:
+            _folders.popitem(last=False)
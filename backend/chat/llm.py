@@ -1,30 +1,76 @@
 # from google import genai
 from loguru import logger
 import os
-from groq import Groq
+from groq import AsyncGroq, Groq
 from rich import print as rich_print
 from rich.pretty import Pretty
 from rich.console import Console
 from rich.syntax import Syntax
-from groq._types import omit
 from groq.types.chat.completion_create_params import ResponseFormatResponseFormatJsonObject
 console = Console()
+import asyncio
 import json
+import time
+import weakref
+
+import httpx
+from django.conf import settings
+
+from backend import metrics
+from chat import llm_client
+from chat.llm_cache import LLMResponseCache, request_key
 
 API_KEY=os.getenv("GROQ_API_KEY")
 logger.success("Loaded API KEY succesfully✨")
-client = Groq(api_key=API_KEY)
+# LLM_BASE_URL points the client at any OpenAI-compatible server (benchmarks/fake_llm.py in tests).
+# Timeouts, pool size and retries: chat/llm_client.py, which every call below goes through.
+client = Groq(
+    api_key=API_KEY, http_client=httpx.Client(limits=llm_client.connection_limits()), **llm_client.client_options()
+)
+# AsyncGroq pools connections on the event loop that first used them, so one client per loop:
+# uvicorn has one loop per worker, async views under WSGI get a fresh loop per request.
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def async_client() -> AsyncGroq:
+    loop = asyncio.get_running_loop()
+    if loop not in _async_clients:
+        _async_clients[loop] = AsyncGroq(
+            api_key=API_KEY,
+            http_client=httpx.AsyncClient(limits=llm_client.connection_limits()),
+            **llm_client.client_options(),
+        )
+    return _async_clients[loop]
+
+# Responses of generate() by request hash (chat/llm_cache.py), when LLM_CACHE_ENABLED
+response_cache = (
+    LLMResponseCache(path=settings.LLM_CACHE_PATH, ttl=settings.LLM_CACHE_TTL, max_bytes=settings.LLM_CACHE_MAX_BYTES)
+    if settings.LLM_CACHE_ENABLED
+    else None
+)
 
-def generate(schema=None,system_instruction="No system instruction provided",query="No query provided ")->str:
+
+def _record_usage(usage) -> None:
+    if usage:
+        metrics.LLM_PROMPT_TOKENS.observe(usage.prompt_tokens)
+        metrics.LLM_COMPLETION_TOKENS.observe(usage.completion_tokens)
+
+
+def generate(schema=None,system_instruction="No system instruction provided",query="No query provided ",cache=True)->str:
+    """
+    One completion. With LLM_CACHE_ENABLED, structured-output calls
+    (`schema`) run with temperature 0 and a fixed seed, and identical
+    temperature-0 requests are answered from the response cache
+    (cache=False skips it for this call). Sampled requests (chat answers at
+    temperature 1) are never cached: replaying one answer would freeze
+    what is meant to vary.
+    """
     if schema :
         content = f"Strictly generate the json output in the given format : {schema} on the topic : {query}"
-        response_format = ResponseFormatResponseFormatJsonObject(type="json_object")
     else:
         content = query
-        response_format = omit
-
-    completion = client.chat.completions.create(
-        model="meta-llama/llama-4-scout-17b-16e-instruct",
+    request = dict(
+        model=settings.LLM_MODEL,
         messages=[
             { "role": "system", "content": system_instruction},
             {"role": "user","content": content}
@@ -32,11 +78,34 @@ def generate(schema=None,system_instruction="No system instruction provided",que
         temperature=1,
         max_completion_tokens=8192,
         top_p=1,
-        stream=False,
-        response_format=response_format,
-        stop=None
     )
+    if schema:
+        request["response_format"] = ResponseFormatResponseFormatJsonObject(type="json_object")
+
+    key = None
+    if cache and response_cache is not None:
+        if schema:
+            request.update(temperature=0, seed=settings.LLM_CACHE_SEED)
+        if request["temperature"] == 0:
+            key = request_key(request)
+            cached = response_cache.get(key)
+            (metrics.LLM_CACHE_HITS if cached is not None else metrics.LLM_CACHE_MISSES).inc()
+            if cached is not None:
+                logger.debug(f"LLM response cache hit {key[:12]}")
+                return cached
+
+    t0 = time.time()
+    try:
+        with metrics.LLM_IN_FLIGHT.track_inprogress():
+            completion = llm_client.call(client.chat.completions.create, **request, stream=False, stop=None)
+    except Exception:
+        metrics.LLM_ERRORS.inc()
+        raise
+    metrics.LLM_SECONDS.observe(time.time() - t0)
+    _record_usage(completion.usage)
     response =  completion.choices[0].message.content
+    if key and response is not None:
+        response_cache.put(key, str(response))
     logger.debug("Model output:")
     try:
         data = json.loads(str(response))
@@ -46,3 +115,81 @@ def generate(schema=None,system_instruction="No system instruction provided",que
         console.print(response)
     return str(response)
 
+
+
+async def agenerate(system_instruction="No system instruction provided", query="No query provided ") -> str:
+    """generate() for async views: the request waits on the socket without holding a thread."""
+    t0 = time.time()
+    try:
+        with metrics.LLM_IN_FLIGHT.track_inprogress():
+            completion = await llm_client.acall(
+                async_client().chat.completions.create,
+                model=settings.LLM_MODEL,
+                messages=[
+                    {"role": "system", "content": system_instruction},
+                    {"role": "user", "content": query},
+                ],
+                temperature=1,
+                max_completion_tokens=8192,
+                top_p=1,
+                stream=False,
+            )
+    except Exception:
+        metrics.LLM_ERRORS.inc()
+        raise
+    metrics.LLM_SECONDS.observe(time.time() - t0)
+    _record_usage(completion.usage)
+    return str(completion.choices[0].message.content)
+
+def stream_generate(system_instruction="No system instruction provided", query="No query provided "):
+    """
+    Yield the answer as text deltas, as they arrive from the model (stream=True).
+    Closing the generator early (the HTTP client went away) closes the upstream
+    response, which is how a streamed completion is cancelled. Opening the
+    stream is retried like any call; once tokens flow, a failure is final.
+    The breaker learns the outcome when the stream ends: completed, or
+    broken by the provider (a cancelled stream says nothing either way).
+    """
+    with metrics.LLM_IN_FLIGHT.track_inprogress():  # until the stream ends or is closed
+        t0 = time.time()
+        try:
+            stream = llm_client.open_stream(
+                client.chat.completions.create,
+                model=settings.LLM_MODEL,
+                messages=[
+                    {"role": "system", "content": system_instruction},
+                    {"role": "user", "content": query},
+                ],
+                temperature=1,
+                max_completion_tokens=8192,
+                top_p=1,
+                stream=True,
+            )
+        except Exception:
+            metrics.LLM_ERRORS.inc()
+            raise
+
+        first_token = True
+        try:
+            for chunk in stream:
+                # Groq reports usage on the last chunk under x_groq, OpenAI-style servers as chunk.usage
+                x_groq = getattr(chunk, "x_groq", None)
+                _record_usage(getattr(chunk, "usage", None) or getattr(x_groq, "usage", None))
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta:
+                    if first_token:
+                        metrics.LLM_FIRST_TOKEN_SECONDS.observe(time.time() - t0)
+                        first_token = False
+                    yield delta
+            metrics.LLM_SECONDS.observe(time.time() - t0)
+            llm_client.stream_ended()
+        except GeneratorExit:
+            metrics.LLM_CANCELLED.inc()
+            logger.info(f"Streamed completion cancelled after {time.time() - t0:.2f}s")
+            raise
+        except Exception as exc:
+            metrics.LLM_ERRORS.inc()
+            llm_client.stream_ended(exc)
+            raise
+        finally:
+            stream.close()
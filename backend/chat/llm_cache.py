@@ -0,0 +1,137 @@
+"""
+Disk-backed cache of LLM responses, keyed by a hash of the full request.
+
+    <path>  (SQLite)
+        responses (key, response, size, created_at, accessed_at)
+
+request_key() hashes exactly what is sent to the provider (model, messages,
+sampling parameters, response format), so any change to the prompt, the
+schema or a parameter is a different entry. Entries older than `ttl`
+seconds are misses and get deleted; past `max_bytes` of stored responses the
+least recently read ones are dropped. hits / misses are counted per process
+(stats()). The Flask app keeps a copy in api/src/llm_cache.py.
+"""
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from loguru import logger
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    response TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS responses_accessed ON responses(accessed_at);
+"""
+
+
+def request_key(request: dict) -> str:
+    """sha256 of the request as JSON with sorted keys (schemas and other objects via str())."""
+    return hashlib.sha256(json.dumps(request, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+class LLMResponseCache:
+    def __init__(self, *, path, ttl: float, max_bytes: int) -> None:
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._path = Path(path)
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()  # sqlite connections stay on their own thread
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        (self._bytes,) = self._connect().execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()
+
+    def _connect(self) -> sqlite3.Connection:
+        if not hasattr(self._local, "conn"):
+            conn = sqlite3.connect(self._path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            self._local.conn = conn
+        return self._local.conn
+
+    def _count(self, hit: bool) -> None:
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def get(self, key: str) -> str | None:
+        conn = self._connect()
+        row = conn.execute("SELECT response, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+        now = time.time()
+        if row is None or now - row[1] > self.ttl:
+            if row is not None:
+                with conn:
+                    conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self._count(False)
+            return None
+        with conn:
+            conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+        self._count(True)
+        return row[0]
+
+    def put(self, key: str, response: str) -> None:
+        size = len(response.encode("utf-8"))
+        now = time.time()
+        conn = self._connect()
+        with conn:
+            # a replaced entry (a concurrent miss for the same request) gives its bytes back
+            (replaced,) = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses WHERE key = ?", (key,)).fetchone()
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, response, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (key, response, size, now, now),
+            )
+        with self._lock:
+            self._bytes += size - replaced
+            over = self._bytes > self.max_bytes
+        if over:
+            self.trim()
+
+    def trim(self) -> None:
+        """Drop expired entries, then least recently read ones down to 90% of max_bytes."""
+        conn = self._connect()
+        with conn:
+            conn.execute("DELETE FROM responses WHERE created_at < ?", (time.time() - self.ttl,))
+            # other processes write here too: start from the real total, not this process's estimate
+            (total,) = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()
+            excess = total - int(self.max_bytes * 0.9)
+            dropped = 0
+            if excess > 0:
+                for key, size in conn.execute("SELECT key, size FROM responses ORDER BY accessed_at").fetchall():
+                    conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    total -= size
+                    dropped += 1
+                    if total <= self.max_bytes * 0.9:
+                        break
+        with self._lock:
+            self._bytes = total
+        if dropped:
+            logger.info(f"LLM cache trimmed {dropped} entries, {total / 2**20:.1f}MB left")
+
+    def clear(self) -> None:
+        conn = self._connect()
+        with conn:
+            conn.execute("DELETE FROM responses")
+        with self._lock:
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        (entries,) = self._connect().execute("SELECT count(*) FROM responses").fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else None,
+            "entries": entries,
+            "bytes": self._bytes,
+        }
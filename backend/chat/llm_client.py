@@ -0,0 +1,269 @@
+"""
+Retries, backoff and circuit breaking around the chat completions API (chat/llm.py).
+
+    call(create, **request)          sync: generate
+    open_stream(create, **request)   sync: stream_generate, which reports the end of the stream (stream_ended)
+    await acall(acreate, **request)  async: agenerate
+
+Every call:
+    breaker open?        ── yes ──► LLMUnavailable (503) at once, no request sent
+    create(**request)    ── 429 / 5xx / timeout / connection error ──► sleep, try again
+                            (at most LLM_MAX_RETRIES times, within LLM_CALL_DEADLINE)
+    outcome              ──► breaker
+
+The wait before a retry is the provider's Retry-After (or retry-after-ms)
+when it sends one, else "full jitter" exponential backoff: uniform in
+[0, LLM_RETRY_BASE_DELAY * 2**attempt], capped at LLM_RETRY_MAX_DELAY. A
+Retry-After longer than that cap is not waited for: the call fails at once.
+All attempts of a call share LLM_CALL_DEADLINE: each one's timeout is capped
+by what is left of it, and a retry whose wait would run past it is not made.
+
+After LLM_BREAKER_FAILURES calls in a row fail on the provider's side
+(5xx, timeouts, connection errors, after their retries; for a stream, also
+a connection lost or a provider error after the first tokens), the breaker opens
+and every call fails fast for LLM_BREAKER_RESET seconds. One trial call then
+goes through: success closes the breaker, failure opens it again. Rate
+limits (429) are retried but never open it: the provider is up, we are over
+quota. A provider stall therefore costs a handful of timeouts, not every
+worker thread.
+
+The clients (built in chat/llm.py from client_options() and
+connection_limits()) pool connections, at most LLM_MAX_CONNECTIONS each, with
+LLM_TIMEOUT per attempt (between chunks when streaming). A call that waits more
+than LLM_POOL_TIMEOUT for a free connection is rejected as busy (503), neither
+retried nor counted against the provider.
+`python -m benchmarks.llm_faults` runs all of this against the fault-injecting
+fake LLM.
+"""
+import asyncio
+import email.utils
+import random
+import threading
+import time
+
+import groq
+import httpx
+from django.conf import settings
+from loguru import logger
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+from backend import metrics
+
+
+class LLMUnavailable(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = "The language model is unavailable right now, try again shortly."
+    default_code = "llm_unavailable"
+
+
+# ──────────────────────────────────────────────
+# Clients
+# ──────────────────────────────────────────────
+
+def client_options() -> dict:
+    """Keyword arguments for Groq / AsyncGroq: pooled connections, timeouts, and no SDK-level retries."""
+    return {
+        "base_url": settings.LLM_BASE_URL or None,
+        "timeout": httpx.Timeout(
+            settings.LLM_TIMEOUT, connect=settings.LLM_CONNECT_TIMEOUT, pool=settings.LLM_POOL_TIMEOUT
+        ),
+        "max_retries": 0,  # retried here instead, in step with the breaker
+    }
+
+
+def connection_limits() -> httpx.Limits:
+    metrics.LLM_CONCURRENCY_LIMIT.set(settings.LLM_MAX_CONNECTIONS)
+    return httpx.Limits(
+        max_connections=settings.LLM_MAX_CONNECTIONS, max_keepalive_connections=settings.LLM_MAX_CONNECTIONS
+    )
+
+
+# ──────────────────────────────────────────────
+# Circuit breaker
+# ──────────────────────────────────────────────
+
+class CircuitBreaker:
+    """closed → (failure_threshold failures in a row) → open → (reset_timeout) → one trial → closed | open."""
+
+    def __init__(self, *, failure_threshold: int, reset_timeout: float) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()  # held for a few instructions only: fine on the event loop too
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+        metrics.LLM_CIRCUIT_OPEN.set(0)
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            now = time.monotonic()
+            if now - self.opened_at < self.reset_timeout:
+                return False
+            # this caller is the trial; the others keep failing fast for another reset_timeout,
+            # so a trial that never reports back (cancelled) only delays the next one
+            self.opened_at = now
+            return True
+
+    def record(self, ok: bool) -> None:
+        with self._lock:
+            if ok:
+                if self.opened_at is not None:
+                    logger.info("LLM circuit closed")
+                self.failures = 0
+                self.opened_at = None
+            else:
+                self.failures += 1
+                if self.opened_at is None and self.failures >= self.failure_threshold:
+                    logger.warning(f"LLM circuit open after {self.failures} failed calls in a row")
+                if self.opened_at is not None or self.failures >= self.failure_threshold:
+                    self.opened_at = time.monotonic()
+            is_open = self.opened_at is not None
+        metrics.LLM_CIRCUIT_OPEN.set(1 if is_open else 0)
+
+
+breaker = CircuitBreaker(failure_threshold=settings.LLM_BREAKER_FAILURES, reset_timeout=settings.LLM_BREAKER_RESET)
+
+
+# ──────────────────────────────────────────────
+# Retry policy
+# ──────────────────────────────────────────────
+
+def is_pool_timeout(exc: Exception) -> bool:
+    """No free connection in our own pool: local saturation, not a provider failure."""
+    return isinstance(exc, groq.APITimeoutError) and isinstance(exc.__cause__, httpx.PoolTimeout)
+
+
+def is_provider_failure(exc: Exception) -> bool:
+    if is_pool_timeout(exc):
+        return False
+    return isinstance(exc, (groq.InternalServerError, groq.APIConnectionError))  # APITimeoutError included
+
+
+def retry_after(exc: Exception) -> float | None:
+    """Seconds the provider asked us to wait (Retry-After as ms, seconds or HTTP date), or None."""
+    response = getattr(exc, "response", None)
+    if response is None:
+        return None
+    headers = response.headers
+    try:
+        return float(headers["retry-after-ms"]) / 1000
+    except (KeyError, ValueError):
+        pass
+    value = headers.get("retry-after")
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        date = email.utils.parsedate_tz(value)
+        return max(0.0, email.utils.mktime_tz(date) - time.time()) if date else None
+
+
+def retry_delay(exc: Exception, attempt: int) -> float | None:
+    """Seconds to wait before retry number `attempt + 1` of a call that raised `exc`, or None: give up."""
+    if attempt >= settings.LLM_MAX_RETRIES:
+        return None
+    if not (isinstance(exc, groq.RateLimitError) or is_provider_failure(exc)):
+        return None  # 400, 401, ...: the same request would fail again
+    delay = retry_after(exc)
+    if delay is None:
+        return random.uniform(0, min(settings.LLM_RETRY_MAX_DELAY, settings.LLM_RETRY_BASE_DELAY * 2**attempt))
+    return delay if delay <= settings.LLM_RETRY_MAX_DELAY else None
+
+
+def _admit() -> None:
+    if not breaker.allow():
+        metrics.LLM_REJECTED_CIRCUIT.inc()
+        raise LLMUnavailable()
+
+
+def _attempt_timeout(deadline: float) -> httpx.Timeout:
+    """client_options()'s timeouts, capped by the time left until `deadline` (time.monotonic())."""
+    left = max(0.001, deadline - time.monotonic())
+    return httpx.Timeout(
+        min(settings.LLM_TIMEOUT, left), connect=min(settings.LLM_CONNECT_TIMEOUT, left), pool=settings.LLM_POOL_TIMEOUT
+    )
+
+
+def _failed(exc: Exception, attempt: int, deadline: float) -> float | None:
+    """The wait before the next attempt; None after recording the final outcome (the caller re-raises)."""
+    if is_pool_timeout(exc):
+        metrics.LLM_REJECTED_BUSY.inc()
+        raise LLMUnavailable("Too many language model calls in flight, try again shortly.") from exc
+    delay = retry_delay(exc, attempt)
+    if delay is not None and time.monotonic() + delay >= deadline:
+        logger.warning(f"LLM call failed ({type(exc).__name__}), no time left for a retry")
+        delay = None
+    if delay is None:
+        breaker.record(ok=not is_provider_failure(exc))
+        return None
+    metrics.LLM_RETRIES.inc()
+    logger.warning(f"LLM call failed ({type(exc).__name__}), retry {attempt + 1} in {delay:.2f}s")
+    return delay
+
+
+def _call(create, request: dict, *, record_success: bool):
+    _admit()
+    deadline = time.monotonic() + settings.LLM_CALL_DEADLINE
+    attempt = 0
+    while True:
+        try:
+            result = create(**request, timeout=_attempt_timeout(deadline))
+        except Exception as exc:
+            delay = _failed(exc, attempt, deadline)
+            if delay is None:
+                raise
+            time.sleep(delay)
+            attempt += 1
+            continue
+        if record_success:
+            breaker.record(ok=True)
+        return result
+
+
+def call(create, /, **request):
+    """`create(**request)` (a Groq client method) with retries, behind the breaker."""
+    return _call(create, request, record_success=True)
+
+
+def open_stream(create, /, **request):
+    """
+    call() for stream=True requests. An open stream is not a success yet:
+    the caller reports how it ended with stream_ended().
+    """
+    return _call(create, request, record_success=False)
+
+
+def is_stream_failure(exc: Exception) -> bool:
+    """A stream broken on the provider's side: connection lost or timed out (raw httpx errors), or an error event."""
+    return isinstance(exc, (httpx.TransportError, groq.APIError)) and not is_pool_timeout(exc)
+
+
+def stream_ended(exc: Exception | None = None) -> None:
+    """Record the outcome of a stream from open_stream(): None when it completed, else what it raised."""
+    breaker.record(ok=exc is None or not is_stream_failure(exc))
+
+
+async def acall(create, /, **request):
+    """call() for AsyncGroq methods: waits between attempts without blocking the event loop."""
+    _admit()
+    deadline = time.monotonic() + settings.LLM_CALL_DEADLINE
+    attempt = 0
+    while True:
+        try:
+            result = await create(**request, timeout=_attempt_timeout(deadline))
+        except Exception as exc:
+            delay = _failed(exc, attempt, deadline)
+            if delay is None:
+                raise
+            await asyncio.sleep(delay)
+            attempt += 1
+            continue
+        breaker.record(ok=True)
+        return result
@@ -0,0 +1,44 @@
+"""
+Cache of retrieval results (chunk ids, texts, and the answer cache's evidence ids)
+per (user, folder, scope, normalized query, k, index generation).
+
+Folder.index_generation is bumped every time the folder's searchable chunks
+change (upload, re-index batch, delete — folders/signals.py, folders/jobs.py),
+and the bump reaches every folder above too (their subtree results changed),
+so a new generation simply misses and old entries age out via TTL / culling.
+Nothing is ever invalidated explicitly.
+
+Backed by the Django cache alias "retrieval" (settings.RETRIEVAL_CACHE_BACKEND):
+    "memory" → LocMemCache, per process
+    "file"   → FileBasedCache under VECTOR_CACHE_DIR, shared by every worker on the host
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import caches
+from loguru import logger
+
+
+def normalize_query(query: str) -> str:
+    """Case, spacing and trailing punctuation do not change what gets retrieved."""
+    return " ".join(query.lower().split()).rstrip("?!. ")
+
+
+def cache_key(*, user_id, folder_id, scope, query, k, index_generation) -> str:
+    # retrieval settings are part of the key: flipping one must not serve old results
+    mode = f"{'hybrid' if settings.HYBRID_RETRIEVAL else 'dense'}-{'rerank' if settings.RERANK_ENABLED else 'plain'}"
+    digest = hashlib.sha1(normalize_query(query).encode("utf-8")).hexdigest()
+    return (
+        f"retrieval:v3:{user_id}:{folder_id}:{scope}:{index_generation}:{mode}:"
+        f"{k}x{settings.ANSWER_CACHE_EVIDENCE}:{digest}"
+    )
+
+
+def get(**key_parts) -> tuple[list[str], list[str], list[str]] | None:
+    chunks = caches["retrieval"].get(cache_key(**key_parts))
+    logger.debug(f"Retrieval cache {'hit' if chunks is not None else 'miss'}")
+    return chunks
+
+
+def put(ids: list[str], chunks: list[str], evidence: list[str], **key_parts) -> None:
+    caches["retrieval"].set(cache_key(**key_parts), (ids, chunks, evidence))
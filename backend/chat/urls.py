@@ -12,4 +12,6 @@ urlpatterns = [
     # path("evaluate_answers/",general_views.EvaluateAnswersAPIView.as_view(),name="evaluate-answers"),
 
     path("message/",chat_views.ChatAPIView.as_view(),name="chat-message"),
+    path("message/stream/",chat_views.ChatStreamAPIView.as_view(),name="chat-message-stream"),
+    path("message/async/",chat_views.ChatAsyncView.as_view(),name="chat-message-async"),
 ]
\ No newline at end of file
@@ -21,6 +21,7 @@ from .helper import generate_story
 # from generator.llm.main import generate_story
 from .helper import text_to_speech
 import helper
+from backend import metrics
 SIMILARITY_THRESHOLD = 0.2
 THREADS = 6 # 4 was working fine
 FONT_PATH = r"C:\Windows\Fonts\arial.ttf"
@@ -149,7 +150,8 @@ def create_final_video(
     logger.success(f"Final video created successfully: {output_path}")
 
 def generate_video(title:str,query: str):
-    story: str = generate_story(query)
+    with metrics.VIDEO_STAGE_SECONDS.labels("story").time():
+        story: str = generate_story(query)
     sentences_list = [s.strip() for s in story.split('.') if s.strip()]
     sentences = tuple(enumerate(sentences_list))
     sentence_data = list()
@@ -160,7 +162,8 @@ def generate_video(title:str,query: str):
         safe_name = re.sub(r"[^\w]+", "_", sentence)
         audio_file_path = AUDIO_DIR / f"{idx}_{safe_name}.wav"
 
-        text_to_speech(sentence, str(audio_file_path))
+        with metrics.VIDEO_STAGE_SECONDS.labels("speech").time():
+            text_to_speech(sentence, str(audio_file_path))
 
         # ---------- NLP ----------
         clean_sentence = re.sub(r"[^\w\s]", "", sentence)
@@ -175,7 +178,8 @@ def generate_video(title:str,query: str):
             logger.info(f"[{idx}] High proper-noun density → using image")
             use_image = True
         else:
-            ok = get_pexels_video(sentence, str(video_file_path))
+            with metrics.VIDEO_STAGE_SECONDS.labels("media").time():
+                ok = get_pexels_video(sentence, str(video_file_path))
             if not ok or not video_file_path.exists():
                 logger.warning(f"[{idx}] Video fetch failed → falling back to image")
                 use_image = True
@@ -184,7 +188,8 @@ def generate_video(title:str,query: str):
                     frame_path = VIDEO_DIR / f"{idx}_frame.jpg"
                     helper.extract_first_frame(video_file_path, frame_path)
 
-                    caption = generate_caption(frame_path)
+                    with metrics.VIDEO_STAGE_SECONDS.labels("caption").time():
+                        caption = generate_caption(frame_path)
                     similarity = helper.sentence_similarity(sentence, caption)
 
                     logger.info(f"[{idx}] Caption: {caption} | Similarity: {similarity:.3f}")
@@ -196,7 +201,8 @@ def generate_video(title:str,query: str):
 
         if use_image:
             image_base_path = IMAGE_DIR / f"{idx}_{safe_name}"
-            ok, saved_image_path = get_google_image(sentence, str(image_base_path))
+            with metrics.VIDEO_STAGE_SECONDS.labels("media").time():
+                ok, saved_image_path = get_google_image(sentence, str(image_base_path))
 
             if not ok or not saved_image_path or not Path(saved_image_path).exists():
                 logger.error(f"[{idx}] Image fallback failed → skipping segment")
@@ -216,10 +222,11 @@ def generate_video(title:str,query: str):
 
     from pprint import pprint
     pprint(sentence_data)
-    create_final_video(
-        sentence_data=sentence_data,
-        output_path=VIDEO_DIR / f"final_video_{title}.mp4",
-    )
+    with metrics.VIDEO_STAGE_SECONDS.labels("render").time():
+        create_final_video(
+            sentence_data=sentence_data,
+            output_path=VIDEO_DIR / f"final_video_{title}.mp4",
+        )
 
 if __name__ == "__main__":
     generate_video("SherlockHolmes","Sherlock Holmes 100 words story")
\ No newline at end of file
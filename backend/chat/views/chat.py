@@ -1,15 +1,38 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework import status
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+from rest_framework import exceptions, status
 from drf_spectacular.utils import extend_schema
+from asgiref.sync import sync_to_async
+from django.core.exceptions import ValidationError
+from django.http import JsonResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.conf import settings
 from django.db import transaction
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from concurrent.futures import ThreadPoolExecutor
 from loguru import logger
+import asyncio
+import json
+import time
 
+from backend import metrics
 from folders.models import Folder
 from chat.models import Notebook, Message
 from vector.client import vector_store
-from chat.llm import generate
+from chat.llm import agenerate, generate, stream_generate
+from chat.llm_client import LLMUnavailable
+from chat import answer_cache, retrieval_cache
+
+CONTEXT_CHUNKS = 1  # chunks that end up in the prompt
+SCOPES = ("folder", "subtree")  # the folder's own files, or everything under it
+# Retrieval (query embedding, ANN search, BM25) is the only CPU work of the async chat view;
+# it runs here so it never blocks the event loop nor queues behind the ORM's single thread.
+RETRIEVAL_POOL = ThreadPoolExecutor(max_workers=settings.ASYNC_RETRIEVAL_THREADS, thread_name_prefix="retrieval")
 
 
 # ──────────────────────────────────────────────
@@ -30,22 +53,65 @@ def get_notebook_for_folder(folder: Folder) -> Notebook:
             logger.info("Created new notebook %s for folder %s", notebook.id, folder.id)
         return notebook
 
-def retrieve_context_for_query(user_id: str, folder_id: str, query: str) -> str:
+def retrieve(
+    user_id: str, folder_id: str, query: str, index_generation: int, scope: str = "folder"
+) -> tuple[list[str], list[str], list[str]]:
     """
-    Query the vector store and return the top-k chunks joined as a single
-    context string.  Returns an empty string when nothing is found so that
-    the caller can decide how to handle it.
+    (ids, texts) of the top CONTEXT_CHUNKS chunks for `query`, best first,
+    plus the ids of the top ANSWER_CACHE_EVIDENCE candidates they were
+    picked from: the evidence the answer cache compares.
+    Uses BM25 + dense fusion unless HYBRID_RETRIEVAL is off. With
+    RERANK_ENABLED a wider candidate set is fetched and a cross-encoder
+    ranks it.
+    scope="subtree" also searches every subfolder, still as one filtered search.
+    Repeated questions are answered from the retrieval cache until the
+    folder's index_generation moves on.
     """
-    results = vector_store.query(
+    key_parts = dict(
+        user_id=user_id,
+        folder_id=folder_id,
+        scope=scope,
+        query=query,
+        k=CONTEXT_CHUNKS,
+        index_generation=index_generation,
+    )
+    t0 = time.time()
+    cached = retrieval_cache.get(**key_parts)
+    if cached is not None:
+        metrics.RETRIEVAL_SECONDS.labels("cache").observe(time.time() - t0)
+        return cached
+
+    evidence_k = max(CONTEXT_CHUNKS, settings.ANSWER_CACHE_EVIDENCE)
+    path = ("hybrid" if settings.HYBRID_RETRIEVAL else "dense") + ("+rerank" if settings.RERANK_ENABLED else "")
+    search = vector_store.hybrid_query if settings.HYBRID_RETRIEVAL else vector_store.query
+    results = search(
         user_id=user_id,
         folder_id=folder_id,
         query=query,
-        k=1,
+        scope=scope,
+        k=settings.RERANK_CANDIDATES if settings.RERANK_ENABLED else evidence_k,
     )
-    documents = results.get("documents", [[]])
-    chunks = documents[0] if documents else []
+    if settings.RERANK_ENABLED:
+        results = vector_store.rerank(
+            query=query,
+            results=results,
+            k=evidence_k,
+            budget=settings.RERANK_BUDGET_MS / 1000,
+        )
+    evidence = results["ids"][0] if results.get("ids") else []
+    ids = evidence[:CONTEXT_CHUNKS]
+    chunks = results["documents"][0][:CONTEXT_CHUNKS] if results.get("documents") else []
+    metrics.RETRIEVAL_SECONDS.labels(path).observe(time.time() - t0)
     logger.debug(f"Retrieved {len(chunks)} chunks for query")
-    return "\n".join(chunks)
+    if results.get("reranked", True):  # a budget fallback should get another chance next time
+        retrieval_cache.put(ids, chunks, evidence, **key_parts)
+    return ids, chunks, evidence
+
+
+def retrieve_with_cached_answer(**key_parts) -> tuple[list[str], list[str], list[str], str | None]:
+    """`retrieve`, plus the answer cache's answer for this evidence (or None), in one call for RETRIEVAL_POOL."""
+    chunk_ids, chunks, evidence = retrieve(**key_parts)
+    return chunk_ids, chunks, evidence, answer_cache.get(chunk_ids=chunk_ids, evidence=evidence, **key_parts)
 
 
 def build_refined_prompt(context: str) -> str:
@@ -63,6 +129,20 @@ def build_refined_prompt(context: str) -> str:
     return refined_prompt
 
 
+def chat_request_error(folder_id, query: str, scope: str) -> str | None:
+    """Why a chat request cannot be answered, or None."""
+    if not folder_id or not query:
+        return "Both 'folder_id' and 'query' are required."
+    if scope not in SCOPES:
+        return f"'scope' must be one of {', '.join(SCOPES)}."
+    return None
+
+
+def sse_event(event: str, data) -> str:
+    """One Server-Sent Event with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
 def store_messages_to_database(notebook: Notebook, user_query: str, assistant_answer: str) -> None:
     """
     Persist the user message and the assistant reply in one bulk insert.
@@ -88,21 +168,24 @@ class ChatAPIView(APIView):
         user = request.user
         folder_id = request.data.get("folder_id")
         query = request.data.get("query", "").strip()
+        scope = request.data.get("scope", "folder")
 
-        if not folder_id or not query:
-            return Response(
-                {"error": "Both 'folder_id' and 'query' are required."},
-                status=status.HTTP_400_BAD_REQUEST,
-            )
+        error = chat_request_error(folder_id, query, scope)
+        if error:
+            return Response({"error": error}, status=status.HTTP_400_BAD_REQUEST)
 
         folder = get_object_or_404(Folder, id=folder_id, owner=user)
         notebook = get_notebook_for_folder(folder)
 
-        context = retrieve_context_for_query(
+        key_parts = dict(
             user_id=str(user.id),
             folder_id=str(folder.id),
             query=query,
+            index_generation=folder.index_generation,
+            scope=scope,
         )
+        chunk_ids, chunks, evidence = retrieve(**key_parts)
+        context = "\n".join(chunks)
 
         if not context:
             logger.warning("No context found for folder %s", folder.id)
@@ -111,9 +194,13 @@ class ChatAPIView(APIView):
                 status=status.HTTP_404_NOT_FOUND,
             )
 
-        refined_prompt = build_refined_prompt(context)
-        answer = generate(system_instruction=refined_prompt, query=query)
-        logger.info("Answer generated for notebook %s", notebook.id)
+        # a paraphrase of an earlier question with the same evidence gets the earlier answer
+        answer = answer_cache.get(chunk_ids=chunk_ids, evidence=evidence, **key_parts)
+        if answer is None:
+            refined_prompt = build_refined_prompt(context)
+            answer = generate(system_instruction=refined_prompt, query=query)
+            answer_cache.put(answer, chunk_ids=chunk_ids, evidence=evidence, **key_parts)
+            logger.info("Answer generated for notebook %s", notebook.id)
 
         store_messages_to_database(notebook, query, answer)
 
@@ -161,3 +248,183 @@ class ChatAPIView(APIView):
 
         return Response(history, status=status.HTTP_200_OK)
 
+
+class EventStreamRenderer(BaseRenderer):
+    """Lets clients send `Accept: text/event-stream`; a non-streamed reply (an error) becomes one event."""
+
+    media_type = "text/event-stream"
+    format = "sse"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return sse_event("error", data).encode("utf-8")
+
+
+class ChatStreamAPIView(APIView):
+    """
+    Same request as ChatAPIView.post, answered as Server-Sent Events:
+
+        event: context  {"notebook_id", "scope", "chunks", "context_chars"}   once retrieval is done
+        event: token    {"text"}                                              per model delta
+        event: done     {"notebook_id"}                                       both messages stored
+        event: error    {"error"}                                             generation failed or LLM unavailable
+
+    Like the other chat views it goes through the answer cache: a cached
+    answer arrives as a single token event, and a streamed answer is cached
+    once it is complete (never a partial one).
+    The messages are only stored once the stream has ended. If the client
+    disconnects, the server closes this response's iterator on the next
+    write, which closes the upstream completion (chat.llm.stream_generate).
+    """
+
+    renderer_classes = [JSONRenderer, EventStreamRenderer]
+
+    @extend_schema(tags=["Chat"], summary="RAG chat — send a message, stream the answer (SSE)")
+    def post(self, request):
+        user = request.user
+        folder_id = request.data.get("folder_id")
+        query = request.data.get("query", "").strip()
+        scope = request.data.get("scope", "folder")
+
+        error = chat_request_error(folder_id, query, scope)
+        if error:
+            return Response({"error": error}, status=status.HTTP_400_BAD_REQUEST)
+
+        folder = get_object_or_404(Folder, id=folder_id, owner=user)
+        notebook = get_notebook_for_folder(folder)
+        key_parts = dict(
+            user_id=str(user.id),
+            folder_id=str(folder.id),
+            query=query,
+            index_generation=folder.index_generation,
+            scope=scope,
+        )
+        chunk_ids, chunks, evidence, cached_answer = retrieve_with_cached_answer(**key_parts)
+        if not chunks:
+            logger.warning("No context found for folder %s", folder.id)
+            return Response(
+                {"error": "No relevant content found in this folder."},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+        context = "\n".join(chunks)
+
+        def events():
+            yield sse_event(
+                "context",
+                {"notebook_id": str(notebook.id), "scope": scope, "chunks": len(chunks), "context_chars": len(context)},
+            )
+            if cached_answer is not None:
+                yield sse_event("token", {"text": cached_answer})
+                store_messages_to_database(notebook, query, cached_answer)
+                yield sse_event("done", {"notebook_id": str(notebook.id)})
+                return
+            tokens = stream_generate(system_instruction=build_refined_prompt(context), query=query)
+            answer = []
+            try:
+                for delta in tokens:
+                    answer.append(delta)
+                    yield sse_event("token", {"text": delta})
+            except LLMUnavailable as exc:
+                yield sse_event("error", {"error": str(exc.detail)})
+                return
+            except Exception:
+                logger.exception(f"Streamed answer failed for notebook {notebook.id}")
+                yield sse_event("error", {"error": "The answer could not be generated."})
+                return
+            finally:
+                tokens.close()  # a no-op once exhausted; cancels the completion if we stopped early
+            answer = "".join(answer)
+            answer_cache.put(answer, chunk_ids=chunk_ids, evidence=evidence, **key_parts)
+            store_messages_to_database(notebook, query, answer)
+            logger.info(f"Streamed answer stored for notebook {notebook.id}")
+            yield sse_event("done", {"notebook_id": str(notebook.id)})
+
+        response = StreamingHttpResponse(events(), content_type="text/event-stream")
+        response["Cache-Control"] = "no-cache"
+        response["X-Accel-Buffering"] = "no"  # nginx would otherwise buffer the whole answer
+        return response
+
+
+def authenticate(request):
+    """The user of a plain Django view, through the same authentication classes as the DRF views."""
+    drf_request = Request(request)
+    for authenticator in api_settings.DEFAULT_AUTHENTICATION_CLASSES:
+        result = authenticator().authenticate(drf_request)
+        if result is not None:
+            return result[0]
+    return None
+
+
+@method_decorator(csrf_exempt, name="dispatch")  # token-authenticated, like the DRF views
+class ChatAsyncView(View):
+    """
+    ChatAPIView.post for the ASGI entry point (backend/asgi.py): same request
+    and response, but nothing holds a thread while waiting on the network.
+
+        auth + folder   ORM, awaited
+        notebook        get_or_create, concurrently with ↓
+        retrieval       in RETRIEVAL_POOL (CPU-bound: embedding, search, answer cache)
+        answer          AsyncGroq, awaited, unless the answer cache had one
+        messages        abulk_create
+
+    One uvicorn worker keeps hundreds of chats in flight, where the WSGI view
+    holds one thread each for the whole LLM round trip.
+    `python -m benchmarks.chat_load` compares the two.
+    """
+
+    async def post(self, request):
+        try:
+            user = await sync_to_async(authenticate)(request)
+        except exceptions.AuthenticationFailed as exc:
+            return JsonResponse({"detail": str(exc.detail)}, status=status.HTTP_401_UNAUTHORIZED)
+        if user is None:
+            return JsonResponse(
+                {"detail": "Authentication credentials were not provided."}, status=status.HTTP_401_UNAUTHORIZED
+            )
+
+        try:
+            data = json.loads(request.body or b"{}")
+        except ValueError:
+            return JsonResponse({"error": "Body must be JSON."}, status=status.HTTP_400_BAD_REQUEST)
+        folder_id = data.get("folder_id")
+        query = data.get("query", "").strip()
+        scope = data.get("scope", "folder")
+
+        error = chat_request_error(folder_id, query, scope)
+        if error:
+            return JsonResponse({"error": error}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            folder = await Folder.objects.aget(id=folder_id, owner=user)
+        except (Folder.DoesNotExist, ValidationError):
+            return JsonResponse({"detail": "No Folder matches the given query."}, status=status.HTTP_404_NOT_FOUND)
+
+        key_parts = dict(
+            user_id=str(user.id),
+            folder_id=str(folder.id),
+            query=query,
+            index_generation=folder.index_generation,
+            scope=scope,
+        )
+        notebook, (chunk_ids, chunks, evidence, answer) = await asyncio.gather(
+            sync_to_async(get_notebook_for_folder)(folder),
+            sync_to_async(retrieve_with_cached_answer, thread_sensitive=False, executor=RETRIEVAL_POOL)(**key_parts),
+        )
+        if not chunks:
+            logger.warning("No context found for folder %s", folder.id)
+            return JsonResponse(
+                {"error": "No relevant content found in this folder."},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+
+        if answer is None:
+            try:
+                answer = await agenerate(system_instruction=build_refined_prompt("\n".join(chunks)), query=query)
+            except LLMUnavailable as exc:
+                return JsonResponse({"detail": str(exc.detail)}, status=exc.status_code)
+            await sync_to_async(answer_cache.put, thread_sensitive=False, executor=RETRIEVAL_POOL)(
+                answer, chunk_ids=chunk_ids, evidence=evidence, **key_parts
+            )
+            logger.info("Answer generated for notebook %s", notebook.id)
+
+        await sync_to_async(store_messages_to_database)(notebook, query, answer)
+        return JsonResponse({"answer": answer, "notebook_id": str(notebook.id)}, status=status.HTTP_200_OK)
@@ -9,4 +9,5 @@ class AutoAdmin(admin.ModelAdmin):
 
 
 admin.site.register(models.Folder, AutoAdmin)
-admin.site.register(models.File, AutoAdmin)
\ No newline at end of file
+admin.site.register(models.File, AutoAdmin)
+admin.site.register(models.IngestionJob, AutoAdmin)
\ No newline at end of file
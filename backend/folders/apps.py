@@ -1,7 +1,21 @@
 from django.apps import AppConfig
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
 
 
 class FoldersConfig(AppConfig):
     name = 'folders'
     def ready(self):
         from . import signals # noqa: F401
+        from vector.client import VectorStore
+
+        unknown = sorted(set(settings.VECTOR_STORE_WARMUP) - set(VectorStore.COMPONENTS))
+        if unknown:
+            raise ImproperlyConfigured(
+                f"VECTOR_STORE_WARMUP names unknown components {unknown}; "
+                f"choose from {', '.join(VectorStore.COMPONENTS)}"
+            )
+        if settings.VECTOR_STORE_WARMUP and not settings.RUNNING_MIGRATIONS:
+            from vector.client import vector_store
+
+            vector_store.start_warm_up(settings.VECTOR_STORE_WARMUP)
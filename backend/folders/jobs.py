@@ -0,0 +1,257 @@
+"""
+DB-backed ingestion queue for the RAG pipeline.
+
+    FileView.post → post_save → enqueue_ingestion()      (returns 201 at once)
+    manage.py ingest_worker → work_loop() → run_job()  (one loop per process)
+
+Jobs are claimed with a conditional UPDATE (status=queued → running), so any
+number of worker processes can poll the same table without double-processing
+and without needing SELECT ... FOR UPDATE SKIP LOCKED (not available on sqlite).
+A file has at most one job in flight: a new upload supersedes the file's
+queued job, and a job is not claimed while another one of its file runs
+(both would hand out the same new chunk ids for different text).
+"""
+import os
+import socket
+import threading
+import time
+import traceback
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Exists, F, OuterRef, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+from loguru import logger
+
+from backend import metrics
+from folders.models import File, Folder, IngestionJob
+
+RETRY_BACKOFF_SECONDS = 30  # multiplied by the attempt number
+CLAIM_BATCH = 10  # candidates looked at per claim; losers just try the next one
+
+
+class FileDeleted(Exception):
+    """The job's File (or its folder) was deleted while the job was running."""
+
+
+def worker_name() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def enqueue_ingestion(file: File, *, reindex: bool = False) -> IngestionJob:
+    """
+    Queue `file` for indexing. A re-index (replaced upload) keeps the current
+    File.processed state, since its previous chunks stay searchable until the
+    worker has diffed them against the new content. A job still queued for
+    the file is superseded: the new one indexes the latest upload.
+    """
+    if not reindex:
+        File.objects.filter(pk=file.pk).update(processed=File.Status.QUEUED)
+    superseded, _ = IngestionJob.objects.filter(file=file, status=IngestionJob.Status.QUEUED).delete()
+    if superseded:
+        logger.debug(f"Superseded {superseded} queued ingestion job(s) of file {file.id}")
+    job = IngestionJob.objects.create(file=file, max_attempts=settings.INGEST_MAX_ATTEMPTS)
+    logger.debug(f"Queued ingestion job {job.id} for file {file.id}")
+    return job
+
+
+def requeue_stale_jobs() -> int:
+    """
+    Put back jobs whose worker stopped sending heartbeats (crash, OOM kill,
+    container restart). Their attempt still counts towards max_attempts.
+    """
+    cutoff = timezone.now() - timedelta(seconds=settings.INGEST_STALE_AFTER)
+    requeued = IngestionJob.objects.filter(
+        status=IngestionJob.Status.RUNNING, heartbeat_at__lt=cutoff
+    ).update(status=IngestionJob.Status.QUEUED, worker="")
+    if requeued:
+        logger.warning(f"Requeued {requeued} stale ingestion job(s)")
+    return requeued
+
+
+def claim_next_job(worker: str) -> IngestionJob | None:
+    """Atomically move the oldest available job whose file has no running job to RUNNING and return it."""
+    now = timezone.now()
+    file_busy = Exists(
+        IngestionJob.objects.filter(file_id=OuterRef("file_id"), status=IngestionJob.Status.RUNNING)
+    )
+    candidates = IngestionJob.objects.filter(
+        ~file_busy, status=IngestionJob.Status.QUEUED, available_at__lte=now
+    ).values_list("pk", flat=True)[:CLAIM_BATCH]
+
+    for pk in candidates:
+        claimed = IngestionJob.objects.filter(
+            ~file_busy, pk=pk, status=IngestionJob.Status.QUEUED
+        ).update(
+            status=IngestionJob.Status.RUNNING,
+            worker=worker,
+            attempts=F("attempts") + 1,
+            started_at=now,
+            heartbeat_at=now,
+        )
+        if claimed:
+            return IngestionJob.objects.select_related("file", "file__folder").get(pk=pk)
+    return None
+
+
+@contextmanager
+def heartbeat(job: IngestionJob):
+    """
+    Refresh the job's heartbeat every INGEST_HEARTBEAT_INTERVAL seconds from a
+    side thread, so a long docling conversion (no batches, no progress calls)
+    is never mistaken for a dead worker and requeued under a second runner.
+    """
+    stop = threading.Event()
+
+    def beat() -> None:
+        try:
+            while not stop.wait(settings.INGEST_HEARTBEAT_INTERVAL):
+                IngestionJob.objects.filter(pk=job.pk, status=IngestionJob.Status.RUNNING).update(
+                    heartbeat_at=timezone.now()
+                )
+        except Exception:
+            logger.exception(f"Heartbeat of ingestion job {job.id} stopped")
+        finally:
+            connection.close()  # this thread's own connection
+
+    thread = threading.Thread(target=beat, name=f"heartbeat-{job.id}", daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+
+def discard_deleted_file(file: File, store) -> None:
+    """
+    Remove what a job wrote for a File deleted under it. The delete cleaned up
+    the chunks that existed then (folders/signals.py), not the batches stored since.
+    """
+    logger.warning(f"File {file.id} was deleted during ingestion, removing its chunks")
+    try:
+        store.delete_file_embeddings(user_id=str(file.folder.owner_id), file_id=str(file.id))
+    except Exception:
+        logger.exception(f"Could not remove the embeddings of deleted file {file.id}")
+    Folder.bump_index_generation(file.folder_id)
+
+
+def run_job(job: IngestionJob, store) -> None:
+    """Run the RAG pipeline for one claimed job and record the outcome."""
+    file = job.file
+
+    # Every update below matches 0 rows once the File is deleted (the job row
+    # cascades with it): the run stops at the next stage or batch.
+    def on_stage(stage: str) -> None:
+        if not File.objects.filter(pk=file.pk).update(processed=stage):
+            raise FileDeleted(file.pk)
+        IngestionJob.objects.filter(pk=job.pk).update(heartbeat_at=timezone.now())
+
+    def on_progress(chunks_indexed: int) -> None:
+        if not IngestionJob.objects.filter(pk=job.pk).update(
+            chunks_indexed=chunks_indexed, heartbeat_at=timezone.now()
+        ):
+            raise FileDeleted(file.pk)
+        Folder.bump_index_generation(file.folder_id)  # a batch just became searchable
+
+    try:
+        with heartbeat(job):
+            report = store.process_and_index(
+                file_path=file.file.path,
+                file_id=str(file.id),
+                user_id=str(file.folder.owner_id),
+                folder_id=str(file.folder_id),
+                ancestor_ids=file.folder.ancestor_ids(),
+                on_stage=on_stage,
+                on_progress=on_progress,
+                first_new_index=file.chunk_span,
+            )
+    except FileDeleted:
+        discard_deleted_file(file, store)
+        return
+    except Exception:
+        if not File.objects.filter(pk=file.pk).exists():
+            discard_deleted_file(file, store)
+            return
+        error = traceback.format_exc()
+        logger.exception(f"Ingestion job {job.id} failed (attempt {job.attempts}/{job.max_attempts})")
+        # Batches stored before the failure stay in the index: the retry diffs
+        # against them by chunk hash and only embeds what is still missing.
+        if job.attempts < job.max_attempts:
+            metrics.INGEST_RETRY.inc()
+            IngestionJob.objects.filter(pk=job.pk).update(
+                status=IngestionJob.Status.QUEUED,
+                error=error,
+                worker="",
+                available_at=timezone.now() + timedelta(seconds=RETRY_BACKOFF_SECONDS * job.attempts),
+                chunks_indexed=0,
+            )
+            File.objects.filter(pk=file.pk).update(processed=File.Status.QUEUED)
+        else:
+            # Out of attempts: drop the partial index so a file never answers
+            # with half of its chunks. A re-indexed file (a replaced upload,
+            # chunk_span set by its last successful run) only loses what this
+            # run added, from chunk_span on: its previous version stays
+            # searchable and the file is marked STALE rather than FAILED.
+            metrics.INGEST_FAILED.inc()
+            user_id, file_id = str(file.folder.owner_id), str(file.id)
+            try:
+                if file.chunk_span:
+                    store.delete_file_chunks_from(user_id=user_id, file_id=file_id, first_index=file.chunk_span)
+                else:
+                    store.delete_file_embeddings(user_id=user_id, file_id=file_id)
+            except Exception:
+                logger.exception(f"Could not remove partial embeddings of file {file.id}")
+            IngestionJob.objects.filter(pk=job.pk).update(
+                status=IngestionJob.Status.FAILED,
+                error=error,
+                chunks_indexed=0,
+                finished_at=timezone.now(),
+            )
+            File.objects.filter(pk=file.pk).update(
+                processed=File.Status.STALE if file.chunk_span else File.Status.FAILED
+            )
+            Folder.bump_index_generation(file.folder_id)
+        return
+
+    if not File.objects.filter(pk=file.pk).update(
+        processed=File.Status.DONE, chunk_span=Greatest("chunk_span", Value(report["chunk_span"]))
+    ):
+        discard_deleted_file(file, store)  # deleted after the last batch
+        return
+    IngestionJob.objects.filter(pk=job.pk).update(
+        status=IngestionJob.Status.DONE,
+        error="",
+        timings=report["timings"],
+        chunks_indexed=report["chunks"],
+        finished_at=timezone.now(),
+    )
+    # stale chunks were removed at the end; chunks of a moved file left their old folder
+    Folder.bump_index_generation(file.folder_id, *report.get("moved_from", ()))
+    metrics.INGEST_DONE.inc()
+    logger.info(f"Ingestion job {job.id} done: {report['chunks']} chunks in {report['timings']['total']:.2f}s")
+
+
+def work_loop(poll_interval: float, once: bool = False) -> None:
+    """
+    Poll → claim → run until interrupted. With `once=True` the loop exits as
+    soon as the queue is empty (handy for cron / CI).
+    """
+    from vector.client import vector_store
+
+    worker = worker_name()
+    logger.info(f"Ingestion worker {worker} started")
+    while True:
+        requeue_stale_jobs()
+        job = claim_next_job(worker)
+        if job is None:
+            if once:
+                logger.info(f"Ingestion worker {worker} found an empty queue, exiting")
+                return
+            time.sleep(poll_interval)
+            continue
+        run_job(job, vector_store)
+
@@ -0,0 +1,234 @@
+"""
+Seed a folder from a directory on disk.
+
+    python manage.py ingest_dir ./course-material --folder <folder uuid> [--workers 8]
+
+    walk  → Folder rows for every sub-directory, File rows for every document (bulk_create)
+    pool  → docling conversion + chunking fan out over a process pool (one per core)
+    main  → chunks from many documents are embedded and upserted together in
+            INGEST_BATCH_SIZE batches by the shared embedding stage
+
+Re-running the same command resumes an interrupted run: existing Folder/File
+rows are matched by name and files already marked done are skipped, as are
+files with a queued or running IngestionJob (the ingest_worker has them).
+"""
+import multiprocessing
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+
+from django.core.files import File as DjangoFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.models import Value
+from django.db.models.functions import Greatest
+from loguru import logger
+
+from backend import metrics
+from folders.models import File, Folder, IngestionJob
+from folders.workers import convert_and_chunk, init_conversion_worker
+
+SUPPORTED_SUFFIXES = {
+    ".pdf", ".docx", ".pptx", ".xlsx", ".html", ".htm", ".md", ".adoc", ".csv",
+    ".png", ".jpg", ".jpeg", ".tif", ".tiff", ".bmp",
+}
+
+
+class Command(BaseCommand):
+    help = "Bulk-ingest every document under a directory into a folder (resumable)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", type=Path)
+        parser.add_argument("--folder", required=True, help="UUID of the target Folder")
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count() or 1,
+            help="Conversion processes (default: number of cores).",
+        )
+
+    def handle(self, *args, path, folder, workers, **options):
+        root = path.resolve()
+        if not root.is_dir():
+            raise CommandError(f"{root} is not a directory")
+        try:
+            target = Folder.objects.get(pk=folder)
+        except (Folder.DoesNotExist, ValueError):
+            raise CommandError(f"Folder {folder} does not exist")
+
+        started = time.time()
+        files = self._sync_rows(root, target)
+        active = set(
+            IngestionJob.objects.filter(
+                status__in=[IngestionJob.Status.QUEUED, IngestionJob.Status.RUNNING]
+            ).values_list("file_id", flat=True)
+        )  # the live queue: small, unlike a `file__in` over every document
+        queued = [f for f in files if f.pk in active]
+        pending = [f for f in files if f.processed != File.Status.DONE and f.pk not in active]
+        logger.info(
+            f"{len(files)} documents found, {len(files) - len(pending) - len(queued)} already done, "
+            f"{len(queued)} queued for the ingestion worker, {len(pending)} to ingest"
+        )
+        if not pending:
+            return
+
+        report = self._ingest(pending, user_id=str(target.owner_id), workers=workers)
+        report["total_seconds"] = time.time() - started
+        self._print_report(report)
+
+    # ── rows ────────────────────────────────────
+
+    def _sync_rows(self, root: Path, target: Folder) -> list[File]:
+        """Create missing Folder/File rows level by level; return File rows for every document."""
+        folders = {root: target}
+        documents = []
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames.sort()
+            parent = folders[Path(dirpath)]
+            existing = {f.name: f for f in Folder.objects.filter(parent=parent)}
+            missing = [
+                Folder(name=name, parent=parent, owner_id=target.owner_id, is_root=False)
+                for name in dirnames
+                if name not in existing
+            ]
+            for created in Folder.objects.bulk_create(missing):
+                existing[created.name] = created
+            for name in dirnames:
+                folders[Path(dirpath) / name] = existing[name]
+            documents += [
+                (parent, Path(dirpath) / name)
+                for name in sorted(filenames)
+                if Path(name).suffix.lower() in SUPPORTED_SUFFIXES
+            ]
+
+        existing_files = {
+            (f.folder_id, f.name): f
+            for f in File.objects.filter(folder__in=set(folders.values()))
+        }
+        new_files = []
+        for parent, file_path in documents:
+            if (parent.pk, file_path.name) in existing_files:
+                continue
+            row = File(name=file_path.name, folder=parent, processed=File.Status.QUEUED)
+            with open(file_path, "rb") as fh:
+                # copy into MEDIA_ROOT like an upload would; bulk_create sends no
+                # post_save, so no IngestionJob is queued for these rows
+                row.file.save(file_path.name, DjangoFile(fh), save=False)
+            new_files.append(row)
+        File.objects.bulk_create(new_files)
+        logger.info(f"Synced {len(folders) - 1} sub-folders, created {len(new_files)} new file rows")
+        return list(existing_files.values()) + new_files
+
+    # ── pipeline ────────────────────────────────
+
+    def _ingest(self, files: list[File], *, user_id: str, workers: int) -> dict:
+        from vector.client import vector_store
+
+        File.objects.filter(pk__in=[f.pk for f in files]).update(processed=File.Status.CONVERTING)
+        batch_size = vector_store.ingest_batch_size()
+
+        report = {
+            "files": 0,
+            "failed": 0,
+            "chunks": 0,
+            "convert_seconds": 0.0,  # summed over pool processes
+            "chunk_seconds": 0.0,
+            "embed_seconds": 0.0,
+            "store_seconds": 0.0,
+            "cache_hits": 0,
+        }
+        buffer = []  # records from any number of documents waiting for the embedding stage
+        remaining = {}  # converted file_id → its chunks not stored yet
+
+        def flush(records):
+            stats = vector_store.index_records(user_id=user_id, records=records)
+            report["embed_seconds"] += stats["embed"]
+            report["store_seconds"] += stats["store"]
+            report["cache_hits"] += stats["hits"]
+            report["chunks"] += len(records)
+            for _, _, metadata in records:
+                remaining[metadata["file_id"]] -= 1
+            Folder.bump_index_generation(*{metadata["folder_id"] for _, _, metadata in records})
+            finish([file_id for file_id, left in remaining.items() if left == 0])
+
+        def finish(file_ids):
+            for file_id in file_ids:
+                remaining.pop(file_id)
+            self._mark(file_ids, File.Status.DONE)
+            report["files"] += len(file_ids)
+            metrics.INGEST_DONE.inc(len(file_ids))
+
+        chains = Folder.ancestor_chains(user_id)
+        connections.close_all()  # no DB handles across the spawn boundary
+        queue = list(files)
+        in_flight = {}
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=init_conversion_worker,
+        ) as pool:
+            while queue or in_flight:
+                while queue and len(in_flight) < workers * 2:  # bounded look-ahead keeps memory flat
+                    row = queue.pop(0)
+                    future = pool.submit(
+                        convert_and_chunk, row.file.path, str(row.id), user_id, str(row.folder_id),
+                        chains[str(row.folder_id)],
+                    )
+                    in_flight[future] = row
+
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    row = in_flight.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception:
+                        logger.exception(f"Conversion failed for {row.name}")
+                        self._mark([str(row.id)], File.Status.FAILED)
+                        report["failed"] += 1
+                        metrics.INGEST_FAILED.inc()
+                        continue
+
+                    file_id = result["file_id"]
+                    report["convert_seconds"] += result["timings"]["convert"]
+                    report["chunk_seconds"] += result["timings"]["chunk"]
+                    remaining[file_id] = len(result["records"])
+                    buffer += result["records"]
+                    self._mark([file_id], File.Status.EMBEDDING)
+                    if result["records"]:  # ids are "<file_id>_<chunk_index>", ascending
+                        span = result["records"][-1][2]["chunk_index"] + 1
+                        File.objects.filter(pk=file_id).update(
+                            chunk_span=Greatest("chunk_span", Value(span))
+                        )
+                    if not result["records"]:
+                        logger.warning(f"No valid text chunks found in {row.name}")
+                        finish([file_id])
+
+                    while len(buffer) >= batch_size:
+                        flush(buffer[:batch_size])
+                        del buffer[:batch_size]
+
+        if buffer:
+            flush(buffer)
+        return report
+
+    @staticmethod
+    def _mark(file_ids, status) -> None:
+        if file_ids:
+            File.objects.filter(pk__in=file_ids).update(processed=status)
+
+    def _print_report(self, report: dict) -> None:
+        def rate(count, seconds):
+            return f"{count / seconds:,.1f}/s" if seconds else "n/a"
+
+        chunks = report["chunks"]
+        self.stdout.write(self.style.SUCCESS(
+            f"Ingested {report['files']} files ({report['failed']} failed), "
+            f"{chunks} chunks in {report['total_seconds']:.1f}s"
+        ))
+        self.stdout.write(f"  convert  {report['convert_seconds']:8.1f}s cpu   {rate(report['files'], report['convert_seconds'])} files")
+        self.stdout.write(f"  chunk    {report['chunk_seconds']:8.1f}s cpu   {rate(chunks, report['chunk_seconds'])} chunks")
+        self.stdout.write(f"  embed    {report['embed_seconds']:8.1f}s wall  {rate(chunks, report['embed_seconds'])} chunks")
+        self.stdout.write(f"  store    {report['store_seconds']:8.1f}s wall  {rate(chunks, report['store_seconds'])} chunks")
+        if chunks:
+            self.stdout.write(f"  embedding cache hit rate {report['cache_hits'] / chunks:.0%}")
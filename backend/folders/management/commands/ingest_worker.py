@@ -0,0 +1,59 @@
+import multiprocessing
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+from loguru import logger
+
+from folders.jobs import work_loop
+from folders.workers import ingest_worker_main
+
+
+class Command(BaseCommand):
+    help = "Run a pool of RAG ingestion workers that drain the IngestionJob queue."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--processes",
+            type=int,
+            default=settings.INGEST_WORKER_PROCESSES,
+            help="Number of worker processes (each loads its own models).",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=settings.INGEST_POLL_INTERVAL,
+            help="Seconds to sleep when the queue is empty.",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Exit once the queue is empty instead of polling forever.",
+        )
+
+    def handle(self, *args, processes, poll_interval, once, **options):
+        if processes <= 1:
+            work_loop(poll_interval, once)
+            return
+
+        # spawn (not fork): torch / tokenizers threads do not survive a fork,
+        # and each child should open its own DB connection anyway.
+        connections.close_all()
+        ctx = multiprocessing.get_context("spawn")
+        workers = [
+            ctx.Process(target=ingest_worker_main, args=(poll_interval, once), daemon=False)
+            for _ in range(processes)
+        ]
+        for process in workers:
+            process.start()
+        logger.info(f"Started {processes} ingestion worker processes")
+
+        try:
+            for process in workers:
+                process.join()
+        except KeyboardInterrupt:
+            logger.warning("Stopping ingestion workers...")
+            for process in workers:
+                process.terminate()
+            for process in workers:
+                process.join()
@@ -0,0 +1,21 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from loguru import logger
+
+PAGE_SIZE = 1000
+
+
+class Command(BaseCommand):
+    help = "Rebuild the per-user BM25 index from what is stored in the chunk store (backfill / repair)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", help="Only this user id (default: every user).")
+
+    def handle(self, *args, user, **options):
+        from vector.client import vector_store
+
+        user_ids = [user] if user else [str(pk) for pk in get_user_model().objects.values_list("pk", flat=True)]
+        for user_id in user_ids:
+            total = vector_store.rebuild_lexical_index(user_id=user_id, page_size=PAGE_SIZE)
+            logger.info(f"Lexical index for user {user_id}: {total} chunks")
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt lexical index for {len(user_ids)} user(s)"))
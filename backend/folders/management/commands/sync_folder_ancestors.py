@@ -0,0 +1,28 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from loguru import logger
+
+from folders.models import Folder
+
+
+class Command(BaseCommand):
+    help = (
+        "Rewrite the ancestor keys of every stored chunk from the current folder tree "
+        "(backfill for chunks indexed before subtree search, or repair)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", help="Only this user id (default: every user).")
+
+    def handle(self, *args, user, **options):
+        from vector.client import vector_store
+
+        user_ids = [user] if user else [str(pk) for pk in get_user_model().objects.values_list("pk", flat=True)]
+        for user_id in user_ids:
+            chains = Folder.ancestor_chains(user_id)
+            if not chains:
+                continue
+            vector_store.set_folder_ancestors(user_id=user_id, ancestors=chains)
+            Folder.bump_index_generation(*chains)
+            logger.info(f"Ancestors of user {user_id}: {len(chains)} folders")
+        self.stdout.write(self.style.SUCCESS(f"Synced folder ancestors for {len(user_ids)} user(s)"))
@@ -1,7 +1,8 @@
 import uuid
 from django.db import models
 from django.contrib.auth.models import User
-from django.db.models import Q, UniqueConstraint
+from django.db.models import F, Q, UniqueConstraint
+from django.utils import timezone
 import shortuuid
 # Create your models here.
 
@@ -17,6 +18,9 @@ class Folder(models.Model):
         blank=True
     )  # optional: cache full path (for faster queries) e.g. "root/ai/papers"
     is_root = models.BooleanField(default=False)
+    # Bumped whenever the folder's searchable chunks change; part of the
+    # retrieval cache key (chat/retrieval_cache.py), so stale hits are never served.
+    index_generation = models.PositiveIntegerField(default=0)
 
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -36,6 +40,47 @@ class Folder(models.Model):
     def __str__(self):
         return f"{self.name}"
 
+    @staticmethod
+    def bump_index_generation(*folder_ids) -> None:
+        """Bump the folders and every folder above them: their subtree results changed too."""
+        bumped = frontier = {uuid.UUID(str(folder_id)) for folder_id in folder_ids}
+        while frontier:
+            frontier = set(
+                Folder.objects.filter(pk__in=frontier, parent__isnull=False).values_list("parent_id", flat=True)
+            ) - bumped
+            bumped = bumped | frontier
+        Folder.objects.filter(pk__in=bumped).update(index_generation=F("index_generation") + 1)
+
+    @staticmethod
+    def ancestor_chains(owner_id) -> dict[str, list[str]]:
+        """{folder id: [root id, ..., folder id]} for every folder of a user, from one query."""
+        parents = {
+            str(pk): str(parent_id) if parent_id else None
+            for pk, parent_id in Folder.objects.filter(owner_id=owner_id).values_list("id", "parent_id")
+        }
+        chains = {}
+        for folder_id in parents:
+            path = []  # walk up until a folder whose chain is already known (or past the root)
+            while folder_id and folder_id not in chains:
+                path.append(folder_id)
+                folder_id = parents[folder_id]
+            chain = chains[folder_id] if folder_id else []
+            for node in reversed(path):
+                chain = chains[node] = chain + [node]
+        return chains
+
+    def ancestor_ids(self) -> list[str]:
+        """Chain of folder ids root → this folder, stored on every chunk (vector/stores.py)."""
+        return Folder.ancestor_chains(self.owner_id)[str(self.id)]
+
+    def subtree_chains(self) -> dict[str, list[str]]:
+        """ancestor_chains() of this folder and every folder under it."""
+        return {
+            folder_id: chain
+            for folder_id, chain in Folder.ancestor_chains(self.owner_id).items()
+            if str(self.id) in chain
+        }
+
 
 class File(models.Model):
     """
@@ -43,14 +88,64 @@ class File(models.Model):
     post_save  → handle_file_upload  (folders/signals.py)
     pre_delete → handle_file_delete  (folders/signals.py)
     """
+
+    class Status(models.TextChoices):
+        QUEUED = "queued", "Queued"
+        CONVERTING = "converting", "Converting"
+        EMBEDDING = "embedding", "Embedding"
+        DONE = "done", "Done"
+        STALE = "stale", "Stale"  # re-index of a replaced upload failed: the previous version is still indexed
+        FAILED = "failed", "Failed"
+
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     file = models.FileField(upload_to="files/", null=True, blank=True)
     name = models.CharField(max_length=255)
     folder = models.ForeignKey(Folder, related_name="files", on_delete=models.CASCADE)
-    processed = models.BooleanField(default=False)  # for RAG pipeline
+    processed = models.CharField(
+        max_length=16, choices=Status.choices, default=Status.QUEUED
+    )  # RAG pipeline state, advanced by the ingestion worker (folders/jobs.py)
+    # Chunk ids of a DONE file are "<id>_<i>" with i < chunk_span (gaps allowed), so
+    # they can be deleted by id (delete_folder_tree); 0 = unknown, delete by filter.
+    chunk_span = models.PositiveIntegerField(default=0)
     uploaded_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
         return f"{self.name}"
 
 
+class IngestionJob(models.Model):
+    """
+    One queued run of the RAG pipeline for a File.
+    Created by handle_file_upload (folders/signals.py) and consumed by
+    `python manage.py ingest_worker` (folders/jobs.py).
+    """
+
+    class Status(models.TextChoices):
+        QUEUED = "queued", "Queued"
+        RUNNING = "running", "Running"
+        DONE = "done", "Done"
+        FAILED = "failed", "Failed"
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    file = models.ForeignKey(File, related_name="ingestion_jobs", on_delete=models.CASCADE)
+    status = models.CharField(max_length=16, choices=Status.choices, default=Status.QUEUED)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    error = models.TextField(blank=True)
+    worker = models.CharField(max_length=255, blank=True)  # "<hostname>:<pid>" of the claimer
+    timings = models.JSONField(default=dict, blank=True)  # per-stage seconds from process_and_index
+    chunks_indexed = models.PositiveIntegerField(default=0)  # already searchable while still running
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    available_at = models.DateTimeField(default=timezone.now)  # pushed forward on retry (backoff)
+    started_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["created_at"]
+        indexes = [models.Index(fields=["status", "available_at"])]
+
+    def __str__(self):
+        return f"{self.file_id} [{self.status}]"
+
@@ -75,6 +75,8 @@ class FolderWriteSerializer(serializers.ModelSerializer):
         user = self.context["request"].user
         if parent and parent.owner != user:
             raise serializers.ValidationError("Invalid parent folder")
+        if parent and self.instance and str(self.instance.id) in parent.ancestor_ids():
+            raise serializers.ValidationError("Cannot move a folder into itself or one of its subfolders")
         return parent
 
     def validate(self, attrs):
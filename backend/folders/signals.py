@@ -1,35 +1,120 @@
+from contextvars import ContextVar
+
 from loguru import logger
-from django.db.models.signals import post_save, pre_delete
+from django.db.models.signals import post_save, pre_delete, pre_save
 from django.dispatch import receiver
 from django.conf import settings
-from folders.models import File
+from folders.models import File, Folder
+from folders.jobs import enqueue_ingestion
 from vector.client import vector_store
 
+# Set while delete_folder_tree cascades: the chunks are already gone, so
+# handle_file_delete must not clean up (and query) once per file.
+_bulk_cleanup_done = ContextVar("bulk_cleanup_done", default=False)
+
+
+def delete_folder_tree(folder: Folder) -> None:
+    """
+    Delete a folder with everything under it. The chunks of all affected
+    files are removed up front in one batched call (by deterministic id
+    where File.chunk_span is known), instead of one store round trip per
+    file from handle_file_delete during the cascade.
+    """
+    subtree = folder.subtree_chains()
+    spans = {
+        str(file_id): span if processed in (File.Status.DONE, File.Status.STALE) else None
+        for file_id, processed, span in File.objects.filter(folder_id__in=subtree).values_list(
+            "id", "processed", "chunk_span"
+        )
+    }
+    if spans:
+        vector_store.delete_files_embeddings(user_id=str(folder.owner_id), spans=spans)
+    if folder.parent_id:
+        Folder.bump_index_generation(folder.parent_id)  # subtree results above it lost these files
+
+    token = _bulk_cleanup_done.set(True)
+    try:
+        folder.delete()
+    finally:
+        _bulk_cleanup_done.reset(token)
+    logger.debug(f"Folder {folder.id} deleted: {len(subtree)} folders, {len(spans)} files")
+
+
+@receiver(pre_save, sender=File)
+def remember_stored_file(sender, instance: File, **kwargs) -> None:
+    """Stash the stored file name and folder so handle_file_upload can tell a replaced upload or a move."""
+    if instance._state.adding:
+        return
+    instance._stored_file_name, instance._stored_folder_id = (
+        File.objects.filter(pk=instance.pk).values_list("file", "folder_id").first() or (None, None)
+    )
+
 
 @receiver(post_save, sender=File)
 def handle_file_upload(sender, instance: File, created: bool, **kwargs) -> None:
     """
-    Trigger the RAG pipeline whenever a new File is created.
-    Uses select_related to load folder + owner in one query, so
-    vector_store.process_and_index() runs with zero extra DB hits.
+    Queue the RAG pipeline whenever a File is created or its upload replaced
+    (FileView.patch with a new file). The heavy lifting (docling conversion,
+    chunking, embedding, Chroma write) happens in `manage.py ingest_worker`
+    (folders/jobs.py), so the request returns as soon as the job row is written.
+    Re-indexing is incremental: see VectorStore.process_and_index.
+
+    A File moved to another folder has its chunks' folder and ancestor keys
+    rewritten in one bulk update per index, as in handle_folder_move.
     """
     if settings.RUNNING_MIGRATIONS:
         logger.warning("Running in migration mode - skipping file processing signal")
         return
-    if not created:
+    if created:
+        enqueue_ingestion(instance)
+        Folder.bump_index_generation(instance.folder_id)
         return
-    file = File.objects.select_related("folder", "folder__owner").get(pk=instance.pk)
 
-    vector_store.process_and_index(
-        file_path=file.file.path,
-        file_id=str(file.id),
-        user_id=str(file.folder.owner_id),
-        folder_id=str(file.folder_id),
+    old_folder_id = getattr(instance, "_stored_folder_id", instance.folder_id)
+    moved = old_folder_id != instance.folder_id
+    if moved:
+        vector_store.set_file_folder(
+            user_id=str(instance.folder.owner_id),
+            file_id=str(instance.id),
+            folder_id=str(instance.folder_id),
+            ancestor_ids=instance.folder.ancestor_ids(),
+        )
+        logger.debug(f"File {instance.id} moved from folder {old_folder_id} to {instance.folder_id}")
+    if instance.file.name != getattr(instance, "_stored_file_name", instance.file.name):
+        enqueue_ingestion(instance, reindex=True)
+    elif not moved:
+        return
+    # results change in the folder the file left as well as in the one it joined
+    Folder.bump_index_generation(instance.folder_id, *([old_folder_id] if moved else []))
+
+
+@receiver(pre_save, sender=Folder)
+def remember_parent(sender, instance: Folder, **kwargs) -> None:
+    """Stash the stored parent so handle_folder_move can tell a move from a rename."""
+    if instance._state.adding:
+        return
+    instance._stored_parent_id = (
+        Folder.objects.filter(pk=instance.pk).values_list("parent_id", flat=True).first()
     )
 
-    # Mark processed in a single targeted UPDATE
-    File.objects.filter(pk=file.pk).update(processed=True)
-    logger.debug(f"File {file.id} marked as processed after indexing")
+
+@receiver(post_save, sender=Folder)
+def handle_folder_move(sender, instance: Folder, created: bool, **kwargs) -> None:
+    """
+    Every chunk carries the ancestor ids of its folder (subtree search), so a
+    move rewrites that metadata for the whole moved subtree in one bulk
+    update per index. No file is re-converted or re-embedded.
+    """
+    if settings.RUNNING_MIGRATIONS or created:
+        return
+    old_parent_id = getattr(instance, "_stored_parent_id", instance.parent_id)
+    if old_parent_id == instance.parent_id:
+        return
+    subtree = instance.subtree_chains()
+    vector_store.set_folder_ancestors(user_id=str(instance.owner_id), ancestors=subtree)
+    # subtree results change both under the old parents and under the new ones
+    Folder.bump_index_generation(*subtree, *([old_parent_id] if old_parent_id else []))
+    logger.debug(f"Folder {instance.id} moved: ancestors of {len(subtree)} folders updated")
 
 
 @receiver(pre_delete, sender=File)
@@ -46,9 +131,16 @@ def handle_file_delete(sender, instance: File, **kwargs) -> None:
     if settings.RUNNING_MIGRATIONS:
         logger.warning("Running in migration mode - skipping file processing signal")
         return
-    if not instance.processed:
-        # File was never indexed — nothing to clean up in Chroma.
+    if _bulk_cleanup_done.get():
         return
+    if (
+        instance.processed == File.Status.QUEUED
+        and not instance.ingestion_jobs.filter(attempts__gt=0).exists()
+    ):
+        # File was never picked up by a worker — nothing to clean up in Chroma.
+        return
+
+    Folder.bump_index_generation(instance.folder_id)
 
     vector_store.delete_file_embeddings(
         user_id=str(instance.folder.owner_id),
@@ -5,6 +5,7 @@ from rest_framework import status
 from drf_spectacular.utils import extend_schema, OpenApiResponse
 from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
 from .models import Folder, File
+from .signals import delete_folder_tree
 from .serializers import (
     FolderSerializer,
     FolderWriteSerializer,
@@ -65,7 +66,7 @@ class FolderView(APIView):
     )
     def delete(self, request, id):
         folder = get_object_or_404(Folder, id=id, owner=request.user)
-        folder.delete()
+        delete_folder_tree(folder)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
@@ -113,6 +114,7 @@ class FileView(APIView):
         responses={204: OpenApiResponse(description="Deleted successfully")},
     )
     def delete(self, request, id):
-        file_obj = get_object_or_404(File, id=id, folder__owner=request.user)
+        # folder loaded here: handle_file_delete reads folder.owner_id
+        file_obj = get_object_or_404(File.objects.select_related("folder"), id=id, folder__owner=request.user)
         file_obj.delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
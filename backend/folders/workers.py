@@ -0,0 +1,41 @@
+"""
+Entry points for spawned worker processes.
+
+A spawned interpreter unpickles the target function by importing its module
+*before* anything has called django.setup(), so this module must not import
+models (or anything that does) at the top level.
+"""
+import os
+
+
+def _setup_django() -> None:
+    import django
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
+    django.setup()
+
+
+def ingest_worker_main(poll_interval: float, once: bool) -> None:
+    """One process of `manage.py ingest_worker`."""
+    _setup_django()
+    from folders.jobs import work_loop
+
+    try:
+        work_loop(poll_interval, once)
+    except KeyboardInterrupt:
+        pass
+
+
+def init_conversion_worker() -> None:
+    """ProcessPoolExecutor initializer for `manage.py ingest_dir`."""
+    _setup_django()
+
+
+def convert_and_chunk(file_path: str, file_id: str, user_id: str, folder_id: str, ancestor_ids: list[str]) -> dict:
+    from vector.client import vector_store  # converter + chunker load once per pool process
+
+    result = vector_store.convert_and_chunk(
+        file_path=file_path, file_id=file_id, user_id=user_id, folder_id=folder_id, ancestor_ids=ancestor_ids
+    )
+    result["file_id"] = file_id
+    return result
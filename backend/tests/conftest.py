@@ -0,0 +1,38 @@
+"""
+Test setup: Django with tests/settings.py and one throwaway database per session.
+
+    cd backend
+    python -m pytest
+"""
+import os
+import shutil
+
+os.environ["DJANGO_SETTINGS_MODULE"] = "tests.settings"
+os.environ.setdefault("GROQ_API_KEY", "test")  # chat.llm builds its client on import
+
+import django  # noqa: E402
+import pytest  # noqa: E402
+
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.db import connection, transaction  # noqa: E402
+from django.test.utils import setup_test_environment, teardown_test_environment  # noqa: E402
+
+
+@pytest.fixture(scope="session", autouse=True)
+def test_database():
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0)
+    yield
+    connection.creation.destroy_test_db(old_name, verbosity=0)
+    teardown_test_environment()
+    shutil.rmtree(settings.STATE_DIR, ignore_errors=True)
+
+
+@pytest.fixture
+def db():
+    """Rows written by the test are rolled back at the end."""
+    with transaction.atomic():
+        yield
+        transaction.set_rollback(True)
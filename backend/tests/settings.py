@@ -0,0 +1,21 @@
+"""Settings for the test suite (tests/conftest.py): the app's, with every on-disk state in one temporary directory."""
+import tempfile
+from pathlib import Path
+
+from backend.settings import *  # noqa: F401,F403
+
+STATE_DIR = Path(tempfile.mkdtemp(prefix="historick-tests-"))
+
+DATABASES = {"default": {"ENGINE": "django.db.backends.sqlite3", "NAME": STATE_DIR / "db.sqlite3"}}
+MEDIA_ROOT = STATE_DIR / "media"
+EXACT_INDEX_DIR = STATE_DIR / "exact"
+VECTOR_CACHE_DIR = STATE_DIR / "cache"
+EMBEDDING_CACHE_DIR = VECTOR_CACHE_DIR / "embeddings"
+CONVERSION_CACHE_DIR = VECTOR_CACHE_DIR / "conversions"
+ONNX_MODEL_DIR = VECTOR_CACHE_DIR / "onnx"
+LEXICAL_INDEX_DIR = STATE_DIR / "lexical"
+LLM_CACHE_PATH = VECTOR_CACHE_DIR / "llm_responses.sqlite3"
+CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+    "retrieval": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "retrieval"},
+}
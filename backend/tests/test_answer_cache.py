@@ -0,0 +1,53 @@
+"""Semantic answer cache (chat/answer_cache.py)."""
+import numpy as np
+import pytest
+from django.conf import settings
+
+from chat import answer_cache
+from vector.client import vector_store
+
+
+PARTS = dict(user_id="u", folder_id="f", scope="folder", index_generation=3)
+EVIDENCE = ["c1", "c2", "c3", "c4", "c5"]
+PARAPHRASE = "who was Haider Ali of Mysore"
+
+
+def bag_of_words(query):
+    vector = np.zeros(64)
+    for word in query.lower().replace("haider", "haidar").split():
+        vector[sum(map(ord, word)) % 64] += 1
+    return vector.tolist()
+
+
+@pytest.fixture
+def answers(monkeypatch):
+    monkeypatch.setattr(vector_store, "embed_query", bag_of_words)
+    monkeypatch.setattr(settings, "ANSWER_CACHE_ENABLED", True)
+    monkeypatch.setattr(settings, "ANSWER_CACHE_THRESHOLD", 0.8)
+    answer_cache._folders.clear()
+    answer_cache.put("A", query="who was haidar ali of mysore", chunk_ids=["c1"], evidence=EVIDENCE, **PARTS)
+    yield
+    answer_cache._folders.clear()
+
+
+def test_answer_cache_paraphrase_with_the_same_evidence(answers):
+    shuffled = ["c1", "c3", "c2", "c5", "c4"]  # the candidates around the prompt chunk are a set
+    assert answer_cache.get(query=PARAPHRASE, chunk_ids=["c1"], evidence=shuffled, **PARTS) == "A"
+
+
+def test_answer_cache_other_question(answers):
+    assert answer_cache.get(query="when did the treaty end", chunk_ids=["c1"], evidence=EVIDENCE, **PARTS) is None
+
+
+def test_answer_cache_other_prompt_chunk(answers):
+    assert answer_cache.get(query=PARAPHRASE, chunk_ids=["c2"], evidence=EVIDENCE, **PARTS) is None
+
+
+def test_answer_cache_same_prompt_chunk_other_candidates(answers):
+    evidence = ["c1", "c2", "c3", "c7", "c8"]
+    assert answer_cache.get(query=PARAPHRASE, chunk_ids=["c1"], evidence=evidence, **PARTS) is None
+
+
+def test_answer_cache_new_generation(answers):
+    parts = dict(PARTS, index_generation=4)
+    assert answer_cache.get(query=PARAPHRASE, chunk_ids=["c1"], evidence=EVIDENCE, **parts) is None
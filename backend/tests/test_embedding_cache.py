@@ -0,0 +1,44 @@
+"""On-disk chunk embedding cache (vector/embedding_cache.py)."""
+import numpy as np
+
+from vector.embedding_cache import EmbeddingCache, text_hash
+
+
+def embeddings(n, dim=8):
+    return np.random.default_rng(n).standard_normal((n, dim)).astype(np.float32)
+
+
+def test_embedding_cache_round_trip(tmp_path):
+    cache = EmbeddingCache(cache_dir=tmp_path, model_name="org/model", dim=8, capacity=16)
+    hashes = [text_hash(f"chunk {i}") for i in range(3)]
+    vectors = embeddings(3)
+    cache.put_many(hashes, vectors)
+    found = cache.get_many(hashes + [text_hash("never stored")])
+    assert sorted(found) == sorted(hashes)
+    np.testing.assert_allclose(found[hashes[1]], vectors[1], atol=1e-2)  # stored as float16
+
+
+def test_embedding_cache_survives_a_reopen(tmp_path):
+    hashes = [text_hash("chunk")]
+    EmbeddingCache(cache_dir=tmp_path, model_name="m", dim=8, capacity=16).put_many(hashes, embeddings(1))
+    assert list(EmbeddingCache(cache_dir=tmp_path, model_name="m", dim=8, capacity=16).get_many(hashes)) == hashes
+
+
+def test_embedding_cache_evicts_least_recently_used(tmp_path):
+    cache = EmbeddingCache(cache_dir=tmp_path, model_name="m", dim=8, capacity=2)
+    old, used, new = (text_hash(t) for t in ("old", "used", "new"))
+    cache.put_many([old, used], embeddings(2))
+    cache.get_many([used])
+    cache.put_many([new], embeddings(1))
+    assert sorted(cache.get_many([old, used, new])) == sorted([used, new])
+
+
+def test_embedding_cache_ignores_a_slot_being_rewritten(tmp_path):
+    cache = EmbeddingCache(cache_dir=tmp_path, model_name="m", dim=8, capacity=4)
+    key = text_hash("chunk")
+    cache.put_many([key], embeddings(1))
+    (slot,) = cache._lookup([key]).values()
+    cache._tags[slot] = 0  # a writer died between the vector and its tag
+    assert cache.get_many([key]) == {}
+    cache.put_many([key], embeddings(1))  # rewritten in place, not skipped as cached
+    assert list(cache.get_many([key])) == [key]
@@ -0,0 +1,65 @@
+"""Moving a File to another folder (folders/signals.py): its chunks follow it without a re-index."""
+import pytest
+from django.contrib.auth.models import User
+
+from folders import signals
+from folders.models import File, Folder, IngestionJob
+
+
+class MoveRecorder:
+    def __init__(self):
+        self.moves = []
+
+    def set_file_folder(self, **kwargs):
+        self.moves.append(kwargs)
+
+
+@pytest.fixture
+def store(monkeypatch):
+    recorder = MoveRecorder()
+    monkeypatch.setattr(signals, "vector_store", recorder)
+    return recorder
+
+
+@pytest.fixture
+def folders(db):
+    user = User.objects.create_user("mover")
+    root = Folder.objects.create(name="Root", owner=user, is_root=True)
+    return (
+        Folder.objects.create(name="Old", owner=user, parent=root),
+        Folder.objects.create(name="New", owner=user, parent=root),
+    )
+
+
+def generations(*folders):
+    return [Folder.objects.get(pk=folder.pk).index_generation for folder in folders]
+
+
+def test_folder_only_patch_moves_the_chunks(store, folders):
+    old, new = folders
+    file = File.objects.create(name="a.md", file="files/a.md", folder=old)
+    before = generations(old, new)
+
+    file.folder = new
+    file.save()
+
+    assert store.moves == [{
+        "user_id": str(new.owner_id),
+        "file_id": str(file.id),
+        "folder_id": str(new.id),
+        "ancestor_ids": [str(new.parent_id), str(new.id)],
+    }]
+    assert all(after > was for after, was in zip(generations(old, new), before))
+    assert IngestionJob.objects.filter(file=file).count() == 1  # nothing re-indexed
+
+
+def test_rename_touches_nothing(store, folders):
+    old, _ = folders
+    file = File.objects.create(name="a.md", file="files/a.md", folder=old)
+    before = generations(old)
+
+    file.name = "b.md"
+    file.save()
+
+    assert not store.moves
+    assert generations(old) == before
@@ -0,0 +1,27 @@
+"""Reciprocal rank fusion of the dense and BM25 rankings (vector/lexical.py)."""
+import pytest
+
+from vector.lexical import reciprocal_rank_fusion
+
+
+def test_scores_are_summed_reciprocal_ranks():
+    fused = dict(reciprocal_rank_fusion([["a", "b"], ["b", "c"]], k=60))
+    assert fused["a"] == pytest.approx(1 / 61)
+    assert fused["b"] == pytest.approx(1 / 62 + 1 / 61)
+    assert fused["c"] == pytest.approx(1 / 62)
+
+
+def test_agreement_beats_one_first_place():
+    fused = [item for item, _ in reciprocal_rank_fusion([["a", "b", "c"], ["d", "b", "c"]])]
+    assert fused[:2] == ["b", "c"]
+
+
+def test_only_ranks_matter():
+    assert reciprocal_rank_fusion([["x", "y"]]) == reciprocal_rank_fusion([["x", "y"], []])
+
+
+def test_small_k_favours_a_single_top_rank():
+    filler = [f"x{i}" for i in range(7)]
+    rankings = [["a", "x", "b"], ["y", "z", "b", *filler, "a"]]  # a: 1st and 10th, b: 3rd twice
+    assert reciprocal_rank_fusion(rankings, k=1)[0][0] == "a"
+    assert reciprocal_rank_fusion(rankings, k=60)[0][0] == "b"
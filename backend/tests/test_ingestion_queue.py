@@ -0,0 +1,171 @@
+"""The ingestion queue (folders/jobs.py): claiming, retries, and what a final failure leaves in the index."""
+from datetime import timedelta
+
+import pytest
+from django.contrib.auth.models import User
+from django.utils import timezone
+
+from folders import signals
+from folders.jobs import claim_next_job, enqueue_ingestion, requeue_stale_jobs, run_job
+from folders.models import File, Folder, IngestionJob
+
+
+class FakeStore:
+    """
+    process_and_index stores `chunk_span` chunks one batch at a time, calling
+    `during_batch(batch)` before each and `finished()` after the last, then
+    reports them (re-pointed away from the `moved_from` folders), or raises `error`.
+    """
+
+    def __init__(self, *, error=None, chunk_span=3, during_batch=None, finished=None, moved_from=()):
+        self.error = error
+        self.chunk_span = chunk_span
+        self.moved_from = list(moved_from)
+        self.during_batch = during_batch or (lambda batch: None)
+        self.finished = finished or (lambda: None)
+        self.indexed = []
+        self.deleted = []
+
+    def process_and_index(self, **kwargs):
+        self.indexed.append(kwargs)
+        if self.error:
+            raise self.error
+        kwargs["on_stage"]("converting")
+        for batch in range(self.chunk_span):
+            self.during_batch(batch)
+            kwargs["on_progress"](batch + 1)
+        self.finished()
+        return {
+            "timings": {"total": 0.01},
+            "chunks": self.chunk_span,
+            "chunk_span": self.chunk_span,
+            "moved_from": self.moved_from,
+        }
+
+    def delete_file_embeddings(self, *, user_id, file_id):
+        self.deleted.append((file_id, 0))
+
+    def delete_file_chunks_from(self, *, user_id, file_id, first_index):
+        self.deleted.append((file_id, first_index))
+
+
+@pytest.fixture
+def file(db):
+    user = User.objects.create_user("reader")
+    folder = Folder.objects.create(name="Mysore", owner=user, is_root=True)
+    return File.objects.create(name="a.md", file="files/a.md", folder=folder)  # queues one job
+
+
+def claim(**changes):
+    job = claim_next_job("test-worker")
+    IngestionJob.objects.filter(pk=job.pk).update(**changes)
+    job.refresh_from_db()
+    return job
+
+
+def test_upload_queues_a_job(file):
+    file.refresh_from_db()
+    assert file.processed == File.Status.QUEUED
+    assert IngestionJob.objects.get(file=file).status == IngestionJob.Status.QUEUED
+
+
+def test_a_job_is_claimed_once(file):
+    job = claim_next_job("worker-a")
+    assert job.status == IngestionJob.Status.RUNNING
+    assert (job.worker, job.attempts) == ("worker-a", 1)
+    assert claim_next_job("worker-b") is None
+
+
+def test_backed_off_job_waits(file):
+    IngestionJob.objects.update(available_at=timezone.now() + timedelta(minutes=5))
+    assert claim_next_job("test-worker") is None
+
+
+def test_stale_job_is_requeued(file):
+    claim(heartbeat_at=timezone.now() - timedelta(hours=1))
+    assert requeue_stale_jobs() == 1
+    assert claim_next_job("test-worker").attempts == 2
+
+
+def test_done(file):
+    store = FakeStore(chunk_span=3)
+    run_job(claim(), store)
+    file.refresh_from_db()
+    assert (file.processed, file.chunk_span) == (File.Status.DONE, 3)
+    assert IngestionJob.objects.get(file=file).status == IngestionJob.Status.DONE
+    assert store.indexed[0]["first_new_index"] == 0
+
+
+def test_done_bumps_the_folder_a_moved_file_left(file):
+    old = Folder.objects.create(name="Old", owner=file.folder.owner, is_root=True)
+    generation = old.index_generation
+    run_job(claim(), FakeStore(moved_from=[str(old.id)]))
+    old.refresh_from_db()
+    assert old.index_generation > generation
+
+
+def test_failure_is_retried_later(file):
+    store = FakeStore(error=RuntimeError("conversion failed"))
+    run_job(claim(max_attempts=3), store)
+    job = IngestionJob.objects.get(file=file)
+    assert job.status == IngestionJob.Status.QUEUED
+    assert job.available_at > timezone.now()
+    assert "conversion failed" in job.error
+    assert store.deleted == []
+
+
+def test_final_failure_drops_a_new_file(file):
+    store = FakeStore(error=RuntimeError("conversion failed"))
+    run_job(claim(max_attempts=1), store)
+    file.refresh_from_db()
+    assert file.processed == File.Status.FAILED
+    assert IngestionJob.objects.get(file=file).status == IngestionJob.Status.FAILED
+    assert store.deleted == [(str(file.id), 0)]
+
+
+def test_final_failure_keeps_the_previous_version(file):
+    File.objects.filter(pk=file.pk).update(processed=File.Status.DONE, chunk_span=4)
+    store = FakeStore(error=RuntimeError("conversion failed"))
+    run_job(claim(max_attempts=1), store)
+    file.refresh_from_db()
+    assert (file.processed, file.chunk_span) == (File.Status.STALE, 4)
+    assert store.indexed[0]["first_new_index"] == 4
+    assert store.deleted == [(str(file.id), 4)]  # only what the failed run added
+
+
+
+@pytest.fixture
+def delete_file(monkeypatch):
+    """Deletes a File the way the API does; the delete signal's own cleanup goes to a stub store."""
+    monkeypatch.setattr(signals, "vector_store", FakeStore())
+    return lambda file_id: File.objects.filter(pk=file_id).delete()
+
+
+@pytest.mark.parametrize("batch", [0, 2])
+def test_file_deleted_during_a_batch(file, delete_file, batch):
+    file_id = str(file.id)
+    store = FakeStore(chunk_span=3, during_batch=lambda i: i == batch and delete_file(file_id))
+    job = claim()
+    run_job(job, store)
+    assert store.deleted == [(file_id, 0)]
+    assert not IngestionJob.objects.filter(pk=job.pk).exists()
+
+
+def test_file_deleted_after_the_last_batch(file, delete_file):
+    file_id = str(file.id)
+    store = FakeStore(chunk_span=3, finished=lambda: delete_file(file_id))
+    run_job(claim(), store)
+    assert store.deleted == [(file_id, 0)]
+
+
+def test_a_new_upload_supersedes_the_queued_job(file):
+    enqueue_ingestion(file, reindex=True)
+    assert IngestionJob.objects.filter(file=file).count() == 1
+
+
+def test_a_file_runs_one_job_at_a_time(file):
+    running = claim_next_job("worker-a")
+    enqueue_ingestion(file, reindex=True)  # a PATCH while the first upload is indexed
+    assert claim_next_job("worker-b") is None
+    run_job(running, FakeStore())
+    assert claim_next_job("worker-b").file_id == file.id
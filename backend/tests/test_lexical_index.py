@@ -0,0 +1,33 @@
+"""LexicalIndex (vector/lexical.py) keeps a bounded number of user files open."""
+import sqlite3
+
+import pytest
+
+from vector.lexical import LexicalIndex
+
+
+def records(user_id):
+    metadata = {"file_id": "f", "folder_id": "X", "chunk_index": 0, "in_X": True}
+    return [(f"{user_id}_0", f"treaty of {user_id}", metadata)]
+
+
+def test_least_recently_used_connection_is_closed(tmp_path):
+    index = LexicalIndex(index_dir=tmp_path, max_connections=2)
+    a = index._connect("a")
+    b = index._connect("b")
+    index._connect("a")  # "b" is now the least recently used
+    index._connect("c")
+
+    assert list(index._local.connections) == ["a", "c"]
+    with pytest.raises(sqlite3.ProgrammingError):
+        b.execute("SELECT 1")
+    a.execute("SELECT 1")
+
+
+def test_reopened_file_keeps_its_rows(tmp_path):
+    index = LexicalIndex(index_dir=tmp_path, max_connections=1)
+    for user_id in ("a", "b", "a"):
+        index.upsert(user_id=user_id, records=records(user_id))
+    hits = index.search(user_id="b", folder_id="X", query="treaty")
+    assert [hit["id"] for hit in hits] == ["b_0"]
+    assert len(index.search(user_id="a", folder_id="X", query="treaty")) == 1
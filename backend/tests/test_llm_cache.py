@@ -0,0 +1,28 @@
+"""LLM response cache (chat/llm_cache.py)."""
+from chat.llm_cache import LLMResponseCache
+
+
+def test_llm_cache_counts_a_replaced_entry_once(tmp_path):
+    cache = LLMResponseCache(path=tmp_path / "llm.sqlite3", ttl=60, max_bytes=1024)
+    cache.put("k", "first answer")
+    cache.put("k", "second")
+    assert cache.get("k") == "second"
+    assert cache.stats()["bytes"] == len("second")
+
+
+def test_llm_cache_expires_entries(tmp_path):
+    cache = LLMResponseCache(path=tmp_path / "llm.sqlite3", ttl=-1, max_bytes=1024)
+    cache.put("k", "answer")
+    assert cache.get("k") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_llm_cache_trims_least_recently_read(tmp_path):
+    cache = LLMResponseCache(path=tmp_path / "llm.sqlite3", ttl=60, max_bytes=100)
+    cache.put("a", "x" * 40)
+    cache.put("b", "x" * 40)
+    cache.get("a")
+    cache.put("c", "x" * 40)
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    assert cache.stats()["bytes"] == 80
@@ -0,0 +1,147 @@
+"""Retries, deadline and circuit breaker of the LLM client (chat/llm_client.py)."""
+import time
+
+import groq
+import httpx
+import pytest
+from django.conf import settings
+
+from chat import llm_client
+from chat.llm_client import CircuitBreaker, LLMUnavailable
+
+REQUEST = httpx.Request("POST", "http://llm.test/v1/chat/completions")
+
+
+def status_error(status, headers=None):
+    response = httpx.Response(status, request=REQUEST, headers=headers)
+    errors = {400: groq.BadRequestError, 429: groq.RateLimitError, 503: groq.InternalServerError}
+    return errors[status](f"HTTP {status}", response=response, body=None)
+
+
+class Upstream:
+    """A create() that raises `failures` in order, then answers."""
+
+    def __init__(self, *failures):
+        self.failures = list(failures)
+        self.calls = 0
+
+    def __call__(self, **request):
+        self.calls += 1
+        if self.failures:
+            raise self.failures.pop(0)
+        return "answer"
+
+
+@pytest.fixture
+def breaker(monkeypatch):
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.05)
+    monkeypatch.setattr(llm_client, "breaker", breaker)
+    monkeypatch.setattr(settings, "LLM_MAX_RETRIES", 2)
+    monkeypatch.setattr(settings, "LLM_RETRY_BASE_DELAY", 0.001)
+    monkeypatch.setattr(settings, "LLM_CALL_DEADLINE", 5)
+    return breaker
+
+
+# ──────────────────────────────────────────────
+# Circuit breaker
+# ──────────────────────────────────────────────
+
+def test_breaker_opens_after_failures_in_a_row():
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=60)
+    for ok in (False, False, True, False, False):
+        breaker.record(ok=ok)
+    assert breaker.allow()
+    breaker.record(ok=False)
+    assert not breaker.allow()
+
+
+def test_breaker_lets_one_trial_through_after_the_reset_timeout():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+    breaker.record(ok=False)
+    assert not breaker.allow()
+    time.sleep(0.06)
+    assert breaker.allow()
+    assert not breaker.allow()  # the others keep failing fast during the trial
+    breaker.record(ok=True)
+    assert breaker.allow()
+
+
+def test_failed_trial_opens_the_breaker_again():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+    breaker.record(ok=False)
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.record(ok=False)
+    assert not breaker.allow()
+
+
+# ──────────────────────────────────────────────
+# call()
+# ──────────────────────────────────────────────
+
+def test_provider_errors_are_retried(breaker):
+    upstream = Upstream(status_error(503), status_error(503))
+    assert llm_client.call(upstream) == "answer"
+    assert upstream.calls == 3
+    assert breaker.failures == 0
+
+
+def test_client_errors_are_not_retried(breaker):
+    upstream = Upstream(status_error(400))
+    with pytest.raises(groq.BadRequestError):
+        llm_client.call(upstream)
+    assert upstream.calls == 1
+    assert breaker.failures == 0  # our request was wrong, the provider is fine
+
+
+def test_a_long_retry_after_is_not_waited_for(breaker, monkeypatch):
+    monkeypatch.setattr(settings, "LLM_RETRY_MAX_DELAY", 1)
+    upstream = Upstream(status_error(429, {"retry-after": "30"}))
+    with pytest.raises(groq.RateLimitError):
+        llm_client.call(upstream)
+    assert upstream.calls == 1
+
+
+def test_no_retry_past_the_deadline(breaker, monkeypatch):
+    monkeypatch.setattr(settings, "LLM_CALL_DEADLINE", 0.05)
+    upstream = Upstream(status_error(429, {"retry-after": "0.2"}))
+    with pytest.raises(groq.RateLimitError):
+        llm_client.call(upstream)
+    assert upstream.calls == 1
+
+
+def test_attempt_timeout_is_capped_by_the_deadline(breaker, monkeypatch):
+    monkeypatch.setattr(settings, "LLM_CALL_DEADLINE", 2)
+    seen = {}
+    llm_client.call(lambda **request: seen.update(request))
+    assert seen["timeout"].read <= 2
+
+
+def test_open_breaker_fails_fast(breaker):
+    for _ in range(2):
+        with pytest.raises(groq.InternalServerError):
+            llm_client.call(Upstream(*[status_error(503)] * 3))
+    upstream = Upstream()
+    with pytest.raises(LLMUnavailable):
+        llm_client.call(upstream)
+    assert upstream.calls == 0
+
+
+# ──────────────────────────────────────────────
+# Streams
+# ──────────────────────────────────────────────
+
+def test_an_open_stream_is_not_a_success_yet(breaker):
+    breaker.record(ok=False)
+    llm_client.open_stream(Upstream())
+    assert breaker.failures == 1
+    llm_client.stream_ended()
+    assert breaker.failures == 0
+
+
+def test_a_broken_stream_counts_against_the_provider(breaker):
+    for _ in range(2):
+        llm_client.open_stream(Upstream())
+        llm_client.stream_ended(httpx.RemoteProtocolError("peer closed connection"))
+    with pytest.raises(LLMUnavailable):
+        llm_client.open_stream(Upstream())
@@ -0,0 +1,15 @@
+"""Retrieval cache keyed by folder index generation (chat/retrieval_cache.py)."""
+from chat import retrieval_cache
+
+
+KEY_PARTS = dict(user_id="u", folder_id="f", scope="folder", k=1, index_generation=3)
+
+
+def test_retrieval_cache_normalizes_the_query():
+    retrieval_cache.put(["c1"], ["text"], ["c1", "c2"], query="Who was Haidar Ali?", **KEY_PARTS)
+    assert retrieval_cache.get(query="  who was haidar   ali", **KEY_PARTS) == (["c1"], ["text"], ["c1", "c2"])
+
+
+def test_retrieval_cache_misses_on_a_new_generation():
+    retrieval_cache.put(["c1"], ["text"], ["c1"], query="q", **KEY_PARTS)
+    assert retrieval_cache.get(query="q", **dict(KEY_PARTS, index_generation=4)) is None
@@ -0,0 +1,30 @@
+"""benchmarks.vector_stores.check_store against each chunk store backend."""
+import os
+
+import pytest
+
+from benchmarks.vector_stores import DIMENSION, check_store
+from vector.stores import build_chunk_store
+
+
+def build(backend, tmp_path):
+    if backend == "chroma":
+        pytest.importorskip("chromadb")
+        return build_chunk_store("chroma", path=str(tmp_path), memory_limit=1024**3, idle_seconds=300)
+    if backend == "pgvector":
+        if not os.getenv("PGVECTOR_DSN"):
+            pytest.skip("PGVECTOR_DSN is not set")
+        pytest.importorskip("psycopg")
+        pytest.importorskip("pgvector")
+        return build_chunk_store("pgvector", dsn=os.environ["PGVECTOR_DSN"], dimension=DIMENSION)
+    codec = backend.partition("-")[2] or "float16"
+    return build_chunk_store(
+        "exact", path=tmp_path, dimension=DIMENSION, promote_at=10**9, ann=lambda: None, codec=codec
+    )
+
+
+@pytest.mark.parametrize("backend", ["exact", "exact-int8", "chroma", "pgvector"])
+def test_conformance(backend, tmp_path):
+    store = build(backend, tmp_path)
+    failed = [name for name, ok in check_store(store) if not ok]
+    assert not failed
@@ -0,0 +1,123 @@
+"""
+Dynamic micro-batching for query embeddings.
+
+Each chat request embeds exactly one short query. Encoding them one at a
+time wastes the encoder's batch parallelism, so concurrent callers park
+their query on a queue and a single background thread drains it:
+
+    caller A ─┐
+    caller B ─┼─► queue ─► [wait ≤ max_wait or max_batch_size] ─► encode(batch) ─► futures
+    caller C ─┘
+
+A small LRU of recent query vectors answers repeated questions without
+touching the encoder at all.
+
+A caller gives up after `timeout` seconds (its query is then skipped), a
+failed batch fails every future in it, and a batching thread that died is
+started again by the next caller.
+"""
+import queue
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+from loguru import logger
+
+
+class QueryEmbedder:
+    def __init__(
+        self,
+        encode,
+        *,
+        max_batch_size: int = 32,
+        max_wait: float = 0.005,
+        cache_size: int = 1024,
+        timeout: float = 60.0,
+    ) -> None:
+        """
+        encode: callable(list[str]) -> sequence of vectors, called from the batching thread only.
+        max_wait: seconds the first query of a batch waits for company.
+        timeout: seconds embed() waits for its vector before raising TimeoutError.
+        """
+        self._encode = encode
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.cache_size = cache_size
+        self.timeout = timeout
+
+        self._queue: queue.Queue = queue.Queue()
+        self._thread = None
+        self._thread_lock = threading.Lock()
+        self._cache: OrderedDict[str, list[float]] = OrderedDict()
+        self._cache_lock = threading.Lock()
+
+    def embed(self, text: str) -> list[float]:
+        key = " ".join(text.split())
+        with self._cache_lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+
+        future: Future = Future()
+        self._ensure_thread()
+        self._queue.put((key, future))
+        try:
+            vector = future.result(timeout=self.timeout)
+        except TimeoutError:
+            future.cancel()  # still queued: the batching thread drops it
+            logger.error(f"Query embedding timed out after {self.timeout}s")
+            raise
+
+        with self._cache_lock:
+            self._cache[key] = vector
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return vector
+
+    def _ensure_thread(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._thread_lock:
+            if self._thread is None or not self._thread.is_alive():
+                if self._thread is not None:
+                    logger.error("Query embedding thread died, starting a new one")
+                self._thread = threading.Thread(target=self._run, name="query-embedder", daemon=True)
+                self._thread.start()
+
+    def _next_batch(self) -> list[tuple[str, Future]]:
+        batch = [self._queue.get()]  # block until there is work
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            # callers that timed out have cancelled their futures: nothing to embed for them
+            batch = [(text, future) for text, future in self._next_batch() if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            try:
+                texts = list(dict.fromkeys(text for text, _ in batch))  # same question twice → one row
+                vectors = self._encode(texts)
+                by_text = {text: list(map(float, vector)) for text, vector in zip(texts, vectors)}
+                for text, future in batch:
+                    future.set_result(by_text[text])
+            except BaseException as exc:
+                logger.exception(f"Query embedding batch of {len(batch)} failed")
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(exc)
+                if not isinstance(exc, Exception):
+                    raise  # SystemExit & co. end the thread; the next caller starts another
+                continue
+            if len(batch) > 1:
+                logger.debug(f"Embedded {len(batch)} queries in one batch")
@@ -1,11 +1,15 @@
 from loguru import logger
+import itertools
+import threading
+from collections import defaultdict
 import time
+from concurrent.futures import ThreadPoolExecutor
 from django.conf import settings
-import chromadb
-from sentence_transformers import SentenceTransformer
-from transformers import AutoTokenizer
-from docling.document_converter import DocumentConverter
-from docling_core.transforms.chunker.hybrid_chunker import HybridChunker
+from backend import metrics
+from vector.batching import QueryEmbedder
+from vector.embedding_cache import text_hash
+from vector.lexical import LexicalIndex, reciprocal_rank_fusion
+from vector.stores import ANCESTOR_PREFIX, ancestor_metadata
 
 
 MAX_TOKENS = 384
@@ -13,108 +17,636 @@ EMBEDDING_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
 
 
 class VectorStore:
+    """
+    Every heavy component (chunk store, encoder, tokenizer,
+    HybridChunker, DocumentConverter, caches) is built on first use, so
+    importing this module costs nothing in shells, migrations and tests.
+    `warm_up()` loads them ahead of traffic; `status()` feeds /health/ready.
+    """
+
+    COMPONENTS = (
+        "store",
+        "encoder",
+        "embedding_cache",
+        "tokenizer",
+        "chunker",
+        "converter",
+        "conversion_cache",
+        "reranker",
+    )
+
     def __init__(self, chroma_path: str = ".") -> None:
-        start = time.time()
-        logger.info("Initializing VectorStore...")
+        self._chroma_path = chroma_path
+        self._loaded = {}
+        self._load_seconds = {}
+        self._load_errors = {}
+        self._locks = {name: threading.Lock() for name in self.COMPONENTS}
+        # Queries go through the project's own encoder (not Chroma's bundled
+        # ONNX MiniLM), batched across concurrent requests.
+        self._query_embedder = QueryEmbedder(
+            lambda texts: self._encoder.encode(texts),
+            max_batch_size=settings.QUERY_BATCH_MAX_SIZE,
+            max_wait=settings.QUERY_BATCH_MAX_WAIT_MS / 1000,
+            cache_size=settings.QUERY_EMBEDDING_CACHE_SIZE,
+            timeout=settings.QUERY_EMBED_TIMEOUT,
+        )
+        # Compression mode: chunk text lives zstd-compressed in the lexical index, its
+        # only copy; the chunk store then only holds vectors and metadata.
+        self._lexical = LexicalIndex(
+            index_dir=settings.LEXICAL_INDEX_DIR,
+            zstd_level=settings.CHUNK_TEXT_ZSTD_LEVEL if settings.CHUNK_TEXT_COMPRESSION == "zstd" else None,
+            max_connections=settings.LEXICAL_MAX_CONNECTIONS,
+        )
+        # hybrid_query runs the dense side here while the lexical side runs inline
+        self._search_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="dense-search")
+        # its own threads: a burst of logins must not queue in front of searches
+        self._prewarm_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="prewarm")
 
-        self._client = chromadb.PersistentClient(path=chroma_path)
-        logger.info("Chroma client initialized")
+    # ──────────────────────────────────────────────
+    # Lazy components
+    # ──────────────────────────────────────────────
 
-        logger.info("Loading embedding model...")
-        t0 = time.time()
-        self._embedding_model = SentenceTransformer(EMBEDDING_MODEL_NAME)
-        logger.info(f"Embedding model loaded in {time.time() - t0:.2f}s")
+    def _component(self, name: str):
+        if name in self._loaded:
+            return self._loaded[name]
+        with self._locks[name]:  # one loader per component; others can load in parallel
+            if name not in self._loaded:
+                logger.info(f"Loading {name}...")
+                t0 = time.time()
+                try:
+                    self._loaded[name] = getattr(self, f"_load_{name}")()
+                except Exception as exc:
+                    self._load_errors[name] = repr(exc)
+                    raise
+                self._load_seconds[name] = time.time() - t0
+                self._load_errors.pop(name, None)
+                logger.info(f"{name} loaded in {self._load_seconds[name]:.2f}s")
+        return self._loaded[name]
 
-        logger.info("Loading tokenizer...")
-        t0 = time.time()
-        _tokenizer = AutoTokenizer.from_pretrained(
+    def _load_store(self):
+        from vector.stores import build_chunk_store
+
+        backend = settings.VECTOR_BACKEND
+        if backend == "exact":
+            promote_to = settings.EXACT_PROMOTE_BACKEND
+            return build_chunk_store(
+                "exact",
+                path=settings.EXACT_INDEX_DIR,
+                dimension=self._encoder.dimension,
+                promote_at=settings.EXACT_PROMOTE_AT,
+                codec=settings.EXACT_VECTOR_CODEC,
+                pca_dimension=settings.EXACT_PCA_DIM,
+                pca_fit_at=settings.EXACT_PCA_FIT_AT,
+                ann=lambda: build_chunk_store(promote_to, **self._store_options(promote_to)),
+            )
+        return build_chunk_store(backend, **self._store_options(backend))
+
+    def _store_options(self, backend):
+        if backend == "pgvector":
+            return dict(
+                dsn=settings.PGVECTOR_DSN,
+                dimension=self._encoder.dimension,
+                pool_size=settings.PGVECTOR_POOL_SIZE,
+                ef_search=settings.PGVECTOR_EF_SEARCH,
+            )
+        return dict(
+            path=self._chroma_path,
+            memory_limit=settings.TENANT_MEMORY_LIMIT_BYTES,
+            idle_seconds=settings.TENANT_IDLE_SECONDS,
+        )
+
+    def _load_encoder(self):
+        from vector.encoders import build_encoder
+
+        return build_encoder(
+            settings.EMBEDDING_BACKEND,
+            EMBEDDING_MODEL_NAME,
+            export_dir=settings.ONNX_MODEL_DIR,
+            quantization=settings.ONNX_QUANTIZATION,
+        )
+
+    def _load_embedding_cache(self):
+        from vector.embedding_cache import EmbeddingCache
+
+        return EmbeddingCache(
+            cache_dir=settings.EMBEDDING_CACHE_DIR,
+            model_name=self._encoder.name,
+            dim=self._encoder.dimension,
+            capacity=settings.EMBEDDING_CACHE_MAX_ENTRIES,
+        )
+
+    def _load_tokenizer(self):
+        from transformers import AutoTokenizer
+
+        return AutoTokenizer.from_pretrained(
             EMBEDDING_MODEL_NAME,
             model_max_length=MAX_TOKENS,
         )
-        logger.info(f"Tokenizer loaded in {time.time() - t0:.2f}s")
 
-        logger.info("Initializing chunker...")
-        self._chunker = HybridChunker(
-            tokenizer=_tokenizer,
+    def _load_chunker(self):
+        from docling_core.transforms.chunker.hybrid_chunker import HybridChunker
+
+        return HybridChunker(
+            tokenizer=self._tokenizer,
             merge_peers=True,
             max_tokens=MAX_TOKENS,
         )
 
-        logger.info("Initializing document converter...")
-        self._converter = DocumentConverter()
+    def _load_converter(self):
+        from docling.document_converter import DocumentConverter
+
+        return DocumentConverter()
+
+    def _load_conversion_cache(self):
+        from vector.conversion_cache import ConversionCache
+
+        return ConversionCache(
+            cache_dir=settings.CONVERSION_CACHE_DIR,
+            max_bytes=settings.CONVERSION_CACHE_MAX_BYTES,
+        )
+
+    def _load_reranker(self):
+        from vector.rerank import Reranker
 
-        logger.info(f"VectorStore initialized in {time.time() - start:.2f}s")
+        return Reranker(
+            settings.RERANK_MODEL,
+            batch_size=settings.RERANK_BATCH_SIZE,
+            cache_size=settings.RERANK_CACHE_SIZE,
+        )
 
-    def _get_collection(self, user_id: str):
-        return self._client.get_or_create_collection(name=f"user_{user_id}")
+    _store = property(lambda self: self._component("store"))
+    _encoder = property(lambda self: self._component("encoder"))
+    _embedding_cache = property(lambda self: self._component("embedding_cache"))
+    _tokenizer = property(lambda self: self._component("tokenizer"))
+    _chunker = property(lambda self: self._component("chunker"))
+    _converter = property(lambda self: self._component("converter"))
+    _conversion_cache = property(lambda self: self._component("conversion_cache"))
+    _reranker = property(lambda self: self._component("reranker"))
 
-    def process_and_index(self, *, file_path, file_id, user_id, folder_id):
+    def warm_up(self, components=COMPONENTS) -> None:
+        """Load `components` now; failures are logged and reported by status()."""
         start = time.time()
-        logger.info(f"Processing file {file_id}")
+        for name in components:
+            try:
+                self._component(name)
+            except Exception:
+                logger.exception(f"Warm-up failed for {name}")
+        logger.info(f"VectorStore warm-up finished in {time.time() - start:.2f}s")
+
+    def start_warm_up(self, components=COMPONENTS) -> threading.Thread:
+        thread = threading.Thread(
+            target=self.warm_up, args=(components,), name="vector-store-warm-up", daemon=True
+        )
+        thread.start()
+        return thread
+
+    def status(self) -> dict:
+        """{component: {"loaded", "seconds", "error"}} for the readiness probe."""
+        return {
+            name: {
+                "loaded": name in self._loaded,
+                "seconds": self._load_seconds.get(name),
+                "error": self._load_errors.get(name),
+            }
+            for name in self.COMPONENTS
+        }
+
+    def store_stats(self) -> dict:
+        return self._store.stats() if "store" in self._loaded else {"backend": settings.VECTOR_BACKEND}
+
+    # ──────────────────────────────────────────────
+    # Pipeline
+    # ──────────────────────────────────────────────
+
+    def prewarm(self, user_id: str) -> None:
+        """Load a tenant's index in the background (e.g. right after login)."""
+        def _prewarm():
+            try:
+                self._store.prewarm(user_id)
+            except Exception:
+                logger.exception(f"Prewarm failed for user {user_id}")
 
-        result = self._converter.convert(file_path)
-        logger.info("Document converted")
+        self._prewarm_pool.submit(_prewarm)
 
-        chunks = list(self._chunker.chunk(dl_doc=result.document))
-        logger.info(f"Chunked into {len(chunks)} chunks")
+    def _convert(self, file_path):
+        """Return (DoclingDocument, came_from_cache) for `file_path`."""
+        from vector.conversion_cache import file_hash
 
-        texts, metadatas, ids = [], [], []
+        digest = file_hash(file_path)
+        document = self._conversion_cache.get(digest)
+        if document is not None:
+            return document, True
+        with metrics.CONVERT_SECONDS.time():
+            document = self._converter.convert(file_path).document
+        self._conversion_cache.put(digest, document)
+        return document, False
 
-        for i, chunk in enumerate(chunks):
+    def _embed(self, texts):
+        """
+        Encode `texts`, reusing cached vectors for chunks seen before
+        (re-uploads, shared course PDFs, boilerplate headers).
+        Returns (embeddings as lists, {"hits", "misses", "hit_rate"}).
+        """
+        hashes = [text_hash(text) for text in texts]
+        cached = self._embedding_cache.get_many(hashes)
+
+        missing = {}  # hash → text, deduplicated so repeated chunks encode once
+        for key, text in zip(hashes, texts):
+            if key not in cached:
+                missing.setdefault(key, text)
+        if missing:
+            with metrics.EMBED_SECONDS.time():
+                vectors = self._encoder.encode(list(missing.values()))
+            self._embedding_cache.put_many(list(missing), vectors)
+            cached.update(zip(missing, vectors))
+
+        misses = sum(1 for key in hashes if key in missing)
+        stats = {
+            "hits": len(hashes) - misses,
+            "misses": misses,
+            "hit_rate": (len(hashes) - misses) / len(hashes),
+        }
+        return [cached[key].tolist() for key in hashes], stats
+
+    def _iter_chunk_records(self, document, *, file_id, user_id, folder_id, ancestor_ids):
+        """
+        Yield (id, text, metadata) per non-empty chunk, as the chunker produces them.
+        `ancestor_ids` is the folder chain root → folder_id (Folder.ancestor_ids()).
+        """
+        for i, chunk in enumerate(self._chunker.chunk(dl_doc=document)):
             text = chunk.text.strip()
             if not text:
                 continue
+            metadata = {
+                "user_id": user_id,
+                "folder_id": folder_id,
+                "file_id": file_id,
+                "chunk_index": i,
+                "chunk_hash": text_hash(text),
+                **ancestor_metadata(ancestor_ids),
+            }
+            yield f"{file_id}_{i}", text, metadata
+
+    def _existing_chunks(self, *, user_id, file_id, folder_id, ancestor_ids):
+        """
+        ({chunk_hash: [ids]}, next free chunk index, {folder ids}) for what is
+        already indexed for this file; the set holds the stored folder of
+        chunks whose folder or ancestor keys differ from `folder_id` /
+        `ancestor_ids` (the file moved since). ({}, None, set()) for a file
+        with no chunks yet.
+        """
+        stored = self._store.file_chunks(user_id=user_id, file_id=file_id)
+        if not stored:
+            return {}, None, set()
+        wanted = ancestor_metadata(ancestor_ids).keys()
+        by_hash, moved_from = defaultdict(list), set()
+        for chunk_id, metadata in stored:
+            # chunks indexed before hashes were stored land under None and are replaced
+            by_hash[metadata.get("chunk_hash")].append(chunk_id)
+            ancestors = {key for key in metadata if key.startswith(ANCESTOR_PREFIX)}
+            if metadata["folder_id"] != folder_id or ancestors != wanted:
+                moved_from.add(metadata["folder_id"])
+        next_index = max(metadata["chunk_index"] for _, metadata in stored) + 1
+        return by_hash, next_index, moved_from
+
+    def ingest_batch_size(self) -> int:
+        return min(settings.INGEST_BATCH_SIZE, self._store.max_batch_size())
 
-            texts.append(text)
-            ids.append(f"{file_id}_{i}")
-            metadatas.append(
-                {
-                    "user_id": user_id,
-                    "folder_id": folder_id,
-                    "file_id": file_id,
-                    "chunk_index": i,
-                }
+    def index_records(self, *, user_id, records) -> dict:
+        """
+        Embed and upsert one batch of (id, text, metadata) records for a user.
+        Records may come from several files (bulk ingestion batches across
+        documents). Returns {"hits": cache hits, "embed": s, "store": s}.
+        """
+        ids, texts, metadatas = (list(column) for column in zip(*records))
+
+        t0 = time.time()
+        embeddings, cache_stats = self._embed(texts)
+        embed_seconds = time.time() - t0
+
+        # upsert (not add): a retried job rewrites the same deterministic ids
+        t0 = time.time()
+        self._lexical.upsert(user_id=user_id, records=records)  # first: with compression, the text lives there
+        with metrics.STORE_UPSERT_SECONDS.time():
+            self._store.upsert(
+                user_id=user_id,
+                ids=ids,
+                texts=[""] * len(texts) if self._lexical.compressed else texts,
+                metadatas=metadatas,
+                embeddings=embeddings,
             )
+        metrics.INGEST_CHUNKS.inc(len(records))
+        return {"hits": cache_stats["hits"], "embed": embed_seconds, "store": time.time() - t0}
 
-        if not texts:
-            logger.warning("No valid text chunks found")
-            return 0
+    def convert_and_chunk(self, *, file_path, file_id, user_id, folder_id, ancestor_ids) -> dict:
+        """
+        Run only the CPU-heavy front half of the pipeline (used by the
+        process pool in `manage.py ingest_dir`). Returns
+            {"records": [(id, text, metadata)], "timings": {"convert", "chunk"}, "conversion_cached": bool}
+        """
+        t0 = time.time()
+        document, conversion_cached = self._convert(file_path)
+        convert_seconds = time.time() - t0
 
-        logger.info("Generating embeddings...")
         t0 = time.time()
-        embeddings = self._embedding_model.encode(
-            texts, show_progress_bar=False
-        ).tolist()
-        logger.info(f"Embeddings generated in {time.time() - t0:.2f}s")
+        records = list(self._iter_chunk_records(
+            document, file_id=file_id, user_id=user_id, folder_id=folder_id, ancestor_ids=ancestor_ids
+        ))
+        chunk_seconds = time.time() - t0
+        metrics.CHUNK_SECONDS.observe(chunk_seconds)
+        return {
+            "records": records,
+            "timings": {"convert": convert_seconds, "chunk": chunk_seconds},
+            "conversion_cached": conversion_cached,
+        }
+
+    def process_and_index(
+        self, *, file_path, file_id, user_id, folder_id, ancestor_ids, on_stage=None, on_progress=None,
+        first_new_index=0,
+    ):
+        """
+        Convert → chunk → embed → store one file as a stream of micro-batches:
+        the chunker is consumed INGEST_BATCH_SIZE chunks at a time, each batch
+        is embedded and upserted before the next one is chunked, so memory
+        stays flat for textbook-sized PDFs and early chunks become searchable
+        while the rest is still processing.
+
+        `on_stage(name)` is called with "converting" and "embedding" as the
+        pipeline advances (the ingestion worker mirrors these onto File.processed);
+        `on_progress(chunks_indexed)` after every stored batch. Newly embedded
+        chunks get indexes from `first_new_index` on (the File.chunk_span of a
+        re-indexed file), so a re-index that never finishes can be undone with
+        delete_file_chunks_from().
+        Returns a report dict:
+            {"chunks": int, "kept": int, "added": int, "removed": int,
+             "chunk_span": int,  # every chunk id of the file is "<file_id>_<i>", i < chunk_span
+             "moved_from": [folder_id],  # folders its stored chunks were re-pointed away from
+             "timings": {stage: seconds}, "conversion_cached": bool,
+             "embedding_cache": {hits, misses, hit_rate} | None}
+        """
+        start = time.time()
+        timings = {"chunk": 0.0, "embed": 0.0, "store": 0.0}
+        logger.info(f"Processing file {file_id}")
 
-        collection = self._get_collection(user_id)
+        if on_stage:
+            on_stage("converting")
+        t0 = time.time()
+        document, conversion_cached = self._convert(file_path)
+        timings["convert"] = time.time() - t0
+        logger.info(
+            f"Document converted in {timings['convert']:.2f}s"
+            + (" (from cache)" if conversion_cached else "")
+        )
 
-        logger.info("Storing in Chroma...")
-        collection.add(
-            documents=texts,
-            metadatas=metadatas,
-            ids=ids,
-            embeddings=embeddings,
+        batch_size = self.ingest_batch_size()
+        records = self._iter_chunk_records(
+            document, file_id=file_id, user_id=user_id, folder_id=folder_id, ancestor_ids=ancestor_ids
+        )
+        # Re-indexing a replaced file (or retrying a job) diffs by chunk text hash:
+        # unchanged chunks keep their ids and vectors, only new text is embedded.
+        existing, next_index, moved_from = self._existing_chunks(
+            user_id=user_id, file_id=file_id, folder_id=folder_id, ancestor_ids=ancestor_ids
         )
+        if moved_from:
+            # kept chunks are not rewritten below: re-point the file's stored
+            # chunks to its current folder first, in one bulk metadata update
+            self.set_file_folder(user_id=user_id, file_id=file_id, folder_id=folder_id, ancestor_ids=ancestor_ids)
+        span = next_index or 0  # kept chunks all sit below next_index
+        if first_new_index:
+            next_index = max(next_index or 0, first_new_index)
+
+        indexed, added, hits = 0, 0, 0
+        while True:
+            t0 = time.time()
+            batch = list(itertools.islice(records, batch_size))
+            timings["chunk"] += time.time() - t0
+            if not batch:
+                break
+            if indexed == 0 and on_stage:
+                on_stage("embedding")
+
+            fresh = []
+            for chunk_id, text, metadata in batch:
+                if existing.get(metadata["chunk_hash"]):
+                    existing[metadata["chunk_hash"]].pop()
+                    continue
+                if next_index is not None:  # never hand out an id a kept chunk still owns
+                    metadata["chunk_index"] = next_index
+                    chunk_id = f"{file_id}_{next_index}"
+                    next_index += 1
+                span = max(span, metadata["chunk_index"] + 1)
+                fresh.append((chunk_id, text, metadata))
 
-        logger.info(f"Completed indexing in {time.time() - start:.2f}s")
-        return len(texts)
+            if fresh:
+                stats = self.index_records(user_id=user_id, records=fresh)
+                timings["embed"] += stats["embed"]
+                timings["store"] += stats["store"]
+                hits += stats["hits"]
+                added += len(fresh)
+
+            indexed += len(batch)
+            logger.debug(f"Indexed {indexed} chunks of file {file_id}")
+            if on_progress:
+                on_progress(indexed)
+
+        metrics.CHUNK_SECONDS.observe(timings["chunk"])
+        stale = [chunk_id for ids in existing.values() for chunk_id in ids]
+        if stale:
+            t0 = time.time()
+            self._delete_ids(user_id=user_id, ids=stale)
+            timings["store"] += time.time() - t0
+
+        timings["total"] = time.time() - start
+        cache_report = None
+        if not indexed:
+            logger.warning("No valid text chunks found")
+        else:
+            if added:
+                cache_report = {"hits": hits, "misses": added - hits, "hit_rate": hits / added}
+            logger.info(
+                f"Completed indexing {indexed} chunks in {timings['total']:.2f}s: "
+                f"{indexed - added} unchanged, {added} embedded, {len(stale)} removed"
+            )
+        return {
+            "chunks": indexed,
+            "kept": indexed - added,
+            "added": added,
+            "removed": len(stale),
+            "chunk_span": span,
+            "moved_from": sorted(moved_from),
+            "timings": timings,
+            "conversion_cached": conversion_cached,
+            "embedding_cache": cache_report,
+        }
+
+    def delete_files_embeddings(self, *, user_id, spans):
+        """
+        Remove the chunks of many files at once (folder delete), from
+        {file_id: File.chunk_span or None}. A file with a known span is
+        deleted by its deterministic ids "<file_id>_<i>" (primary-key lookups
+        in every store); the rest share a single file_id-filtered delete.
+        """
+        ids = [f"{file_id}_{i}" for file_id, span in spans.items() if span for i in range(span)]
+        unknown = [file_id for file_id, span in spans.items() if not span]
+        logger.info(f"Deleting embeddings for {len(spans)} files ({len(ids)} ids, {len(unknown)} by filter)")
+        batch = self._store.max_batch_size()
+        for start in range(0, len(ids), batch):
+            self._delete_ids(user_id=user_id, ids=ids[start:start + batch])
+        if unknown:
+            self._store.delete_files(user_id=user_id, file_ids=unknown)
+            self._lexical.delete_files(user_id=user_id, file_ids=unknown)
 
     def delete_file_embeddings(self, *, user_id, file_id):
         logger.info(f"Deleting embeddings for file {file_id}")
-        collection = self._get_collection(user_id)
-        collection.delete(where={"file_id": file_id})
-
-    def query(self, *, user_id, folder_id, query, k=5):
-        logger.info(f"Querying for folder {folder_id}")
-        collection = self._get_collection(user_id)
-        return collection.query(
-            query_texts=[query],
-            n_results=k,
-            where={"folder_id": folder_id},
-        )
-vector_store = None
-if settings.RUNNING_MIGRATIONS:
-    logger.warning("Running in migration mode - VectorStore will not initialize")
-else:
-    vector_store = VectorStore()
+        self._store.delete_file(user_id=user_id, file_id=file_id)
+        self._lexical.delete_file(user_id=user_id, file_id=file_id)
+
+    def delete_file_chunks_from(self, *, user_id, file_id, first_index):
+        """Remove the chunks of a file with chunk_index >= first_index (what an unfinished re-index added)."""
+        ids = [
+            chunk_id
+            for chunk_id, metadata in self._store.file_chunks(user_id=user_id, file_id=file_id)
+            if metadata["chunk_index"] >= first_index
+        ]
+        logger.info(f"Rolling back {len(ids)} chunks of file {file_id}")
+        batch = self._store.max_batch_size()
+        for start in range(0, len(ids), batch):
+            self._delete_ids(user_id=user_id, ids=ids[start:start + batch])
+
+    def _delete_ids(self, *, user_id, ids):
+        self._store.delete_ids(user_id=user_id, ids=ids)
+        self._lexical.delete_ids(user_id=user_id, ids=ids)
+
+    def _with_texts(self, *, user_id, ids, documents):
+        """Fill in documents from the lexical index in compression mode (chunks stored before it keep their own)."""
+        if not self._lexical.compressed:
+            return documents
+        texts = self._lexical.fetch(user_id=user_id, ids=ids)
+        return [texts.get(chunk_id, document) for chunk_id, document in zip(ids, documents)]
+
+    def iter_chunks(self, *, user_id, page_size=1000):
+        """The chunk store's pages of (id, text, metadata), with the text filled in."""
+        for page in self._store.iter_chunks(user_id=user_id, page_size=page_size):
+            ids, documents, metadatas = zip(*page)
+            yield list(zip(ids, self._with_texts(user_id=user_id, ids=ids, documents=documents), metadatas))
+
+    def rebuild_lexical_index(self, *, user_id, page_size=1000) -> int:
+        """
+        Rewrite a user's BM25 index from the chunk store (backfill / repair);
+        returns the chunk count. Rows are upserted in place rather than
+        cleared first: in compression mode the index holds the only copy of
+        the text. Rows the chunk store no longer has are removed at the end.
+        """
+        stale = self._lexical.chunk_ids(user_id=user_id)
+        total = 0
+        for page in self.iter_chunks(user_id=user_id, page_size=page_size):
+            self._lexical.upsert(user_id=user_id, records=page)
+            stale.difference_update(chunk_id for chunk_id, _, _ in page)
+            total += len(page)
+        if stale:
+            self._lexical.delete_ids(user_id=user_id, ids=list(stale))
+        if total:
+            self._lexical.optimize(user_id=user_id)
+        return total
+
+    def set_folder_ancestors(self, *, user_id, ancestors):
+        """
+        Re-point the ancestor keys of every chunk in the given folders after a
+        folder move: {folder_id: [root id, ..., folder_id]}. Nothing is re-embedded.
+        """
+        logger.info(f"Updating ancestors of {len(ancestors)} folders")
+        self._store.set_folder_ancestors(user_id=user_id, ancestors=ancestors)
+        self._lexical.set_folder_ancestors(user_id=user_id, ancestors=ancestors)
+
+    def set_file_folder(self, *, user_id, file_id, folder_id, ancestor_ids):
+        """
+        Re-point every chunk of a file to `folder_id` after the file moved
+        folders: folder_id and ancestor keys (root → folder_id). Nothing is re-embedded.
+        """
+        logger.info(f"Moving the chunks of file {file_id} to folder {folder_id}")
+        self._store.set_file_folder(user_id=user_id, file_id=file_id, folder_id=folder_id, ancestor_ids=ancestor_ids)
+        self._lexical.set_file_folder(user_id=user_id, file_id=file_id, folder_id=folder_id, ancestor_ids=ancestor_ids)
+
+    def embed_query(self, query: str) -> list[float]:
+        """The vector `query` searches with (batched, and LRU-cached: free right after a query)."""
+        return self._query_embedder.embed(query)
+
+    def query(self, *, user_id, folder_id, query, k=5, scope="folder"):
+        """scope="subtree" searches every folder under `folder_id` in the same single query."""
+        logger.info(f"Querying for folder {folder_id} ({scope})")
+        embedding = self.embed_query(query)
+        with metrics.STORE_QUERY_SECONDS.time():
+            results = self._store.query(user_id=user_id, folder_id=folder_id, embedding=embedding, k=k, scope=scope)
+        if self._lexical.compressed and results["ids"]:
+            results["documents"] = [
+                self._with_texts(user_id=user_id, ids=results["ids"][0], documents=results["documents"][0])
+            ]
+        return results
+
+    def hybrid_query(self, *, user_id, folder_id, query, k=5, scope="folder"):
+        """
+        BM25 and dense search run concurrently, each for
+        HYBRID_CANDIDATES results, and are merged with reciprocal rank
+        fusion. Returns the same shape as `query` (one row, Chroma style)
+        with "scores" (RRF, higher = better) instead of "distances".
+        """
+        logger.info(f"Hybrid query for folder {folder_id} ({scope})")
+        candidates = max(k, settings.HYBRID_CANDIDATES)
+        dense_future = self._search_pool.submit(
+            self.query, user_id=user_id, folder_id=folder_id, query=query, k=candidates, scope=scope
+        )
+        lexical = self._lexical.search(
+            user_id=user_id, folder_id=folder_id, query=query, k=candidates, scope=scope
+        )
+        dense = dense_future.result()
+
+        hits = {hit["id"]: (hit["document"], hit["metadata"]) for hit in lexical}
+        dense_ids = dense["ids"][0] if dense["ids"] else []
+        for chunk_id, document, metadata in zip(dense_ids, dense["documents"][0], dense["metadatas"][0]):
+            hits[chunk_id] = (document, metadata)  # the store's metadata is the complete one
+
+        fused = reciprocal_rank_fusion(
+            [dense_ids, [hit["id"] for hit in lexical]], k=settings.RRF_K
+        )[:k]
+        logger.debug(
+            f"Fused {len(dense_ids)} dense + {len(lexical)} lexical candidates into {len(fused)}"
+        )
+        return {
+            "ids": [[chunk_id for chunk_id, _ in fused]],
+            "documents": [[hits[chunk_id][0] for chunk_id, _ in fused]],
+            "metadatas": [[hits[chunk_id][1] for chunk_id, _ in fused]],
+            "scores": [[score for _, score in fused]],
+        }
+
+    def rerank(self, *, query, results, k, budget):
+        """
+        Reorder a Chroma-shaped result (from `query` / `hybrid_query`) by
+        cross-encoder score and keep the best `k`. Falls back to the first
+        `k` in first-stage order when the model is still loading or scoring
+        would not fit in `budget` seconds; "reranked" in the result tells
+        which of the two happened.
+        """
+        ids = results["ids"][0] if results["ids"] else []
+        order = None
+        if "reranker" not in self._loaded:
+            # never make a request wait for the model download / load
+            logger.info("Reranker not loaded yet, keeping first-stage order")
+            if not self._locks["reranker"].locked():
+                self.start_warm_up(("reranker",))
+        elif ids:
+            t0 = time.time()
+            scores = self._reranker.scores(query, ids, results["documents"][0], budget=budget)
+            if scores is not None:
+                order = sorted(range(len(ids)), key=lambda i: scores[i], reverse=True)
+                logger.debug(f"Reranked {len(ids)} candidates in {(time.time() - t0) * 1000:.0f}ms")
+        reranked = dict(results, reranked=order is not None)  # False → first-stage fallback
+        if order is None:
+            order = range(len(ids))
+        order = list(order)[:k]
+        for key in ("ids", "documents", "metadatas", "distances", "scores"):
+            if results.get(key):
+                reranked[key] = [[results[key][0][i] for i in order]]
+        return reranked
+
+
+vector_store = VectorStore()
@@ -0,0 +1,117 @@
+"""
+Compact encodings for stored chunks (the compression mode).
+
+    codecs      "float16": 2 bytes per dimension
+                "int8":    1 byte per dimension + one float32 scale per vector
+                           (symmetric, max-abs), ~4x smaller than float32
+    Projection  PCA fitted per tenant; the exact store (vector/exact.py)
+                fits it once a tenant holds EXACT_PCA_FIT_AT chunks and
+                re-encodes every row into the reduced space
+    ZstdText    chunk text as one zstd frame per chunk; the lexical index
+                (vector/lexical.py) stores it this way, as the only copy,
+                and the chunk store is given empty documents
+
+`python -m benchmarks.compression` reports recall@k against bytes per chunk
+for every codec / PCA combination and the text ratio on a sample corpus.
+"""
+import threading
+
+import numpy as np
+
+CODECS = ("float16", "int8")
+
+
+def row_dtype(codec: str, dimension: int) -> np.dtype:
+    """One stored row. float16 rows are plain half vectors (the exact store's original format)."""
+    if codec == "float16":
+        return np.dtype([("v", np.float16, (dimension,))])
+    if codec == "int8":
+        return np.dtype([("v", np.int8, (dimension,)), ("scale", np.float32)])
+    raise ValueError(f"Unknown vector codec {codec!r} (expected one of {CODECS})")
+
+
+def encode(codec: str, vectors) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    rows = np.empty(len(vectors), dtype=row_dtype(codec, vectors.shape[1]))
+    if codec == "float16":
+        rows["v"] = vectors
+    else:
+        scale = np.abs(vectors).max(axis=1) / 127.0
+        scale[scale == 0] = 1.0
+        rows["v"] = np.rint(vectors / scale[:, None])
+        rows["scale"] = scale
+    return rows
+
+
+def decode(codec: str, rows) -> np.ndarray:
+    vectors = rows["v"].astype(np.float32)
+    if codec == "int8":
+        vectors *= rows["scale"][:, None]
+    return vectors
+
+
+def dot(codec: str, rows, query) -> np.ndarray:
+    """rows · query without materialising decoded int8 vectors (the scale is applied afterwards)."""
+    products = rows["v"].astype(np.float32) @ query
+    if codec == "int8":
+        products *= rows["scale"]
+    return products
+
+
+class Projection:
+    """PCA: x → (x - mean) · componentsᵀ. Squared l2 in the reduced space approximates the original."""
+
+    def __init__(self, mean, components) -> None:
+        self.mean = np.asarray(mean, dtype=np.float32)
+        self.components = np.asarray(components, dtype=np.float32)
+
+    @property
+    def dimension(self) -> int:
+        return len(self.components)
+
+    @classmethod
+    def fit(cls, vectors, dimension: int, *, sample: int = 20_000, seed: int = 0) -> "Projection":
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if len(vectors) > sample:
+            vectors = vectors[np.random.default_rng(seed).choice(len(vectors), sample, replace=False)]
+        mean = vectors.mean(axis=0)
+        _, _, vt = np.linalg.svd(vectors - mean, full_matrices=False)
+        return cls(mean, vt[:dimension])
+
+    def apply(self, vectors) -> np.ndarray:
+        return (np.asarray(vectors, dtype=np.float32) - self.mean) @ self.components.T
+
+    def inverse(self, projected) -> np.ndarray:
+        """Back to the original space (lossy): used when a projected tenant is promoted."""
+        return np.asarray(projected, dtype=np.float32) @ self.components + self.mean
+
+    def save(self, path) -> None:
+        with open(path, "wb") as fh:
+            np.savez(fh, mean=self.mean, components=self.components)
+
+    @classmethod
+    def load(cls, path) -> "Projection":
+        with np.load(path) as data:
+            return cls(data["mean"], data["components"])
+
+
+class ZstdText:
+    """Chunk text <-> zstd frames. zstandard contexts are not thread-safe, so each thread gets its own."""
+
+    def __init__(self, level: int = 3) -> None:
+        self.level = level
+        self._local = threading.local()
+
+    def _contexts(self):
+        if not hasattr(self._local, "compressor"):
+            import zstandard
+
+            self._local.compressor = zstandard.ZstdCompressor(level=self.level)
+            self._local.decompressor = zstandard.ZstdDecompressor()
+        return self._local.compressor, self._local.decompressor
+
+    def compress(self, text: str) -> bytes:
+        return self._contexts()[0].compress(text.encode("utf-8"))
+
+    def decompress(self, body: bytes) -> str:
+        return self._contexts()[1].decompress(body).decode("utf-8")
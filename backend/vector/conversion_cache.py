@@ -0,0 +1,106 @@
+"""
+On-disk cache of docling conversion results keyed by source-file SHA-256.
+
+    <cache_dir>/docling-<docling version>_core-<docling-core version>/<sha256>.json.gz
+
+Conversion is the slowest stage of ingestion, so keeping the serialized
+DoclingDocument lets duplicate uploads, re-chunking (MAX_TOKENS change) and
+re-embedding (model change) skip it. Entries from other docling versions are
+dropped on startup, and the directory is trimmed least-recently-used first
+once it grows past `max_bytes`.
+"""
+import gzip
+import hashlib
+import os
+import shutil
+import tempfile
+from importlib.metadata import PackageNotFoundError, version
+from pathlib import Path
+
+from docling_core.types.doc import DoclingDocument
+from loguru import logger
+
+
+def file_hash(file_path) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as fh:
+        for block in iter(lambda: fh.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def docling_version_tag() -> str:
+    def _version(package):
+        try:
+            return version(package)
+        except PackageNotFoundError:
+            return "unknown"
+
+    return f"docling-{_version('docling')}_core-{_version('docling-core')}"
+
+
+class ConversionCache:
+    def __init__(self, *, cache_dir, max_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        self._root = Path(cache_dir)
+        self._dir = self._root / docling_version_tag()
+        self._dir.mkdir(parents=True, exist_ok=True)
+        self.invalidate_other_versions()
+
+    def invalidate_other_versions(self) -> None:
+        """Drop results produced by a different docling / docling-core release."""
+        for entry in self._root.iterdir():
+            if entry.is_dir() and entry != self._dir:
+                logger.info(f"Dropping conversion cache for {entry.name} (now {self._dir.name})")
+                shutil.rmtree(entry, ignore_errors=True)
+
+    def clear(self) -> None:
+        shutil.rmtree(self._dir, ignore_errors=True)
+        self._dir.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, digest: str) -> Path:
+        return self._dir / f"{digest}.json.gz"
+
+    def get(self, digest: str) -> DoclingDocument | None:
+        path = self._path(digest)
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as fh:
+                document = DoclingDocument.model_validate_json(fh.read())
+        except FileNotFoundError:
+            return None
+        except Exception:
+            logger.exception(f"Unreadable conversion cache entry {path.name}, discarding")
+            path.unlink(missing_ok=True)
+            return None
+        os.utime(path)  # mtime doubles as the LRU clock
+        return document
+
+    def put(self, digest: str, document: DoclingDocument) -> None:
+        path = self._path(digest)
+        # a name of its own per call: threads of one process convert concurrently too
+        with tempfile.NamedTemporaryFile(dir=self._dir, prefix=f"{digest}.", suffix=".tmp", delete=False) as raw:
+            try:
+                with gzip.open(raw, "wt", encoding="utf-8", compresslevel=6) as fh:
+                    fh.write(document.model_dump_json())
+            except BaseException:
+                os.unlink(raw.name)
+                raise
+        os.replace(raw.name, path)  # atomic, so concurrent workers never read half a file
+        self._trim()
+
+    def _trim(self) -> None:
+        entries = []
+        for path in self._dir.glob("*.json.gz"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:  # trimmed by another worker meanwhile
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+            logger.debug(f"Evicted conversion cache entry {path.name}")
@@ -0,0 +1,164 @@
+"""
+On-disk embedding cache keyed by (embedding model, SHA-256 of chunk text).
+
+Layout, one directory per embedding model:
+    index.sqlite3  → entries(hash, slot, last_used) + meta(next_slot)
+    vectors.f16    → np.memmap float16 [capacity, dim], row `slot` holds the vector
+    tags.u64       → np.memmap uint64 [capacity], slot_tag() of the hash in each row
+
+The sqlite file is opened in WAL mode, so ingestion workers in several
+processes can share one cache. Once `capacity` slots are used, the least
+recently used entries give up their slots (LRU eviction).
+
+A reader in another process does not block a writer, so a slot found in
+`entries` can be handed to a new hash before its vector is read. Writers
+therefore zero a slot's tag, write the vector, then set the new tag, and
+readers only trust a vector whose slot still carries their hash's tag
+after it was copied out.
+"""
+import hashlib
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+from loguru import logger
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def slot_tag(key: str) -> int:
+    """64 bits of a text hash, never 0 (the tag of a slot being rewritten)."""
+    return int(key[:16], 16) | 1
+
+
+class EmbeddingCache:
+    def __init__(self, *, cache_dir, model_name: str, dim: int, capacity: int) -> None:
+        self.model_name = model_name
+        self.dim = dim
+        self.capacity = capacity
+
+        self._dir = Path(cache_dir) / re.sub(r"[^A-Za-z0-9_.-]+", "__", model_name)
+        self._dir.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self._dir / "index.sqlite3", timeout=30, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " hash TEXT PRIMARY KEY, slot INTEGER NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS entries_last_used ON entries(last_used)")
+        self._db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER)")
+        self._db.execute("INSERT OR IGNORE INTO meta VALUES ('next_slot', 0)")
+        self._db.commit()
+
+        vectors_path = self._dir / "vectors.f16"
+        tags_path = self._dir / "tags.u64"
+        with self._db:
+            self._db.execute("BEGIN IMMEDIATE")  # workers start together; one of them lays out the files
+            layout = dict(self._db.execute("SELECT key, value FROM meta WHERE key IN ('capacity', 'dim')").fetchall())
+            if layout != {"capacity": capacity, "dim": dim} or not tags_path.exists():
+                # First run, or the capacity / model dimension changed: start over.
+                self._db.execute("DELETE FROM entries")
+                self._db.execute("UPDATE meta SET value = 0 WHERE key = 'next_slot'")
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO meta VALUES (?, ?)",
+                    [("capacity", capacity), ("dim", dim)],
+                )
+                vectors_path.unlink(missing_ok=True)
+                tags_path.unlink(missing_ok=True)
+            self._vectors = np.memmap(
+                vectors_path,
+                dtype=np.float16,
+                mode="r+" if vectors_path.exists() else "w+",
+                shape=(capacity, dim),
+            )
+            self._tags = np.memmap(
+                tags_path, dtype=np.uint64, mode="r+" if tags_path.exists() else "w+", shape=(capacity,)
+            )
+        logger.info(f"Embedding cache ready at {self._dir} ({capacity} slots x {dim} dims)")
+
+    def _lookup(self, hashes) -> dict[str, int]:
+        """{hash: slot} for the cached subset of `hashes`."""
+        unique = list(dict.fromkeys(hashes))
+        slots = {}
+        for start in range(0, len(unique), 500):  # stay under sqlite's variable limit
+            batch = unique[start:start + 500]
+            placeholders = ",".join("?" * len(batch))
+            slots.update(self._db.execute(
+                f"SELECT hash, slot FROM entries WHERE hash IN ({placeholders})", batch
+            ).fetchall())
+        return slots
+
+    def get_many(self, hashes: list[str]) -> dict[str, np.ndarray]:
+        """Return {hash: float32 vector} for every hash that is cached."""
+        with self._lock:
+            found = {}
+            for key, slot in self._lookup(hashes).items():
+                vector = np.asarray(self._vectors[slot], dtype=np.float32)  # a copy, checked below
+                if int(self._tags[slot]) == slot_tag(key):
+                    found[key] = vector
+            if found:
+                now = time.time()
+                with self._db:
+                    self._db.executemany(
+                        "UPDATE entries SET last_used = ? WHERE hash = ?",
+                        [(now, key) for key in found],
+                    )
+        return found
+
+    def put_many(self, hashes: list[str], vectors: np.ndarray) -> None:
+        """Store vectors for hashes not already cached, evicting LRU entries when full."""
+        pending = dict(zip(hashes, vectors))
+        if not pending:
+            return
+
+        now = time.time()
+        with self._lock, self._db:
+            self._db.execute("BEGIN IMMEDIATE")  # serialise slot allocation across processes
+            # An entry whose slot lost its tag (a writer died between the two)
+            # is rewritten in place rather than skipped as already cached.
+            rewrite = {}
+            for key, slot in self._lookup(pending).items():
+                if int(self._tags[slot]) == slot_tag(key):
+                    del pending[key]
+                else:
+                    rewrite[key] = slot
+            pending = dict(list(pending.items())[: self.capacity])
+            if not pending:
+                return
+
+            fresh_keys = [key for key in pending if key not in rewrite]
+            next_slot = self._db.execute("SELECT value FROM meta WHERE key = 'next_slot'").fetchone()[0]
+            fresh = list(range(next_slot, min(next_slot + len(fresh_keys), self.capacity)))
+            self._db.execute("UPDATE meta SET value = ? WHERE key = 'next_slot'", (next_slot + len(fresh),))
+
+            slots = fresh
+            shortfall = len(fresh_keys) - len(fresh)
+            if shortfall:
+                evicted = self._db.execute(
+                    "SELECT hash, slot FROM entries ORDER BY last_used LIMIT ?", (shortfall,)
+                ).fetchall()
+                self._db.executemany("DELETE FROM entries WHERE hash = ?", [(key,) for key, _ in evicted])
+                slots = fresh + [slot for _, slot in evicted]
+                logger.debug(f"Embedding cache evicted {len(evicted)} entries")
+            placed = dict(zip(fresh_keys, slots)) | rewrite
+
+            # tag 0 → vector → tag, and the entries are only published once all of it is on disk
+            rows = list(placed.values())
+            self._tags[rows] = 0
+            self._tags.flush()
+            for key, slot in placed.items():
+                self._vectors[slot] = pending[key]
+            self._vectors.flush()
+            self._tags[rows] = [slot_tag(key) for key in placed]
+            self._tags.flush()
+            self._db.executemany(
+                "INSERT OR REPLACE INTO entries (hash, slot, last_used) VALUES (?, ?, ?)",
+                [(key, slot, now) for key, slot in placed.items()],
+            )
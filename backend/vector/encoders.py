@@ -0,0 +1,80 @@
+"""
+Embedding backends behind VectorStore, selected by settings.EMBEDDING_BACKEND.
+
+    "torch" → TorchEncoder:    SentenceTransformer, fp32 PyTorch (the original path)
+    "onnx"  → OnnxInt8Encoder: same model exported to ONNX Runtime with dynamic
+                               int8 quantization, for CPU-only hosts
+
+Both return float32 numpy arrays. `name` identifies the exact numerics and is
+used as the embedding-cache key, so int8 and fp32 vectors never mix there.
+Compare them with `python -m benchmarks.encoders`.
+"""
+import re
+from pathlib import Path
+
+import numpy as np
+from loguru import logger
+
+
+class Encoder:
+    name: str
+    dimension: int
+
+    def encode(self, texts: list[str], batch_size: int = 32) -> np.ndarray:
+        raise NotImplementedError
+
+
+class TorchEncoder(Encoder):
+    def __init__(self, model_name: str, device: str | None = None) -> None:
+        from sentence_transformers import SentenceTransformer
+
+        self._model = SentenceTransformer(model_name, device=device)
+        self.name = model_name
+        self.dimension = self._model.get_sentence_embedding_dimension()
+
+    def encode(self, texts, batch_size=32):
+        return self._model.encode(
+            texts, batch_size=batch_size, show_progress_bar=False, convert_to_numpy=True
+        )
+
+
+class OnnxInt8Encoder(Encoder):
+    """
+    The int8 graph is exported once into `export_dir` and reused by every
+    later process. `quantization` is one of sentence-transformers' presets:
+    "avx2" (portable x86), "avx512", "avx512_vnni" or "arm64".
+    """
+
+    def __init__(self, model_name: str, *, export_dir, quantization: str = "avx2") -> None:
+        from sentence_transformers import SentenceTransformer, export_dynamic_quantized_onnx_model
+
+        target = Path(export_dir) / re.sub(r"[^A-Za-z0-9_.-]+", "__", model_name)
+        file_name = f"onnx/model_qint8_{quantization}.onnx"
+        if not (target / file_name).exists():
+            logger.info(f"Exporting {model_name} to ONNX ({quantization} int8) under {target}...")
+            model = SentenceTransformer(model_name, backend="onnx", device="cpu")
+            model.save(str(target))
+            export_dynamic_quantized_onnx_model(model, quantization, str(target))
+
+        self._model = SentenceTransformer(
+            str(target), backend="onnx", device="cpu", model_kwargs={"file_name": file_name}
+        )
+        self.name = f"{model_name}@onnx-qint8-{quantization}"
+        self.dimension = self._model.get_sentence_embedding_dimension()
+
+    def encode(self, texts, batch_size=32):
+        return self._model.encode(
+            texts, batch_size=batch_size, show_progress_bar=False, convert_to_numpy=True
+        )
+
+
+def build_encoder(backend: str, model_name: str, **options) -> Encoder:
+    if backend == "torch":
+        return TorchEncoder(model_name)
+    if backend == "onnx":
+        return OnnxInt8Encoder(
+            model_name,
+            export_dir=options["export_dir"],
+            quantization=options.get("quantization", "avx2"),
+        )
+    raise ValueError(f"Unknown embedding backend {backend!r} (expected 'torch' or 'onnx')")
@@ -0,0 +1,587 @@
+"""
+Exact-search chunk store for small and medium tenants (VECTOR_BACKEND="exact").
+
+    <path>/user_<id>/vectors-<epoch>.f16   append-only matrix, one row per chunk (.i8 for
+                                           the int8 codec, vector/compression.py)
+    <path>/user_<id>/rows.sqlite3          row → chunk id, folder, file, norm, alive flag,
+                                           metadata and text; codec and stored dimension
+    <path>/user_<id>/projection.npz        per-tenant PCA, once fitted
+    <path>/user_<id>/PROMOTED              present once the tenant moved to the ANN store
+
+Below a few tens of thousands of chunks a brute-force scan is as fast as an
+HNSW lookup and costs no graph build, no resident index and no startup. A
+query masks the rows down to the alive chunks of one folder (or, for a
+subtree, of every folder carrying its ancestor key), upcasts them in
+blocks and ranks them with a matmul plus argpartition, in Chroma's
+squared-l2 convention.
+
+Writes append to the matrix and commit the side rows in one SQLite write
+transaction. That transaction is also the lock between ingestion workers.
+Deletes only clear the alive flag. Once tombstones pass COMPACT_RATIO, the
+live rows are copied to vectors-<epoch+1>.f16 and renumbered in the same
+transaction, so readers in other processes never pair new row numbers with
+the old file. A tenant that grows past `promote_at` live chunks is copied
+into the ANN store once; from then on every call for it is delegated there.
+
+Compression (EXACT_VECTOR_CODEC, EXACT_PCA_DIM): a tenant keeps the codec
+it was created with. With a PCA dimension set, the first time a tenant
+holds `pca_fit_at` chunks the projection is fitted on its rows and the
+same rewrite as a compaction stores every row reduced; queries are
+projected the same way. A projected tenant is promoted with vectors mapped
+back to the full dimension (lossy).
+"""
+import json
+import shutil
+import sqlite3
+import threading
+from collections import defaultdict
+from pathlib import Path
+
+import numpy as np
+from loguru import logger
+
+from vector.compression import CODECS, Projection, decode, dot, encode, row_dtype
+from vector.stores import ANCESTOR_PREFIX, ChunkStore, with_ancestors
+
+COMPACT_RATIO = 0.25  # dead rows / all rows
+COMPACT_MIN_DEAD = 1000
+SCAN_BLOCK = 16_384  # rows upcast to float32 at a time; bounds query memory
+PCA_SAMPLE = 20_000  # rows the projection is fitted on
+SUFFIXES = {"float16": "f16", "int8": "i8"}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS state (key TEXT PRIMARY KEY, value INTEGER NOT NULL);
+INSERT OR IGNORE INTO state (key, value) VALUES ('epoch', 0);
+CREATE TABLE IF NOT EXISTS rows (
+    row INTEGER PRIMARY KEY,
+    chunk_id TEXT NOT NULL,
+    folder_id TEXT NOT NULL,
+    file_id TEXT NOT NULL,
+    norm REAL NOT NULL,
+    alive INTEGER NOT NULL DEFAULT 1,
+    metadata TEXT NOT NULL,
+    document TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS rows_chunk ON rows(chunk_id) WHERE alive;
+CREATE INDEX IF NOT EXISTS rows_file ON rows(file_id) WHERE alive;
+"""
+
+
+class Promoted(Exception):
+    """The tenant moved to the ANN store while this call waited for the write lock."""
+
+
+class _Tenant:
+    def __init__(self, directory: Path, dimension: int, *, codec: str, pca_dimension: int, pca_fit_at: int) -> None:
+        self.dir = directory
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.dimension = dimension
+        self.pca_dimension = pca_dimension
+        self.pca_fit_at = pca_fit_at
+        self._projection = None  # (stored dimension, Projection) last loaded
+        self._lock = threading.RLock()
+        self._db = sqlite3.connect(
+            self.dir / "rows.sqlite3", timeout=120, isolation_level=None, check_same_thread=False
+        )
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+        self._db.execute(
+            "INSERT OR IGNORE INTO state (key, value) VALUES ('codec', ?), ('dim', ?)",
+            (CODECS.index(codec), dimension),
+        )
+        self._data_version = None  # None → in-memory view must be rebuilt
+
+    # ── in-memory view ──────────────────────────
+
+    def _epoch(self) -> int:
+        return self._db.execute("SELECT value FROM state WHERE key = 'epoch'").fetchone()[0]
+
+    def _layout(self):
+        """(epoch, codec, stored dimension, Projection | None), read in the caller's transaction."""
+        state = dict(self._db.execute("SELECT key, value FROM state"))
+        codec, dim = CODECS[state["codec"]], state["dim"]
+        projection = None
+        if dim != self.dimension:
+            if self._projection is None or self._projection[0] != dim:
+                self._projection = (dim, Projection.load(self.dir / "projection.npz"))
+            projection = self._projection[1]
+        return state["epoch"], codec, dim, projection
+
+    def _vectors_path(self, epoch: int, codec: str) -> Path:
+        return self.dir / f"vectors-{epoch}.{SUFFIXES[codec]}"
+
+    def _refresh(self) -> None:
+        """Rebuild folder codes / alive mask / norms / memmap if anyone committed since last time."""
+        (version,) = self._db.execute("PRAGMA data_version").fetchone()
+        if version == self._data_version:
+            return
+        for _ in range(3):
+            snapshot = not self._db.in_transaction  # inside our own write we already have one
+            if snapshot:
+                self._db.execute("BEGIN")  # epoch and rows from the same snapshot
+            try:
+                epoch, codec, dim, projection = self._layout()
+                dtype = row_dtype(codec, dim)
+                path = self._vectors_path(epoch, codec)
+                rows = self._db.execute("SELECT row, folder_id, norm FROM rows WHERE alive").fetchall()
+                # all chunks of a folder share its ancestor keys, so one row per folder is enough
+                samples = self._db.execute(
+                    "SELECT folder_id, metadata FROM rows "
+                    "WHERE row IN (SELECT min(row) FROM rows WHERE alive GROUP BY folder_id)"
+                ).fetchall()
+                size = path.stat().st_size // dtype.itemsize if path.exists() else 0
+                vectors = np.memmap(path, dtype=dtype, mode="r", shape=(size,)) if size else np.zeros(0, dtype)
+            finally:
+                if snapshot:
+                    self._db.execute("COMMIT")
+            if size or not rows:
+                break
+            # compacted (old file removed) right after our snapshot: read again
+
+        self._vectors, self._codec, self._query_projection = vectors, codec, projection
+        self._view_epoch = epoch
+        self._folders = {}
+        self._codes = np.full(size, -1, dtype=np.int32)  # -1 = dead or orphaned row
+        self._norms = np.zeros(size, dtype=np.float32)
+        for row, folder_id, norm in rows:
+            self._codes[row] = self._folders.setdefault(folder_id, len(self._folders))
+            self._norms[row] = norm
+        self._subtrees = defaultdict(list)  # ancestor folder id → codes of the folders under it
+        for folder_id, metadata in samples:
+            for key in json.loads(metadata):
+                if key.startswith(ANCESTOR_PREFIX) and folder_id in self._folders:
+                    self._subtrees[key[len(ANCESTOR_PREFIX):]].append(self._folders[folder_id])
+        self._data_version = version
+
+    # ── writes ──────────────────────────────────
+
+    def _write(self, marker: Path, fn):
+        """Run `fn()` inside the tenant-wide write transaction, unless the tenant got promoted."""
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                if marker.exists():
+                    raise Promoted
+                result = fn()
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            self._db.execute("COMMIT")
+            self._data_version = None
+            return result
+
+    def upsert(self, marker, ids, texts, metadatas, embeddings) -> int:
+        """Append rows (tombstoning older versions of the same ids); returns the live row count."""
+
+        def append():
+            epoch, codec, _, projection = self._layout()  # under the write lock: no rewrite can race us
+            vectors = np.asarray(embeddings, dtype=np.float32)
+            encoded = encode(codec, projection.apply(vectors) if projection else vectors)
+            norms = np.square(decode(codec, encoded)).sum(axis=1)  # of the stored (rounded) vectors
+            path = self._vectors_path(epoch, codec)
+            size = path.stat().st_size if path.exists() else 0
+            row_bytes = encoded.dtype.itemsize
+            start = size // row_bytes
+            with open(path, "ab") as fh:
+                if size % row_bytes:  # torn tail from a crashed writer
+                    fh.truncate(start * row_bytes)
+                fh.write(encoded.tobytes())
+            self._db.executemany(
+                "UPDATE rows SET alive = 0 WHERE chunk_id = ? AND alive", [(i,) for i in ids]
+            )
+            self._db.executemany(
+                "INSERT INTO rows (row, chunk_id, folder_id, file_id, norm, metadata, document) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (start + n, chunk_id, metadata["folder_id"], metadata["file_id"],
+                     float(norm), json.dumps(metadata), text)
+                    for n, (chunk_id, text, metadata, norm) in enumerate(zip(ids, texts, metadatas, norms))
+                ],
+            )
+            return self._db.execute("SELECT count(*) FROM rows WHERE alive").fetchone()[0]
+
+        alive = self._write(marker, append)
+        if self.pca_dimension and alive >= self.pca_fit_at:
+            with self._lock:
+                (dim,) = self._db.execute("SELECT value FROM state WHERE key = 'dim'").fetchone()
+            if dim == self.dimension:
+                self._write(marker, self._fit_projection)
+        return alive
+
+    def set_folder_ancestors(self, marker, ancestors) -> None:
+        def rewrite():
+            rows = self._db.execute(
+                f"SELECT row, folder_id, metadata FROM rows WHERE alive AND folder_id IN ({','.join('?' * len(ancestors))})",
+                list(ancestors),
+            ).fetchall()
+            self._db.executemany(
+                "UPDATE rows SET metadata = ? WHERE row = ?",
+                [
+                    (json.dumps(with_ancestors(json.loads(metadata), ancestors[folder_id])), row)
+                    for row, folder_id, metadata in rows
+                ],
+            )
+
+        self._write(marker, rewrite)
+
+    def set_file_folder(self, marker, file_id, folder_id, ancestor_ids) -> None:
+        def rewrite():
+            rows = self._db.execute(
+                "SELECT row, metadata FROM rows WHERE alive AND file_id = ?", (file_id,)
+            ).fetchall()
+            self._db.executemany(
+                "UPDATE rows SET folder_id = ?, metadata = ? WHERE row = ?",
+                [
+                    (
+                        folder_id,
+                        json.dumps({**with_ancestors(json.loads(metadata), ancestor_ids), "folder_id": folder_id}),
+                        row,
+                    )
+                    for row, metadata in rows
+                ],
+            )
+
+        self._write(marker, rewrite)
+
+    def tombstone(self, marker, where: str, params) -> None:
+        self._write(marker, lambda: self._db.executemany(
+            f"UPDATE rows SET alive = 0 WHERE alive AND {where}", params
+        ))
+        self._maybe_compact(marker)
+
+    def _maybe_compact(self, marker) -> None:
+        with self._lock:
+            total, dead = self._db.execute(
+                "SELECT count(*), count(*) - coalesce(sum(alive), 0) FROM rows"
+            ).fetchone()
+        if dead >= COMPACT_MIN_DEAD and dead > COMPACT_RATIO * total:
+            self._write(marker, self._rewrite)
+
+    def _fit_projection(self) -> None:
+        if self._layout()[2] == self.dimension:  # another writer may have fitted it already
+            self._rewrite(fit=True)
+
+    def _rewrite(self, fit=False) -> None:
+        """
+        Copy the live rows into vectors-<epoch+1>, renumbered from 0 (compaction).
+        With `fit`, a PCA is fitted on them first and every row is stored projected.
+        """
+        epoch, codec, dim, projection = self._layout()
+        dtype = row_dtype(codec, dim)
+        old_path, new_path = self._vectors_path(epoch, codec), self._vectors_path(epoch + 1, codec)
+        live = [row for (row,) in self._db.execute("SELECT row FROM rows WHERE alive ORDER BY row")]
+        size = old_path.stat().st_size // dtype.itemsize
+        old = np.memmap(old_path, dtype=dtype, mode="r", shape=(size,))
+        if fit:
+            sample = np.sort(np.random.default_rng(0).permutation(live)[:PCA_SAMPLE])
+            projection = Projection.fit(decode(codec, old[sample]), self.pca_dimension)
+            projection.save(self.dir / "projection.npz")
+            self._db.execute("UPDATE state SET value = ? WHERE key = 'dim'", (projection.dimension,))
+
+        norms = []
+        with open(new_path, "wb") as fh:
+            for start in range(0, len(live), SCAN_BLOCK):
+                block = old[live[start:start + SCAN_BLOCK]]
+                if fit:
+                    block = encode(codec, projection.apply(decode(codec, block)))
+                    norms.append(np.square(decode(codec, block)).sum(axis=1))
+                fh.write(np.ascontiguousarray(block).tobytes())
+        del old
+
+        self._db.execute("DELETE FROM rows WHERE NOT alive")
+        # ascending, and every new number ≤ its old one, so the primary key never collides
+        self._db.executemany("UPDATE rows SET row = ? WHERE row = ?", list(enumerate(live)))
+        if fit:
+            self._db.executemany(
+                "UPDATE rows SET norm = ? WHERE row = ?",
+                [(float(norm), row) for row, norm in enumerate(np.concatenate(norms))],
+            )
+        self._db.execute("UPDATE state SET value = ? WHERE key = 'epoch'", (epoch + 1,))
+        if fit:
+            logger.info(f"Projected {self.dir.name}: {len(live)} rows {self.dimension} → {projection.dimension} dims")
+        else:
+            logger.info(f"Compacted {self.dir.name}: {size} → {len(live)} rows")
+        # readers still mapping the old file keep its inode until they refresh
+        old_path.unlink(missing_ok=True)
+
+    # ── reads ───────────────────────────────────
+
+    def query(self, folder_id, embedding, k, scope="folder") -> dict:
+        while True:
+            hits = self._query_once(folder_id, embedding, k, scope)
+            if hits is not None:
+                break
+            logger.debug(f"{self.dir.name} was compacted during a query, searching again")
+        return {
+            "ids": [[chunk_id for (chunk_id, _, _), _ in hits]],
+            "documents": [[document for (_, document, _), _ in hits]],
+            "metadatas": [[metadata for (_, _, metadata), _ in hits]],
+            "distances": [[distance for _, distance in hits]],
+        }
+
+    def _query_once(self, folder_id, embedding, k, scope):
+        """[((chunk id, text, metadata), distance)] best first, or None: compacted meanwhile, try again."""
+        with self._lock:
+            self._refresh()
+            vectors, codes, norms = self._vectors, self._codes, self._norms
+            codec, projection, epoch = self._codec, self._query_projection, self._view_epoch
+            if scope == "subtree":
+                wanted = self._subtrees.get(folder_id, [])
+            else:
+                wanted = [self._folders[folder_id]] if folder_id in self._folders else []
+        candidates = np.flatnonzero(np.isin(codes, wanted)) if wanted else np.zeros(0, dtype=np.int64)
+        if not len(candidates):
+            return []
+
+        query = np.asarray(embedding, dtype=np.float32)
+        if projection is not None:
+            query = projection.apply(query[None])[0]
+        distances = np.empty(len(candidates), dtype=np.float32)
+        for start in range(0, len(candidates), SCAN_BLOCK):
+            block = candidates[start:start + SCAN_BLOCK]
+            distances[start:start + len(block)] = norms[block] - 2.0 * dot(codec, vectors[block], query)
+        distances += query @ query
+
+        k = min(k, len(candidates))
+        top = np.argpartition(distances, k - 1)[:k] if k < len(candidates) else np.arange(len(candidates))
+        top = top[np.argsort(distances[top])]
+        rows = [int(candidates[i]) for i in top]
+
+        # Row numbers only name the same chunk within one epoch: a compaction
+        # renumbers them. Resolve them to chunk ids in a snapshot of the epoch
+        # the scan ran against; chunks deleted since then are left out.
+        with self._lock:
+            self._db.execute("BEGIN")
+            try:
+                if self._epoch() != epoch:
+                    return None
+                found = {
+                    row: (chunk_id, document, json.loads(metadata))
+                    for row, chunk_id, document, metadata in self._db.execute(
+                        f"SELECT row, chunk_id, document, metadata FROM rows "
+                        f"WHERE alive = 1 AND row IN ({','.join('?' * len(rows))})",
+                        rows,
+                    )
+                }
+            finally:
+                self._db.execute("COMMIT")
+        return [(found[row], float(max(distances[i], 0.0))) for row, i in zip(rows, top) if row in found]
+
+    def file_chunks(self, file_id):
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT chunk_id, metadata FROM rows WHERE alive AND file_id = ?", (file_id,)
+            ).fetchall()
+        return [(chunk_id, json.loads(metadata)) for chunk_id, metadata in rows]
+
+    def iter_rows(self, page_size, with_vectors=False):
+        """Pages of (id, text, metadata[, float32 vector]) for every live row."""
+        last = -1
+        while True:
+            with self._lock:
+                self._refresh()
+                vectors, codec, projection = self._vectors, self._codec, self._query_projection
+                page = self._db.execute(
+                    "SELECT row, chunk_id, document, metadata FROM rows WHERE alive AND row > ? ORDER BY row LIMIT ?",
+                    (last, page_size),
+                ).fetchall()
+            if not page:
+                return
+            last = page[-1][0]
+            if with_vectors:
+                matrix = decode(codec, vectors[[row for row, _, _, _ in page]])
+                if projection is not None:
+                    matrix = projection.inverse(matrix)
+                yield [(c, d, json.loads(m), v) for (_, c, d, m), v in zip(page, matrix)]
+            else:
+                yield [(c, d, json.loads(m)) for _, c, d, m in page]
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+class ExactChunkStore(ChunkStore):
+    name = "exact"
+
+    def __init__(
+        self, *, path, dimension: int, promote_at: int, ann,
+        codec: str = "float16", pca_dimension: int = 0, pca_fit_at: int = 5000,
+    ) -> None:
+        """ann: zero-argument callable building the ChunkStore promoted tenants move to."""
+        row_dtype(codec, dimension)  # unknown codec → ValueError now, not on the first write
+        self._root = Path(path)
+        self.dimension = dimension
+        self.promote_at = promote_at
+        self.codec = codec
+        self.pca_dimension = pca_dimension
+        self.pca_fit_at = pca_fit_at
+        self._ann_factory = ann
+        self._ann = None
+        self._tenants: dict[str, _Tenant] = {}
+        self._lock = threading.Lock()
+
+    def _marker(self, user_id) -> Path:
+        return self._root / f"user_{user_id}" / "PROMOTED"
+
+    def _ann_store(self) -> ChunkStore:
+        with self._lock:
+            if self._ann is None:
+                self._ann = self._ann_factory()
+            return self._ann
+
+    def _tenant(self, user_id) -> _Tenant | None:
+        """The exact tenant, or None once it lives in the ANN store."""
+        if self._marker(user_id).exists():
+            with self._lock:
+                tenant = self._tenants.pop(user_id, None)
+            if tenant:
+                tenant.close()
+            return None
+        with self._lock:
+            if user_id not in self._tenants:
+                self._tenants[user_id] = _Tenant(
+                    self._root / f"user_{user_id}",
+                    self.dimension,
+                    codec=self.codec,
+                    pca_dimension=self.pca_dimension,
+                    pca_fit_at=self.pca_fit_at,
+                )
+            return self._tenants[user_id]
+
+    def max_batch_size(self):
+        return 10_000
+
+    def upsert(self, *, user_id, ids, texts, metadatas, embeddings):
+        tenant = self._tenant(user_id)
+        if tenant is not None:
+            try:
+                alive = tenant.upsert(self._marker(user_id), ids, texts, metadatas, embeddings)
+            except Promoted:
+                pass
+            else:
+                if alive >= self.promote_at:
+                    self._promote(user_id, tenant)
+                return
+        self._ann_store().upsert(user_id=user_id, ids=ids, texts=texts, metadatas=metadatas, embeddings=embeddings)
+
+    def _promote(self, user_id, tenant: _Tenant) -> None:
+        """Copy every live chunk into the ANN store, then flip the tenant over for good."""
+        ann = self._ann_store()
+        marker = self._marker(user_id)
+
+        def copy():
+            copied = 0
+            for page in tenant.iter_rows(page_size=ann.max_batch_size(), with_vectors=True):
+                ids, texts, metadatas, vectors = zip(*page)
+                ann.upsert(
+                    user_id=user_id, ids=list(ids), texts=list(texts),
+                    metadatas=list(metadatas), embeddings=[v.tolist() for v in vectors],
+                )
+                copied += len(ids)
+            marker.touch()  # still holding the write lock: no writer can slip in between
+            return copied
+
+        try:
+            copied = tenant._write(marker, copy)
+        except Promoted:
+            return
+        logger.info(f"Promoted user {user_id} to the {ann.name} store ({copied} chunks)")
+        with self._lock:
+            self._tenants.pop(user_id, None)
+        tenant.close()
+        for path in tenant.dir.iterdir():
+            if path == marker:
+                continue
+            if path.is_dir():
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                path.unlink(missing_ok=True)
+
+    def file_chunks(self, *, user_id, file_id):
+        tenant = self._tenant(user_id)
+        if tenant is None:
+            return self._ann_store().file_chunks(user_id=user_id, file_id=file_id)
+        return tenant.file_chunks(file_id)
+
+    def delete_ids(self, *, user_id, ids):
+        tenant = self._tenant(user_id)
+        if tenant is not None:
+            try:
+                tenant.tombstone(self._marker(user_id), "chunk_id = ?", [(i,) for i in ids])
+                return
+            except Promoted:
+                pass
+        self._ann_store().delete_ids(user_id=user_id, ids=ids)
+
+    def delete_file(self, *, user_id, file_id):
+        self.delete_files(user_id=user_id, file_ids=[file_id])
+
+    def delete_files(self, *, user_id, file_ids):
+        tenant = self._tenant(user_id)
+        if tenant is not None:
+            try:
+                tenant.tombstone(self._marker(user_id), "file_id = ?", [(i,) for i in file_ids])
+                return
+            except Promoted:
+                pass
+        self._ann_store().delete_files(user_id=user_id, file_ids=file_ids)
+
+    def query(self, *, user_id, folder_id, embedding, k, scope="folder"):
+        tenant = self._tenant(user_id)
+        if tenant is None:
+            return self._ann_store().query(
+                user_id=user_id, folder_id=folder_id, embedding=embedding, k=k, scope=scope
+            )
+        return tenant.query(folder_id, embedding, k, scope)
+
+    def set_folder_ancestors(self, *, user_id, ancestors):
+        tenant = self._tenant(user_id)
+        if tenant is not None:
+            try:
+                tenant.set_folder_ancestors(self._marker(user_id), ancestors)
+                return
+            except Promoted:
+                pass
+        self._ann_store().set_folder_ancestors(user_id=user_id, ancestors=ancestors)
+
+    def set_file_folder(self, *, user_id, file_id, folder_id, ancestor_ids):
+        tenant = self._tenant(user_id)
+        if tenant is not None:
+            try:
+                tenant.set_file_folder(self._marker(user_id), file_id, folder_id, ancestor_ids)
+                return
+            except Promoted:
+                pass
+        self._ann_store().set_file_folder(
+            user_id=user_id, file_id=file_id, folder_id=folder_id, ancestor_ids=ancestor_ids
+        )
+
+    def iter_chunks(self, *, user_id, page_size=1000):
+        tenant = self._tenant(user_id)
+        if tenant is None:
+            yield from self._ann_store().iter_chunks(user_id=user_id, page_size=page_size)
+            return
+        yield from tenant.iter_rows(page_size)
+
+    def prewarm(self, user_id):
+        tenant = self._tenant(user_id)
+        if tenant is None:
+            self._ann_store().prewarm(user_id)
+            return
+        with tenant._lock:
+            tenant._refresh()
+
+    def stats(self):
+        with self._lock:
+            open_tenants = len(self._tenants)
+            ann = self._ann
+        return {
+            "backend": self.name,
+            "open_tenants": open_tenants,
+            "promote_at": self.promote_at,
+            "codec": self.codec,
+            "pca_dimension": self.pca_dimension or None,
+            "ann": ann.stats() if ann is not None else None,
+        }
@@ -0,0 +1,311 @@
+"""
+Per-user BM25 index next to the Chroma collections, for hybrid retrieval.
+
+    <index_dir>/user_<user_id>.sqlite3
+        chunks      (chunk_id, file_id, folder_id, ancestors, chunk_index, text)  ← the rows
+        chunks_fts  FTS5 over chunks.text (external content, no second copy)
+
+With CHUNK_TEXT_COMPRESSION=zstd, chunks.text holds a zstd frame instead
+of the text (vector/compression.py) and is the only copy of it: the chunk
+store gets empty documents and VectorStore reads the text back with
+fetch(). FTS5 only keeps the inverted index; the triggers hand it the
+decompressed text through the chunk_text() SQL function, which every
+connection registers. Plain and compressed rows can be mixed in one file.
+
+Dense search misses exact matches on names, dates and treaty titles; SQLite
+FTS5 answers those from an inverted index and ranks with bm25(). The
+VectorStore writes here whenever it writes to Chroma, and `hybrid_query`
+merges both rankings with reciprocal rank fusion.
+"""
+import re
+import sqlite3
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+from loguru import logger
+
+from vector.compression import ZstdText
+from vector.stores import ANCESTOR_PREFIX
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS chunks (
+    id INTEGER PRIMARY KEY,
+    chunk_id TEXT NOT NULL UNIQUE,
+    file_id TEXT NOT NULL,
+    folder_id TEXT NOT NULL,
+    ancestors TEXT NOT NULL DEFAULT '',  -- " <root id> ... <folder id> ", for subtree searches
+    chunk_index INTEGER NOT NULL,
+    text TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS chunks_file ON chunks(file_id);
+CREATE VIRTUAL TABLE IF NOT EXISTS chunks_fts USING fts5(
+    text, content='chunks', content_rowid='id',
+    tokenize='porter unicode61 remove_diacritics 2'
+);
+"""
+# recreated over files written before compressed rows existed (they passed chunks.text as is)
+TRIGGERS = """
+DROP TRIGGER IF EXISTS chunks_ai;
+DROP TRIGGER IF EXISTS chunks_ad;
+DROP TRIGGER IF EXISTS chunks_au;
+CREATE TRIGGER chunks_ai AFTER INSERT ON chunks BEGIN
+    INSERT INTO chunks_fts(rowid, text) VALUES (new.id, chunk_text(new.text));
+END;
+CREATE TRIGGER chunks_ad AFTER DELETE ON chunks BEGIN
+    INSERT INTO chunks_fts(chunks_fts, rowid, text) VALUES ('delete', old.id, chunk_text(old.text));
+END;
+CREATE TRIGGER chunks_au AFTER UPDATE OF text ON chunks BEGIN
+    INSERT INTO chunks_fts(chunks_fts, rowid, text) VALUES ('delete', old.id, chunk_text(old.text));
+    INSERT INTO chunks_fts(rowid, text) VALUES (new.id, chunk_text(new.text));
+END;
+"""
+
+# Words that match most chunks only make bm25 walk long posting lists.
+STOPWORDS = frozenset(
+    "a an and are as at be by did do does for from had has have how i in is it "
+    "its me of on or so than that the their them then there these they this to "
+    "was were what when where which who whom why will with you your".split()
+)
+MAX_QUERY_TERMS = 32
+# bm25() costs ~2µs per matching row, so a query scores at most this many
+# postings. Terms are kept rarest first (frequency counted within the
+# searched folder) until the budget is spent: the dropped ones are frequent
+# words with a near-zero idf that would barely move the ranking anyway. This
+# keeps 100k-chunk tenants in single-digit ms. When not even the rarest term
+# fits, the MIN_QUERY_TERMS rarest are scored regardless: a slow answer
+# beats an empty one.
+MAX_SCORED_POSTINGS = 3000
+MIN_QUERY_TERMS = 1
+
+
+def query_terms(query: str) -> list[str]:
+    terms = [t for t in re.findall(r"\w+", query.lower()) if t not in STOPWORDS]
+    return list(dict.fromkeys(terms))[:MAX_QUERY_TERMS]
+
+
+def match_expression(terms) -> str:
+    """Terms → FTS5 MATCH string: quoted (so no term is read as an operator) and OR-ed."""
+    return " OR ".join(f'"{term}"' for term in terms)
+
+
+def reciprocal_rank_fusion(rankings, *, k: int = 60) -> list[tuple[str, float]]:
+    """
+    Merge ranked id lists: score(id) = Σ 1 / (k + rank). Only ranks are
+    used, so bm25 scores and cosine distances never need to be comparable.
+    Returns [(id, score)] best first.
+    """
+    scores = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking, start=1):
+            scores[item] = scores.get(item, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda pair: pair[1], reverse=True)
+
+
+def _ancestors(metadata) -> str:
+    chain = [key[len(ANCESTOR_PREFIX):] for key in metadata if key.startswith(ANCESTOR_PREFIX)]
+    return f" {' '.join(chain)} " if chain else ""
+
+
+class LexicalIndex:
+    def __init__(self, *, index_dir, zstd_level: int | None = None, max_connections: int = 16) -> None:
+        """
+        zstd_level: store chunk text compressed at this level (None: plain text).
+        max_connections: open user files kept per thread; the least recently
+        used one is closed past it, so file descriptors stay bounded.
+        """
+        self._dir = Path(index_dir)
+        self._dir.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()  # sqlite connections stay on their own thread
+        self.max_connections = max(1, max_connections)
+        self.compressed = zstd_level is not None
+        self._zstd = ZstdText(level=zstd_level or 3)  # also reads rows written compressed earlier
+        if self.compressed:
+            import zstandard  # noqa: F401  (missing package → fail at startup, not on the first write)
+
+    def _chunk_text(self, value):
+        return self._zstd.decompress(value) if isinstance(value, bytes) else value
+
+    def _connect(self, user_id: str) -> sqlite3.Connection:
+        connections = self._local.__dict__.setdefault("connections", OrderedDict())
+        if user_id in connections:
+            connections.move_to_end(user_id)
+            return connections[user_id]
+        while len(connections) >= self.max_connections:
+            _, evicted = connections.popitem(last=False)
+            evicted.close()
+        conn = sqlite3.connect(self._dir / f"user_{user_id}.sqlite3", timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")  # web readers never wait for the ingest writer
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.create_function("chunk_text", 1, self._chunk_text, deterministic=True)
+        conn.executescript(SCHEMA)
+        (trigger,) = conn.execute(
+            "SELECT coalesce(max(sql), '') FROM sqlite_master WHERE type = 'trigger' AND name = 'chunks_ai'"
+        ).fetchone()
+        if "chunk_text" not in trigger:
+            conn.executescript(f"BEGIN IMMEDIATE; {TRIGGERS} COMMIT;")
+        if "ancestors" not in {column for _, column, *_ in conn.execute("PRAGMA table_info(chunks)")}:
+            # index written before subtree search; sync_folder_ancestors fills the column
+            conn.execute("ALTER TABLE chunks ADD COLUMN ancestors TEXT NOT NULL DEFAULT ''")
+        connections[user_id] = conn
+        return conn
+
+    def upsert(self, *, user_id, records) -> None:
+        """Insert or replace (id, text, metadata) records, as given to Chroma."""
+        rows = [
+            (
+                chunk_id, metadata["file_id"], metadata["folder_id"],
+                _ancestors(metadata), metadata["chunk_index"],
+                self._zstd.compress(text) if self.compressed else text,
+            )
+            for chunk_id, text, metadata in records
+        ]
+        conn = self._connect(user_id)
+        with conn:
+            conn.executemany(
+                """
+                INSERT INTO chunks (chunk_id, file_id, folder_id, ancestors, chunk_index, text)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(chunk_id) DO UPDATE SET
+                    file_id = excluded.file_id,
+                    folder_id = excluded.folder_id,
+                    ancestors = excluded.ancestors,
+                    chunk_index = excluded.chunk_index,
+                    text = excluded.text
+                """,
+                rows,
+            )
+
+    def fetch(self, *, user_id, ids) -> dict[str, str]:
+        """{id: text} for the ids that are stored here."""
+        if not ids:
+            return {}
+        rows = self._connect(user_id).execute(
+            f"SELECT chunk_id, chunk_text(text) FROM chunks WHERE chunk_id IN ({','.join('?' * len(ids))})",
+            list(ids),
+        ).fetchall()
+        return dict(rows)
+
+    def chunk_ids(self, *, user_id) -> set[str]:
+        return {chunk_id for (chunk_id,) in self._connect(user_id).execute("SELECT chunk_id FROM chunks")}
+
+    def delete_ids(self, *, user_id, ids) -> None:
+        conn = self._connect(user_id)
+        with conn:
+            conn.executemany("DELETE FROM chunks WHERE chunk_id = ?", [(i,) for i in ids])
+
+    def delete_file(self, *, user_id, file_id) -> None:
+        self.delete_files(user_id=user_id, file_ids=[file_id])
+
+    def delete_files(self, *, user_id, file_ids) -> None:
+        conn = self._connect(user_id)
+        with conn:
+            conn.executemany("DELETE FROM chunks WHERE file_id = ?", [(i,) for i in file_ids])
+
+    def set_folder_ancestors(self, *, user_id, ancestors) -> None:
+        """{folder_id: [root id, ..., folder_id]}, as in ChunkStore.set_folder_ancestors."""
+        conn = self._connect(user_id)
+        with conn:
+            conn.executemany(
+                "UPDATE chunks SET ancestors = ? WHERE folder_id = ?",
+                [(f" {' '.join(chain)} ", folder_id) for folder_id, chain in ancestors.items()],
+            )
+
+    def set_file_folder(self, *, user_id, file_id, folder_id, ancestor_ids) -> None:
+        """As ChunkStore.set_file_folder."""
+        conn = self._connect(user_id)
+        with conn:
+            conn.execute(
+                "UPDATE chunks SET folder_id = ?, ancestors = ? WHERE file_id = ?",
+                (folder_id, f" {' '.join(ancestor_ids)} ", file_id),
+            )
+
+    def search(self, *, user_id, folder_id, query, k=20, scope="folder") -> list[dict]:
+        """
+        Top-k chunks of `folder_id` (scope="subtree": of anything under it) by bm25, best first:
+            [{"id", "document", "metadata", "score"}]  (lower score = better, FTS5 convention)
+        """
+        conn = self._connect(user_id)
+        if scope == "subtree":
+            condition, value = "instr(c.ancestors, ?) > 0", f" {folder_id} "
+        else:
+            condition, value = "c.folder_id = ?", folder_id
+        try:
+            terms = self._select_terms(conn, query_terms(query), condition=condition, value=value)
+            if not terms:
+                return []
+            rows = conn.execute(
+                f"""
+                SELECT c.chunk_id, chunk_text(c.text), c.file_id, c.folder_id, c.chunk_index, bm25(chunks_fts) AS score
+                FROM chunks_fts JOIN chunks c ON c.id = chunks_fts.rowid
+                WHERE chunks_fts MATCH ? AND {condition}
+                ORDER BY score
+                LIMIT ?
+                """,
+                (match_expression(terms), value, k),
+            ).fetchall()
+        except sqlite3.OperationalError:
+            logger.exception(f"Lexical search failed for user {user_id}")
+            return []
+        return [
+            {
+                "id": chunk_id,
+                "document": text,
+                "metadata": {
+                    "user_id": user_id,
+                    "folder_id": folder,
+                    "file_id": file_id,
+                    "chunk_index": chunk_index,
+                },
+                "score": score,
+            }
+            for chunk_id, text, file_id, folder, chunk_index, score in rows
+        ]
+
+    @staticmethod
+    def _select_terms(conn, terms, *, condition, value) -> list[str]:
+        """
+        Rarest terms (in the chunks matching `condition`) whose postings fit in
+        MAX_SCORED_POSTINGS, and at least the MIN_QUERY_TERMS rarest ones.
+        Terms that match nothing there are dropped when they are frequent
+        elsewhere; rare ones cost nothing to keep.
+        """
+        def count(term, scoped):
+            # counting stops at the budget, so a very common term costs no more than a rare one
+            (n,) = conn.execute(
+                f"""
+                SELECT count(*) FROM (
+                    SELECT 1 FROM chunks_fts JOIN chunks c ON c.id = chunks_fts.rowid
+                    WHERE chunks_fts MATCH ? AND {condition if scoped else "1"} LIMIT ?
+                )
+                """,
+                (match_expression([term]), *([value] if scoped else []), MAX_SCORED_POSTINGS + 1),
+            ).fetchone()
+            return n
+
+        # The tenant-wide count is cheap and bounds the folder's. Only terms
+        # over the budget tenant-wide are counted again within the folder, as
+        # they may still be rare there: that count walks their postings.
+        df = {term: count(term, scoped=False) for term in terms}
+        for term in terms:
+            if df[term] > MAX_SCORED_POSTINGS:
+                df[term] = count(term, scoped=True)
+
+        ranked = sorted((t for t in terms if df[t]), key=df.get)  # stable: ties keep query order
+        selected, budget = [], MAX_SCORED_POSTINGS
+        for term in ranked:
+            if df[term] > budget:
+                break
+            selected.append(term)
+            budget -= df[term]
+        if len(selected) < MIN_QUERY_TERMS:
+            selected = ranked[:MIN_QUERY_TERMS]
+        if len(selected) < len(terms):
+            logger.debug(f"Lexical search kept {selected} of {terms}")
+        return selected
+
+    def optimize(self, *, user_id) -> None:
+        """Merge FTS5 segments into one b-tree (smaller file, faster queries after bulk loads)."""
+        conn = self._connect(user_id)
+        with conn:
+            conn.execute("INSERT INTO chunks_fts(chunks_fts) VALUES ('optimize')")
@@ -0,0 +1,83 @@
+"""
+Second-stage reranking: a small CPU cross-encoder rescoring first-stage
+candidates (query, chunk) pairs, so retrieval can fetch a wide candidate set
+cheaply and the prompt still only gets the best few chunks.
+
+Scores are cached per (query, chunk id), and every call has a time budget:
+pairs are scored in batches, and if the next batch would not fit (judged by
+the measured seconds-per-pair) the caller gets None and keeps first-stage
+order. A half-reranked list is never returned.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from loguru import logger
+
+
+class Reranker:
+    def __init__(self, model_name: str, *, batch_size: int = 16, cache_size: int = 4096) -> None:
+        from sentence_transformers import CrossEncoder
+
+        self._model = CrossEncoder(model_name, device="cpu")
+        self.name = model_name
+        self.batch_size = batch_size
+        self.cache_size = cache_size
+        self._cache: OrderedDict[tuple[str, str], float] = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._seconds_per_pair = None  # moving average, None until the first batch
+
+    def _cached(self, keys) -> dict:
+        with self._cache_lock:
+            found = {}
+            for key in keys:
+                if key in self._cache:
+                    self._cache.move_to_end(key)
+                    found[key] = self._cache[key]
+            return found
+
+    def _remember(self, scores: dict) -> None:
+        with self._cache_lock:
+            self._cache.update(scores)
+            for key in scores:
+                self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def scores(self, query: str, ids, documents, *, budget: float) -> list[float] | None:
+        """
+        Cross-encoder score per candidate (higher = better), or None when
+        scoring everything would overrun `budget` seconds.
+        """
+        deadline = time.monotonic() + budget
+        query = " ".join(query.split())
+        keys = [(query, chunk_id) for chunk_id in ids]
+        scores = self._cached(keys)
+
+        pending = [(key, document) for key, document in zip(keys, documents) if key not in scores]
+        for start in range(0, len(pending), self.batch_size):
+            batch = pending[start:start + self.batch_size]
+            if self._seconds_per_pair is not None:
+                if time.monotonic() + self._seconds_per_pair * len(batch) > deadline:
+                    logger.debug(
+                        f"Rerank budget of {budget * 1000:.0f}ms exceeded after "
+                        f"{len(keys) - len(pending) + start}/{len(keys)} pairs"
+                    )
+                    return None
+
+            t0 = time.monotonic()
+            batch_scores = self._model.predict(
+                [(query, document) for _, document in batch],
+                batch_size=self.batch_size,
+                show_progress_bar=False,
+            )
+            per_pair = (time.monotonic() - t0) / len(batch)
+            self._seconds_per_pair = (
+                per_pair if self._seconds_per_pair is None
+                else 0.8 * self._seconds_per_pair + 0.2 * per_pair
+            )
+            fresh = {key: float(score) for (key, _), score in zip(batch, batch_scores)}
+            self._remember(fresh)
+            scores.update(fresh)
+
+        return [scores[key] for key in keys]
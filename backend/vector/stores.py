@@ -0,0 +1,424 @@
+"""
+Chunk storage behind VectorStore, selected by settings.VECTOR_BACKEND.
+
+    "chroma"   → ChromaChunkStore:   PersistentClient, one collection per user
+                                     (vector/tenants.py keeps the handles)
+    "pgvector" → PgVectorChunkStore: one Postgres table, HNSW index on the
+                                     embedding, btree indexes on user/folder/file
+    "exact"    → ExactChunkStore:    memory-mapped float16 matrix per user, brute
+                                     force; big tenants move to one of the above
+                                     (vector/exact.py)
+
+All speak the same small interface, keep Chroma's l2 convention for
+`distances` (squared euclidean) and return query results in Chroma's shape,
+so the rest of the pipeline (lexical index, RRF, rerank, cache) never
+knows which one is in use. `python -m benchmarks.vector_stores` runs the
+same behaviour checks against each, then benchmarks them side by side.
+"""
+import json
+
+import numpy as np
+from loguru import logger
+
+from vector.tenants import TenantCollections
+
+FILTER_COLUMNS = ("user_id", "folder_id", "file_id", "chunk_index", "chunk_hash")
+
+# Every chunk carries `in_<folder id>: True` for each folder on its path
+# (root → own folder), so "anything under folder X" is one equality filter
+# in every backend instead of a fan-out over X's subfolders.
+ANCESTOR_PREFIX = "in_"
+
+
+def ancestor_metadata(ancestor_ids) -> dict:
+    return {f"{ANCESTOR_PREFIX}{folder_id}": True for folder_id in ancestor_ids}
+
+
+def with_ancestors(metadata: dict, ancestor_ids) -> dict:
+    """`metadata` with its ancestor keys replaced by those of `ancestor_ids`."""
+    kept = {key: value for key, value in metadata.items() if not key.startswith(ANCESTOR_PREFIX)}
+    return {**kept, **ancestor_metadata(ancestor_ids)}
+
+
+class ChunkStore:
+    name: str
+
+    def max_batch_size(self) -> int:
+        raise NotImplementedError
+
+    def upsert(self, *, user_id, ids, texts, metadatas, embeddings) -> None:
+        raise NotImplementedError
+
+    def file_chunks(self, *, user_id, file_id) -> list[tuple[str, dict]]:
+        """(id, metadata) of every chunk stored for a file."""
+        raise NotImplementedError
+
+    def delete_ids(self, *, user_id, ids) -> None:
+        raise NotImplementedError
+
+    def delete_file(self, *, user_id, file_id) -> None:
+        raise NotImplementedError
+
+    def delete_files(self, *, user_id, file_ids) -> None:
+        """delete_file for many files in one round trip."""
+        raise NotImplementedError
+
+    def query(self, *, user_id, folder_id, embedding, k, scope="folder") -> dict:
+        """
+        Nearest `k` chunks of one folder ("folder") or of everything under it
+        ("subtree"): {"ids", "documents", "metadatas", "distances"}, one row each.
+        """
+        raise NotImplementedError
+
+    def set_folder_ancestors(self, *, user_id, ancestors: dict[str, list[str]]) -> None:
+        """
+        Rewrite the ancestor keys of every chunk in the given folders:
+        {folder_id: [root id, ..., folder_id]}. Metadata only, nothing is re-embedded.
+        """
+        raise NotImplementedError
+
+    def set_file_folder(self, *, user_id, file_id, folder_id, ancestor_ids) -> None:
+        """
+        Move every chunk of a file to `folder_id`: rewrite its folder_id and
+        ancestor keys (`ancestor_ids` = [root id, ..., folder_id]). Metadata only.
+        """
+        raise NotImplementedError
+
+    def iter_chunks(self, *, user_id, page_size=1000):
+        """Yield every stored chunk of a user as pages of (id, text, metadata)."""
+        raise NotImplementedError
+
+    def prewarm(self, user_id) -> None:
+        pass
+
+    def stats(self) -> dict:
+        return {"backend": self.name}
+
+
+class ChromaChunkStore(ChunkStore):
+    name = "chroma"
+
+    def __init__(self, *, path, memory_limit: int, idle_seconds: float) -> None:
+        import chromadb
+        from chromadb.config import Settings as ChromaSettings
+
+        # Chroma unloads least-recently-used HNSW segments past this ceiling;
+        # TenantCollections only estimates the working set against it.
+        self._client = chromadb.PersistentClient(
+            path=str(path),
+            settings=ChromaSettings(
+                chroma_segment_cache_policy="LRU",
+                chroma_memory_limit_bytes=memory_limit,
+            ),
+        )
+        self._tenants = TenantCollections(
+            lambda: self._client, memory_limit=memory_limit, idle_seconds=idle_seconds
+        )
+
+    def max_batch_size(self):
+        return self._client.get_max_batch_size()
+
+    def upsert(self, *, user_id, ids, texts, metadatas, embeddings):
+        self._tenants.get(user_id).upsert(
+            documents=texts, metadatas=metadatas, ids=ids, embeddings=embeddings
+        )
+        self._tenants.note_write(user_id)
+
+    def file_chunks(self, *, user_id, file_id):
+        result = self._tenants.get(user_id).get(where={"file_id": file_id}, include=["metadatas"])
+        return list(zip(result["ids"], result["metadatas"]))
+
+    def delete_ids(self, *, user_id, ids):
+        self._tenants.get(user_id).delete(ids=ids)
+        self._tenants.note_write(user_id)
+
+    def delete_file(self, *, user_id, file_id):
+        self._tenants.get(user_id).delete(where={"file_id": file_id})
+        self._tenants.note_write(user_id)
+
+    def delete_files(self, *, user_id, file_ids):
+        self._tenants.get(user_id).delete(where={"file_id": {"$in": list(file_ids)}})
+        self._tenants.note_write(user_id)
+
+    def query(self, *, user_id, folder_id, embedding, k, scope="folder"):
+        where = {f"{ANCESTOR_PREFIX}{folder_id}": True} if scope == "subtree" else {"folder_id": folder_id}
+        return self._tenants.get(user_id).query(query_embeddings=[embedding], n_results=k, where=where)
+
+    def set_folder_ancestors(self, *, user_id, ancestors):
+        collection = self._tenants.get(user_id)
+        stored = collection.get(where={"folder_id": {"$in": list(ancestors)}}, include=["metadatas"])
+        # update() merges metadata per key, so stale ancestor keys are removed with None
+        patches = [
+            {
+                **{key: None for key in metadata if key.startswith(ANCESTOR_PREFIX)},
+                **ancestor_metadata(ancestors[metadata["folder_id"]]),
+            }
+            for metadata in stored["metadatas"]
+        ]
+        batch = self.max_batch_size()
+        for start in range(0, len(stored["ids"]), batch):
+            collection.update(ids=stored["ids"][start:start + batch], metadatas=patches[start:start + batch])
+
+    def set_file_folder(self, *, user_id, file_id, folder_id, ancestor_ids):
+        collection = self._tenants.get(user_id)
+        stored = collection.get(where={"file_id": file_id}, include=["metadatas"])
+        patches = [
+            {
+                **{key: None for key in metadata if key.startswith(ANCESTOR_PREFIX)},
+                **ancestor_metadata(ancestor_ids),
+                "folder_id": folder_id,
+            }
+            for metadata in stored["metadatas"]
+        ]
+        batch = self.max_batch_size()
+        for start in range(0, len(stored["ids"]), batch):
+            collection.update(ids=stored["ids"][start:start + batch], metadatas=patches[start:start + batch])
+
+    def iter_chunks(self, *, user_id, page_size=1000):
+        collection = self._tenants.get(user_id)
+        offset = 0
+        while True:
+            page = collection.get(include=["documents", "metadatas"], limit=page_size, offset=offset)
+            if not page["ids"]:
+                return
+            yield list(zip(page["ids"], page["documents"], page["metadatas"]))
+            offset += page_size
+
+    def prewarm(self, user_id):
+        self._tenants.prewarm(user_id)
+
+    def stats(self):
+        return {"backend": self.name, **self._tenants.stats()}
+
+
+class PgVectorChunkStore(ChunkStore):
+    """
+    All tenants share one table; every statement filters on user_id first.
+    Writes go through COPY into a temp table plus one INSERT .. ON CONFLICT,
+    and the folder filter sits in the same statement as the HNSW ORDER BY.
+    On pgvector >= 0.8 iterative index scans keep walking the graph until
+    `k` rows pass the filter. On older versions a short result falls back
+    to an exact scan of the folder.
+    """
+
+    name = "pgvector"
+    TABLE = "rag_chunks"
+
+    def __init__(self, *, dsn: str, dimension: int, pool_size: int = 10, ef_search: int = 64) -> None:
+        import psycopg
+        from pgvector.psycopg import register_vector
+        from psycopg_pool import ConnectionPool
+
+        self.dimension = dimension
+        self.ef_search = ef_search
+        with psycopg.connect(dsn, autocommit=True) as conn:
+            self._create_schema(conn)
+            (version,) = conn.execute("SELECT extversion FROM pg_extension WHERE extname = 'vector'").fetchone()
+        self.iterative_scan = tuple(int(part) for part in version.split(".")[:2]) >= (0, 8)
+
+        self._pool = ConnectionPool(
+            dsn,
+            min_size=1,
+            max_size=pool_size,
+            configure=register_vector,
+            name="pgvector",
+            open=True,
+        )
+        logger.info(f"pgvector {version} ready ({self.TABLE}, dim {dimension}, pool ≤ {pool_size})")
+
+    def _create_schema(self, conn) -> None:
+        conn.execute("CREATE EXTENSION IF NOT EXISTS vector")
+        conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {self.TABLE} (
+                id          text PRIMARY KEY,
+                user_id     text NOT NULL,
+                folder_id   text NOT NULL,
+                file_id     text NOT NULL,
+                chunk_index integer NOT NULL,
+                chunk_hash  text,
+                metadata    jsonb NOT NULL,
+                document    text NOT NULL,
+                embedding   vector({self.dimension}) NOT NULL
+            )
+        """)
+        conn.execute(f"CREATE INDEX IF NOT EXISTS {self.TABLE}_user_folder ON {self.TABLE} (user_id, folder_id)")
+        conn.execute(f"CREATE INDEX IF NOT EXISTS {self.TABLE}_user_file ON {self.TABLE} (user_id, file_id)")
+        # subtree filter: metadata @> '{"in_<folder>": true}'
+        conn.execute(
+            f"CREATE INDEX IF NOT EXISTS {self.TABLE}_metadata ON {self.TABLE} USING gin (metadata jsonb_path_ops)"
+        )
+        conn.execute(f"""
+            CREATE INDEX IF NOT EXISTS {self.TABLE}_embedding_hnsw ON {self.TABLE}
+            USING hnsw (embedding vector_l2_ops) WITH (m = 16, ef_construction = 64)
+        """)
+
+    def max_batch_size(self):
+        return 10_000  # COPY has no practical limit; this only caps memory per batch
+
+    def upsert(self, *, user_id, ids, texts, metadatas, embeddings):
+        columns = ", ".join(("id",) + FILTER_COLUMNS + ("metadata", "document", "embedding"))
+        updates = ", ".join(f"{c} = EXCLUDED.{c}" for c in columns.split(", ")[1:])
+        with self._pool.connection() as conn, conn.transaction():
+            conn.execute(
+                f"CREATE TEMP TABLE {self.TABLE}_load (LIKE {self.TABLE}) ON COMMIT DROP"
+            )
+            with conn.cursor().copy(
+                f"COPY {self.TABLE}_load ({columns}) FROM STDIN WITH (FORMAT BINARY)"
+            ) as copy:
+                copy.set_types(["text", "text", "text", "text", "int4", "text", "jsonb", "text", "vector"])
+                for chunk_id, text, metadata, embedding in zip(ids, texts, metadatas, embeddings):
+                    copy.write_row((
+                        chunk_id,
+                        user_id,
+                        metadata["folder_id"],
+                        metadata["file_id"],
+                        metadata["chunk_index"],
+                        metadata.get("chunk_hash"),
+                        metadata,
+                        text,
+                        np.asarray(embedding, dtype=np.float32),
+                    ))
+            conn.execute(
+                f"INSERT INTO {self.TABLE} ({columns}) SELECT {columns} FROM {self.TABLE}_load "
+                f"ON CONFLICT (id) DO UPDATE SET {updates}"
+            )
+
+    def file_chunks(self, *, user_id, file_id):
+        with self._pool.connection() as conn:
+            rows = conn.execute(
+                f"SELECT id, metadata FROM {self.TABLE} WHERE user_id = %s AND file_id = %s",
+                (user_id, file_id),
+            ).fetchall()
+        return [(chunk_id, metadata) for chunk_id, metadata in rows]
+
+    def delete_ids(self, *, user_id, ids):
+        with self._pool.connection() as conn:
+            conn.execute(
+                f"DELETE FROM {self.TABLE} WHERE user_id = %s AND id = ANY(%s)", (user_id, list(ids))
+            )
+
+    def delete_file(self, *, user_id, file_id):
+        self.delete_files(user_id=user_id, file_ids=[file_id])
+
+    def delete_files(self, *, user_id, file_ids):
+        with self._pool.connection() as conn:
+            conn.execute(
+                f"DELETE FROM {self.TABLE} WHERE user_id = %s AND file_id = ANY(%s)", (user_id, list(file_ids))
+            )
+
+    def _search(self, conn, *, user_id, folder_id, embedding, k, scope, exact=False):
+        conn.execute(f"SET LOCAL hnsw.ef_search = {max(self.ef_search, k)}")
+        if exact:
+            conn.execute("SET LOCAL enable_indexscan = off")  # bitmap scan of the filter, then sort
+        elif self.iterative_scan:
+            conn.execute("SET LOCAL hnsw.iterative_scan = relaxed_order")
+        if scope == "subtree":
+            condition, value = "metadata @> %s::jsonb", json.dumps({f"{ANCESTOR_PREFIX}{folder_id}": True})
+        else:
+            condition, value = "folder_id = %s", folder_id
+        return conn.execute(
+            f"""
+            SELECT id, document, metadata, embedding <-> %s AS distance
+            FROM {self.TABLE}
+            WHERE user_id = %s AND {condition}
+            ORDER BY embedding <-> %s
+            LIMIT %s
+            """,
+            (embedding, user_id, value, embedding, k),
+        ).fetchall()
+
+    def query(self, *, user_id, folder_id, embedding, k, scope="folder"):
+        embedding = np.asarray(embedding, dtype=np.float32)
+        search = dict(user_id=user_id, folder_id=folder_id, embedding=embedding, k=k, scope=scope)
+        with self._pool.connection() as conn, conn.transaction():
+            rows = self._search(conn, **search)
+        if len(rows) < k and not self.iterative_scan:
+            # the graph walk ran out before k rows matched the filter; the folder is small,
+            # so scanning it exactly is cheap
+            with self._pool.connection() as conn, conn.transaction():
+                rows = self._search(conn, **search, exact=True)
+        rows.sort(key=lambda row: row[3])  # relaxed_order may return near-sorted rows
+        return {
+            "ids": [[row[0] for row in rows]],
+            "documents": [[row[1] for row in rows]],
+            "metadatas": [[row[2] for row in rows]],
+            "distances": [[row[3] ** 2 for row in rows]],  # Chroma's "l2" is squared
+        }
+
+    def set_folder_ancestors(self, *, user_id, ancestors):
+        with self._pool.connection() as conn, conn.transaction():
+            conn.cursor().executemany(
+                f"""
+                UPDATE {self.TABLE} SET metadata = coalesce((
+                    SELECT jsonb_object_agg(key, value) FROM jsonb_each(metadata)
+                    WHERE left(key, {len(ANCESTOR_PREFIX)}) <> '{ANCESTOR_PREFIX}'
+                ), '{{}}') || %s::jsonb
+                WHERE user_id = %s AND folder_id = %s
+                """,
+                [(json.dumps(ancestor_metadata(chain)), user_id, folder_id) for folder_id, chain in ancestors.items()],
+            )
+
+    def set_file_folder(self, *, user_id, file_id, folder_id, ancestor_ids):
+        with self._pool.connection() as conn:
+            conn.execute(
+                f"""
+                UPDATE {self.TABLE} SET folder_id = %s, metadata = coalesce((
+                    SELECT jsonb_object_agg(key, value) FROM jsonb_each(metadata)
+                    WHERE left(key, {len(ANCESTOR_PREFIX)}) <> '{ANCESTOR_PREFIX}'
+                ), '{{}}') || %s::jsonb
+                WHERE user_id = %s AND file_id = %s
+                """,
+                (folder_id, json.dumps({**ancestor_metadata(ancestor_ids), "folder_id": folder_id}), user_id, file_id),
+            )
+
+    def iter_chunks(self, *, user_id, page_size=1000):
+        last_id = ""
+        while True:
+            with self._pool.connection() as conn:
+                rows = conn.execute(
+                    f"SELECT id, document, metadata FROM {self.TABLE} "
+                    f"WHERE user_id = %s AND id > %s ORDER BY id LIMIT %s",
+                    (user_id, last_id, page_size),
+                ).fetchall()
+            if not rows:
+                return
+            yield [tuple(row) for row in rows]
+            last_id = rows[-1][0]
+
+    def stats(self):
+        pool = self._pool.get_stats()
+        return {
+            "backend": self.name,
+            "pool_size": pool.get("pool_size"),
+            "pool_available": pool.get("pool_available"),
+            "requests_waiting": pool.get("requests_waiting"),
+        }
+
+
+def build_chunk_store(backend: str, **options) -> ChunkStore:
+    if backend == "chroma":
+        return ChromaChunkStore(
+            path=options["path"],
+            memory_limit=options["memory_limit"],
+            idle_seconds=options["idle_seconds"],
+        )
+    if backend == "pgvector":
+        return PgVectorChunkStore(
+            dsn=options["dsn"],
+            dimension=options["dimension"],
+            pool_size=options.get("pool_size", 10),
+            ef_search=options.get("ef_search", 64),
+        )
+    if backend == "exact":
+        from vector.exact import ExactChunkStore
+
+        return ExactChunkStore(
+            path=options["path"],
+            dimension=options["dimension"],
+            promote_at=options["promote_at"],
+            ann=options["ann"],
+            codec=options.get("codec", "float16"),
+            pca_dimension=options.get("pca_dimension", 0),
+            pca_fit_at=options.get("pca_fit_at", 5000),
+        )
+    raise ValueError(f"Unknown vector backend {backend!r} (expected 'chroma', 'pgvector' or 'exact')")
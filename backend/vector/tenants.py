@@ -0,0 +1,119 @@
+"""
+Per-tenant Chroma collection handles (one `user_<id>` collection per user).
+
+    get(user_id)      → cached handle; no get_or_create_collection round trip per call
+    note_write(...)   → size estimate is refreshed on the next sweep
+    prewarm(user_id)  → load the tenant's HNSW segment before the first question
+    stats()           → open handles and the estimated working set, for /health/ready
+
+Memory is not managed here: HNSW segments live in Chroma's LRU segment
+cache, which the client bounds at the same `memory_limit`
+(vector/stores.py). Dropping a handle does not unload its segment, and
+Chroma has no call that would. What this class bounds is its own map: a
+sweep, run from get() at most every SWEEP_INTERVAL seconds, drops handles
+idle for `idle_seconds` and re-estimates the bytes (float32 vectors plus
+HNSW links) of the tenants used within that window. When that working set
+outgrows the limit, Chroma will be reloading segments between questions,
+and the sweep says so.
+"""
+import threading
+import time
+from dataclasses import dataclass
+
+from loguru import logger
+
+HNSW_LINK_BYTES = 2 * 16 * 4  # 2·M neighbour ids of 4 bytes at Chroma's default hnsw:M=16
+PER_VECTOR_OVERHEAD = 64  # id mapping, visited-list slot, allocator slack
+SWEEP_INTERVAL = 30.0  # seconds
+
+
+@dataclass
+class Tenant:
+    collection: object
+    last_access: float
+    resident_bytes: int = 0
+    dirty: bool = True  # resident_bytes needs a recount
+
+
+class TenantCollections:
+    def __init__(self, get_client, *, memory_limit: int, idle_seconds: float) -> None:
+        self._get_client = get_client
+        self.memory_limit = memory_limit
+        self.idle_seconds = idle_seconds
+        self._tenants: dict[str, Tenant] = {}
+        self._lock = threading.Lock()
+        self._last_sweep = time.monotonic()
+        self._working_set = 0
+
+    def get(self, user_id: str):
+        with self._lock:
+            tenant = self._tenants.get(user_id)
+            if tenant is None:
+                # embedding_function=None: we always pass vectors, so Chroma must not
+                # load its default ONNX model alongside ours.
+                collection = self._get_client().get_or_create_collection(
+                    name=f"user_{user_id}", embedding_function=None
+                )
+                tenant = self._tenants[user_id] = Tenant(collection, time.monotonic())
+            now = tenant.last_access = time.monotonic()
+            sweep = now - self._last_sweep >= SWEEP_INTERVAL
+            if sweep:
+                self._last_sweep = now  # this caller sweeps; the others carry on
+        if sweep:
+            self._sweep()
+        return tenant.collection
+
+    def note_write(self, user_id: str) -> None:
+        with self._lock:
+            if user_id in self._tenants:
+                self._tenants[user_id].dirty = True
+
+    def forget(self, user_id: str) -> None:
+        with self._lock:
+            self._tenants.pop(user_id, None)
+
+    def prewarm(self, user_id: str) -> None:
+        """Open the collection and run one query so its HNSW segment is loaded into memory."""
+        t0 = time.time()
+        collection = self.get(user_id)
+        sample = collection.get(limit=1, include=["embeddings"])
+        if len(sample["ids"]):
+            collection.query(query_embeddings=[list(sample["embeddings"][0])], n_results=1)
+        logger.debug(f"Prewarmed collection of user {user_id} in {time.time() - t0:.2f}s")
+
+    @staticmethod
+    def _estimate_bytes(collection) -> int:
+        count = collection.count()
+        if not count:
+            return 0
+        sample = collection.get(limit=1, include=["embeddings"])
+        dimension = len(sample["embeddings"][0])
+        return count * (dimension * 4 + HNSW_LINK_BYTES + PER_VECTOR_OVERHEAD)
+
+    def _sweep(self) -> None:
+        now = time.monotonic()
+        with self._lock:
+            for user_id, tenant in list(self._tenants.items()):
+                if now - tenant.last_access >= self.idle_seconds:
+                    del self._tenants[user_id]
+                    logger.debug(f"Dropped idle collection handle of user {user_id}")
+            tenants = list(self._tenants.values())
+        for tenant in tenants:
+            if tenant.dirty:
+                tenant.resident_bytes = self._estimate_bytes(tenant.collection)
+                tenant.dirty = False
+        self._working_set = sum(tenant.resident_bytes for tenant in tenants)
+        if self._working_set > self.memory_limit:
+            logger.warning(
+                f"{len(tenants)} active tenants need ~{self._working_set / 1e6:.0f}MB of HNSW segments, "
+                f"over the {self.memory_limit / 1e6:.0f}MB segment cache: expect reloads"
+            )
+
+    def stats(self) -> dict:
+        with self._lock:
+            open_tenants = len(self._tenants)
+        return {
+            "open_tenants": open_tenants,
+            "working_set_bytes": self._working_set,  # estimate as of the last sweep
+            "memory_limit": self.memory_limit,
+        }
@@ -24,7 +24,7 @@ export interface FileT {
   uploaded_at?: string;
   folder: string;
   folder_name?: string;
-  processed?: boolean;
+  processed?: "queued" | "converting" | "embedding" | "done" | "failed" | "stale";
 }
 
 export interface FolderT {